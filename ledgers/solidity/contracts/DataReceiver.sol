@@ -1,11 +1,12 @@
 pragma solidity ^0.5.0;
+pragma experimental ABIEncoderV2;
 
-import "./InterledgerReceiverInterface.sol";
+import "./InterledgerBatchReceiverInterface.sol";
 
 /**
  * This is a sample contract as data collector used for develpment and testing
  */
-contract DataReceiver is InterledgerReceiverInterface {
+contract DataReceiver is InterledgerBatchReceiverInterface {
     struct DataItem {
         uint256 nonce;
         bytes data;
@@ -19,6 +20,13 @@ contract DataReceiver is InterledgerReceiverInterface {
         emit InterledgerEventAccepted(nonce);
     }
 
+    function interledgerReceiveBatch(uint256[] memory nonces, bytes[] memory data) public {
+        require(nonces.length == data.length, "nonces and data differ in length");
+        for (uint256 i = 0; i < nonces.length; i++) {
+            interledgerReceive(nonces[i], data[i]);
+        }
+    }
+
     function interledgerError(uint256 nonce, uint256 reason) public {
         // currently only interface, implement functionality
     }
@@ -1,11 +1,11 @@
 pragma solidity ^0.5.0;
 
-import "./InterledgerSenderInterface.sol";
+import "./InterledgerBatchSenderInterface.sol";
 
 /**
  * This is a sample contract as data sender used for develpment and testing
  */
-contract DataSender is InterledgerSenderInterface {
+contract DataSender is InterledgerBatchSenderInterface {
     uint256 public id;
 
     /**
@@ -40,4 +40,17 @@ contract DataSender is InterledgerSenderInterface {
     function interledgerAbort(uint256 identity, uint256 reason) public {
 
     }
+
+    function interledgerCommitBatch(uint256[] memory ids) public {
+        for (uint256 i = 0; i < ids.length; i++) {
+            interledgerCommit(ids[i]);
+        }
+    }
+
+    function interledgerAbortBatch(uint256[] memory ids, uint256[] memory reasons) public {
+        require(ids.length == reasons.length, "ids and reasons differ in length");
+        for (uint256 i = 0; i < ids.length; i++) {
+            interledgerAbort(ids[i], reasons[i]);
+        }
+    }
 }
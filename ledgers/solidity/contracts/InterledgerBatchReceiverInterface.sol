@@ -0,0 +1,18 @@
+pragma solidity ^0.5.0;
+pragma experimental ABIEncoderV2;
+
+import "./InterledgerReceiverInterface.sol";
+
+/**
+ * This is the abstract interface to be implemented by data receivers which
+ * accept many data items in one transaction
+ */
+contract InterledgerBatchReceiverInterface is InterledgerReceiverInterface {
+    /**
+     * @dev Function to receive many data items from Interledger at once,
+     *      emits InterledgerEventAccepted or InterledgerEventRejected for each
+     * @param nonces The unique identifiers of data events
+     * @param data The actual data contents encoded in bytes, in the order of the nonces
+     */
+    function interledgerReceiveBatch(uint256[] memory nonces, bytes[] memory data) public;
+}
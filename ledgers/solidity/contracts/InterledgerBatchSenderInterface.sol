@@ -0,0 +1,22 @@
+pragma solidity ^0.5.0;
+
+import "./InterledgerSenderInterface.sol";
+
+/**
+ * This is the abstract interface to be implemented by data senders which
+ * accept the results of many data sending events in one transaction
+ */
+contract InterledgerBatchSenderInterface is InterledgerSenderInterface {
+    /**
+     * @dev Function that will be called when the recipient has accepted the data of many events
+     * @param ids The identifiers of data sending events
+     */
+    function interledgerCommitBatch(uint256[] memory ids) public;
+
+    /**
+     * @dev Function that will be called when the recipient has rejected the data of many events
+     * @param ids The identifiers of data sending events
+     * @param reasons The error codes indicating the reasons for failure, in the order of the ids
+     */
+    function interledgerAbortBatch(uint256[] memory ids, uint256[] memory reasons) public;
+}
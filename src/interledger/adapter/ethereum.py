@@ -1,16 +1,28 @@
 import asyncio
-import functools
+import sys
 
+from collections import OrderedDict
 from contextlib import suppress
-from functools import partial
 from typing import (
     Dict,
     List,
+    Set,
+    Tuple,
 )
 
 import web3
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
 from web3.middleware import geth_poa_middleware
 
+from .ethereum_abi import ContractFunction, SelectorIndex, param_matches, selector_of
+from .ethereum_cache import BlockCache, TransactionIndex
+from .ethereum_chain import CanonicalChain, PendingEvents
+from .ethereum_events import AdaptiveInterval, LogSubscription
+from .ethereum_head import ChainHead
+from .ethereum_rpc import EthereumRPC
+from .ethereum_signer import Signer
+from .ethereum_tx import NonceManager, ReceiptTracker, TransactionFactory
 from .interfaces import Initiator, Responder, MultiResponder, ErrorCode, LedgerType
 from ..configs import EthereumConfig
 from ..transfer import Transfer
@@ -19,86 +31,197 @@ from ..utils import generate_hash_id, Logger
 
 Web3 = web3.Web3
 
+# batch functions of the contracts implementing InterledgerBatchSenderInterface
+# and InterledgerBatchReceiverInterface
+COMMIT_BATCH = 'interledgerCommitBatch(uint256[])'
+ABORT_BATCH = 'interledgerAbortBatch(uint256[],uint256[])'
+RECEIVE_BATCH = 'interledgerReceiveBatch(uint256[],bytes[])'
+
 
 # Web3 util
 class Web3Initializer:
     """This provides proper web3 wrapper for a component
     """
-    def __init__(self, url: str, port=None, poa=None, ipc_path=None):
+    def __init__(self, url: str, port=None, poa=None, ipc_path=None, async_rpc=False, rpc_concurrency=16,
+                 rpc_batch=False, rpc_batch_window=0, rpc_batch_size=100):
+
+        path = url
+        if port:
+            path += ':' + str(port)
+        self.endpoint = ipc_path or path
 
-        if ipc_path:
-            self.web3 = Web3(Web3.IPCProvider(ipc_path))
+        if self.endpoint in EthereumRPC.connections:
+            # the components connected to the same node share its provider
+            self.web3 = EthereumRPC.connections[self.endpoint].web3
         else:
-            protocol = url.split(":")[0].lower()
-            path = url
-            if port:
-                path += ':' + str(port)
-            if protocol in ("http", "https"):
-                self.web3 = Web3(Web3.HTTPProvider(path))
-            elif protocol in ("ws", "wss"):
-                self.web3 = Web3(Web3.WebsocketProvider(path))
+            if ipc_path:
+                self.web3 = Web3(Web3.IPCProvider(ipc_path))
             else:
-                raise ValueError("Unsupported Web3 protocol")
-        if poa:
-            self.web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
-    def isUnlocked(self, account):
-        try:
-            self.web3.eth.sign(account, 1)
-        except Exception as e:
-            return False
-        return True
+                protocol = url.split(":")[0].lower()
+                if protocol in ("http", "https"):
+                    self.web3 = Web3(Web3.HTTPProvider(path))
+                elif protocol in ("ws", "wss"):
+                    self.web3 = Web3(Web3.WebsocketProvider(path))
+                else:
+                    raise ValueError("Unsupported Web3 protocol")
+            if poa:
+                self.web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+        self.rpc = EthereumRPC.connect(
+            self.web3, self.endpoint, rpc_concurrency, async_rpc, poa, rpc_batch, rpc_batch_window, rpc_batch_size
+        )
 
 
 class EthereumCommonMixin:
 
+    async def call(self, func, *args, **kwargs):
+        """Run a blocking web3 call off the event loop, see EthereumRPC
+        """
+        return await self.rpc.run(func, *args, **kwargs)
+
     async def _get_block(self, block_number: int, full_transactions=False):
         if type(block_number) != int:
             raise TypeError('value of "block_number" must be type of int')
         # Logger.log('block_number:', block_number)
-        response = await asyncio.get_event_loop().run_in_executor(
-            None, partial(self.web3.eth.get_block, block_number, full_transactions=full_transactions)
-        )
+        response = await self.rpc.get_block(block_number, full_transactions=full_transactions)
         return response
 
     async def get_block(self, block_number: int, full_transactions=False):
-        if not hasattr(self, 'block_cache'):
-            self.block_cache = {}
-        key = (block_number, full_transactions)
-        if key not in self.block_cache:
-            self.block_cache[key] = await self._get_block(block_number, full_transactions)
-        return self.block_cache[key]
+        block = self.block_cache.get(block_number, full_transactions)
+        if block is None:
+            block = await self._get_block(block_number, full_transactions)
+            self.block_cache.put(block_number, full_transactions, block)
+        return block
+
+    async def send_transaction(self, function_call):
+        """Send the contract call from the minter with the signer chosen at startup, see Signer
+        """
+        return await self.signer.send(function_call)
+
+    async def send_batch(self, function_call) -> dict:
+        """Send a batch function call and wait for the receipt
+
+        :rtype: dict {
+            'status': bool,
+            'tx_hash': str,
+            'blockNumber': int, # without errors
+            'receipt': dict,    # without errors
+            'exception': object,# only with errors
+            'error_code': Enum, # only with errors
+            'message': str      # only with errors
+        }
+        """
+        tx_hash = None
+        try:
+            tx_hash = await self.send_transaction(function_call)
+            tx_receipt = await self.wait_for_receipt(tx_hash)
+        except web3.exceptions.TimeExhausted as e:
+            return {"status": False,
+                    "error_code": ErrorCode.TIMEOUT,
+                    "message": "Timeout after sending the transaction",
+                    "tx_hash": tx_hash.hex(),
+                    "exception": e}
+        except ValueError as e:
+            return {"status": False,
+                    "error_code": ErrorCode.TRANSACTION_FAILURE,
+                    "message": e.__str__(),
+                    "tx_hash": tx_hash.hex() if tx_hash else None,
+                    "exception": e}
+        if not tx_receipt['status']:
+            return {"status": False,
+                    "error_code": ErrorCode.TRANSACTION_FAILURE,
+                    "message": "Error in the transaction",
+                    "tx_hash": tx_hash.hex()}
+        return {"status": True,
+                "tx_hash": tx_hash.hex(),
+                "blockNumber": tx_receipt['blockNumber'],
+                "receipt": tx_receipt}
+
+    def has_function(self, signature: str) -> bool:
+        return signature in self.selectors.signatures
+
+    async def wait_for_receipt(self, tx_hash):
+        """Receipt of the transaction once its block is final, see confirmation_depth
+        """
+        try:
+            while True:
+                tx_receipt = await self.receipt_tracker.wait(tx_hash, self.timeout)
+                if not self.chain.confirmation_depth:
+                    break
+                try:
+                    final = await self.chain.wait_final(tx_receipt['blockNumber'], tx_receipt['blockHash'], self.timeout)
+                except asyncio.TimeoutError:
+                    raise web3.exceptions.TimeExhausted(
+                        f'Block of transaction {HexBytes(tx_hash).hex()} is not final after {self.timeout} seconds'
+                    )
+                if final:
+                    break
+                # wait for the transaction to be included again
+                Logger.log(f'transaction {HexBytes(tx_hash).hex()} was in orphaned block {tx_receipt["blockNumber"]}')
+        except web3.exceptions.TimeExhausted:
+            await self.nonce_manager.recover(tx_hash)
+            raise
+        self.nonce_manager.confirm(tx_hash)
+        self.tx_factory.check(tx_hash, tx_receipt)
+        return tx_receipt
+
+    async def get_block_calls(self, block_number: int, selectors: Set[str] = None) -> List[dict]:
+        """Decoded calls to the contract in the block, see TransactionIndex
+        """
+        block = await self.get_block(block_number, full_transactions=True)
+        return self.transaction_index.get_calls(block, self.block_cache.is_final(block_number), selectors)
 
     async def find_function_call(self,
                                 function_signature: str,
                                 function_params: dict,
                                 until: int = None) -> dict:
 
-        function = self.contract.get_function_by_signature(function_signature)
-        start_block = self.web3.eth.blockNumber
+        function = self.selectors[function_signature]
+        call = self.transaction_index.find(function.name, function_params, until)
+        if call:
+            return call
+
+        # scan the blocks missing from the index, newest first
+        start_block = await self.head.get()
+        self.block_cache.update_head(start_block)
         end_block = 0
 
+        block_numbers = []
         for block_number in range(start_block, end_block-1, -1):
-            block = await self.get_block(block_number, full_transactions=True)
+            if self.transaction_index.is_indexed(block_number):
+                if until is not None and self.transaction_index.timestamp_of(block_number) < until:
+                    break
+                continue
+            block_numbers.append(block_number)
+            if len(block_numbers) == self.scan_concurrency:
+                call, done = await self._scan_blocks(block_numbers, function, function_params, until)
+                if call or done:
+                    return call
+                block_numbers = []
+        call, _ = await self._scan_blocks(block_numbers, function, function_params, until)
+        return call
+
+    async def _scan_blocks(self,
+                           block_numbers: List[int],
+                           function: ContractFunction,
+                           function_params: dict,
+                           until: int = None) -> Tuple[dict, bool]:
+        blocks = await asyncio.gather(*[
+            self.get_block(block_number, full_transactions=True) for block_number in block_numbers
+        ])
+        for block in blocks:  # newest first
             if until is not None and block['timestamp'] < until:
-                break
-            for tx in block.transactions:
-                if tx.to == self.contract.address:
-                    # decode the input data of the transaction
-                    tx_function, tx_parameters = self.contract.decode_function_input(tx.input)
-                    is_match = (
-                        str(tx_function) == str(function) and
-                        all(k in tx_parameters and tx_parameters[k] == v for k, v in function_params.items())
-                    )
-                    if is_match:
-                        return {
-                            'blockID': block_number,
-                            'txID': tx.hash.hex(),
-                            'txFunc': str(tx_function),
-                            'txParams': tx_parameters,
-                        }
-
-        return {}
+                return {}, True
+            calls = self.transaction_index.get_calls(
+                block, self.block_cache.is_final(block['number']), {function.selector}
+            )
+            for call in calls:
+                is_match = (
+                    call['txFunc'] == function.name and
+                    all(k in call['txParams'] and param_matches(call['txParams'][k], v) for k, v in function_params.items())
+                )
+                if is_match:
+                    return call, True
+        return {}, False
 
 
 # Initiator implementation
@@ -109,20 +232,61 @@ class EthereumInitiator(Web3Initializer, EthereumCommonMixin, Initiator):
         """
         :param DIBEthereumConfig cfg: config object
         """
-        Web3Initializer.__init__(self, cfg.url, cfg.port, cfg.poa, cfg.ipc_path)
+        Web3Initializer.__init__(self, cfg.url, cfg.port, cfg.poa, cfg.ipc_path, cfg.async_rpc, cfg.rpc_concurrency,
+                                 cfg.rpc_batch, cfg.rpc_batch_window, cfg.rpc_batch_size)
         self.contract = self.web3.eth.contract(abi=cfg.contract_abi, address=cfg.contract_address)
-        self.last_block = self.web3.eth.blockNumber
-        self.private_key = cfg.private_key
+        self.head = ChainHead.for_rpc(self.rpc, cfg.head_poll_interval, cfg.event_subscription)
+        self.last_block = self.head.current_sync()
         self.minter = cfg.minter
-        self.password = cfg.password
         self.timeout = 120
+        self.block_cache = BlockCache.for_endpoint(self.endpoint, cfg.block_cache_size, cfg.block_cache_ttl, cfg.confirmation_depth)
+        self.block_cache.update_head(self.last_block)
+        self.selectors = SelectorIndex(self.contract)
+        self.transaction_index = TransactionIndex(self.contract.address, self.selectors, cfg.transaction_index_blocks)
+        self.scan_concurrency = cfg.scan_concurrency
+        self.nonce_manager = NonceManager.for_account(self.rpc, self.minter)
+        self.tx_factory = TransactionFactory.for_account(self.rpc, self.minter, cfg.gas_margin, cfg.fee_refresh_interval)
+        self.signer = Signer.for_account(
+            self.rpc, self.minter, self.tx_factory, self.nonce_manager, cfg.private_key, cfg.password, cfg.unlock_lease
+        )
+        self.receipt_tracker = ReceiptTracker.for_rpc(self.rpc, cfg.receipt_poll_interval, self.head)
+        self.chain = CanonicalChain.for_rpc(self.rpc, self.head, cfg.confirmation_depth)
         self.ledger_type = LedgerType.ETHEREUM
 
-        # create event filter
-        self.filt = self.contract.events.InterledgerEventSending().createFilter(fromBlock = 'latest')
-        self.filt.get_all_entries()
+        self.event_poll_interval = AdaptiveInterval(cfg.event_poll_min_interval, cfg.event_poll_max_interval)
+        self.event_topics = [
+            HexBytes(event_abi_to_log_topic(self.contract.events.InterledgerEventSending._get_event_abi())).hex()
+        ]
+        # events are returned from this block on, see get_checkpoint()
+        self.event_checkpoint = self.last_block + 1
+        # every event up to this block has been returned after the next poll
+        self.covered_head = self.last_block
+        # events replayed by resume_from(), and the last block they cover
+        self.replayed_events = []
+        self.replayed_until = -1
+        self.log_window = cfg.log_window
+        # events wait in blocks not yet final
+        self.pending_events = PendingEvents(self.chain, self.get_block_events) if cfg.confirmation_depth > 0 else None
+
+        self.event_subscription = None
+        if cfg.event_subscription and self.endpoint.split(':')[0].lower() in ('ws', 'wss'):
+            # push the events over the WebSocket
+            self.event_subscription = LogSubscription(
+                self.endpoint, self.rpc, self.contract.address, self.event_topics, self.event_checkpoint,
+                log_window=self.log_window,
+            )
+        else:
+            # create event filter
+            self.filt = self.contract.events.InterledgerEventSending().createFilter(fromBlock = 'latest')
+            self.filt.get_all_entries()
 
         self.monitor_confirmations_cursor = self.last_block
+        self.monitor_max_blocks = cfg.monitor_max_blocks
+        self.monitor_confirmations_lag = 0
+        confirmation_signatures = ['interledgerCommit(uint256)', 'interledgerAbort(uint256,uint256)']
+        confirmation_signatures += [s for s in (COMMIT_BATCH, ABORT_BATCH) if self.has_function(s)]
+        self.confirmation_selectors = self.selectors.selectors_of(confirmation_signatures)
+        self.confirmation_functions = {self.selectors[signature].name for signature in confirmation_signatures}
 
     # Initiator functions
     async def listen_for_events(self) -> list:
@@ -131,12 +295,82 @@ class EthereumInitiator(Web3Initializer, EthereumCommonMixin, Initiator):
         :returns: The event transfer lists
         :rtype: list
         """
-        entries = self.filt.get_new_entries()
+        # the events of the blocks up to the head seen before the previous
+        # poll have arrived by the end of this one
+        covered, self.covered_head = self.covered_head, self.head.number
+        if self.event_subscription and not self.event_subscription.live:
+            covered = -1  # the missed events are replayed after the reconnect
+        entries = await self.get_new_events()
+        if self.pending_events is not None:
+            # only the events of final blocks, see confirmation_depth
+            entries = await self.pending_events.confirm(entries)
+            covered = min(covered, self.chain.tip - self.chain.confirmation_depth, self.pending_events.first_block() - 1)
+        return self.advance_checkpoint(entries, covered)
+
+    async def get_new_events(self) -> list:
+        if self.replayed_events:
+            entries, self.replayed_events = self.replayed_events, []
+            return entries
+
+        if self.event_subscription:
+            logs = await self.event_subscription.get(timeout=self.event_poll_interval.maximum)
+            event = self.contract.events.InterledgerEventSending()
+            return [event.processLog(log) for log in logs]
+
+        entries = await self.call(self.filt.get_new_entries)
         if len(entries) == 0:
-            await asyncio.sleep(0.1)
-            entries = self.filt.get_new_entries()
+            await asyncio.sleep(self.event_poll_interval.current)
+            self.event_poll_interval.idle()
+            entries = await self.call(self.filt.get_new_entries)
+        if entries:
+            self.event_poll_interval.busy()
+        # the filter may return events resume_from() replayed already
+        return [e for e in entries if e['blockNumber'] > self.replayed_until]
+
+    async def get_block_events(self, block_hash) -> list:
+        """Events of the block, for the blocks replacing the ones of a reorg
+        """
+        logs = await self.rpc.get_logs({
+            'address': self.contract.address,
+            'blockHash': block_hash,
+            'topics': self.event_topics,
+        })
+        event = self.contract.events.InterledgerEventSending()
+        return [event.processLog(log) for log in logs]
+
+    def advance_checkpoint(self, entries: list, covered: int = -1) -> list:
+        # a block may be returned in parts, so the checkpoint is the block
+        # of the latest event rather than the one after it
+        for entry in entries:
+            self.event_checkpoint = max(self.event_checkpoint, entry['blockNumber'])
+        # blocks without events move the checkpoint too, so that a restart
+        # does not replay events older than the journal remembers
+        self.event_checkpoint = max(self.event_checkpoint, covered + 1)
         return entries
 
+    def get_checkpoint(self) -> int:
+        return self.event_checkpoint
+
+    async def resume_from(self, checkpoint: int):
+        self.event_checkpoint = checkpoint
+        if self.event_subscription:
+            # the subscription replays the missed events itself with eth_getLogs
+            self.event_subscription.cursor = (checkpoint - 1, sys.maxsize)
+            return
+
+        head = await self.head.get()
+        event = self.contract.events.InterledgerEventSending()
+        for start in range(checkpoint, head + 1, self.log_window):
+            logs = await self.rpc.get_logs({
+                'address': self.contract.address,
+                'fromBlock': start,
+                'toBlock': min(start + self.log_window - 1, head),
+                'topics': self.event_topics,
+            })
+            self.replayed_events.extend(event.processLog(log) for log in logs)
+        self.replayed_until = head
+        Logger.log('replaying', len(self.replayed_events), 'events from block', checkpoint)
+
     async def commit_sending(self, id: str, data: bytes = None) -> dict:
         """Initiate the commit operation to the connected ledger.
 
@@ -155,50 +389,13 @@ class EthereumInitiator(Web3Initializer, EthereumCommonMixin, Initiator):
         """
         commit_tx_hash = None
         try:
-            # unlock using private key
-            if self.private_key and not self.isUnlocked(self.minter): # needs to unlock with private key
-                if data: # pass data to interledgerCommit if it is available
-                    transaction = self.contract.functions \
-                        .interledgerCommit(Web3.toInt(text=id), data) \
-                        .buildTransaction({'from': self.minter})
-                else:
-                    transaction = self.contract.functions \
-                        .interledgerCommit(Web3.toInt(text=id)) \
-                        .buildTransaction({'from': self.minter})
-                transaction.update({'nonce': self.web3.eth.getTransactionCount(self.minter)})
-                signed_tx = self.web3.eth.account.signTransaction(transaction, self.private_key)
-                commit_tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-            # unlock using password
-            elif self.password is not None:
-                unlock = self.web3.geth.personal.unlockAccount(self.minter, self.password, 0) # unlock indefinitely
-                if not unlock:
-                    return {"status": False,
-                            "error_code": ErrorCode.TRANSACTION_FAILURE,
-                            "message": "Wrong password",
-                            "commit_tx_hash": None}
-                if data: # pass data to interledgerCommit if it is available
-                    commit_tx_hash = self.contract.functions \
-                        .interledgerCommit(Web3.toInt(text=id), data) \
-                        .transact({'from': self.minter}) # type uint256 required for id in the smart contract
-                else:
-                    commit_tx_hash = self.contract.functions \
-                        .interledgerCommit(Web3.toInt(text=id)) \
-                        .transact({'from': self.minter}) # type uint256 required for id in the smart contract
-                # lock the account again
-                self.web3.geth.personal.lockAccount(self.minter)
-            # no need to unlock
+            if data: # pass data to interledgerCommit if it is available
+                function_call = self.contract.functions.interledgerCommit(Web3.toInt(text=id), data)
             else:
-                if data: # pass data to interledgerCommit if it is available
-                    commit_tx_hash = self.contract.functions \
-                        .interledgerCommit(Web3.toInt(text=id), data) \
-                        .transact({'from': self.minter}) # type uint256 required for id in the smart contract
-                else:
-                    commit_tx_hash = self.contract.functions \
-                        .interledgerCommit(Web3.toInt(text=id)) \
-                        .transact({'from': self.minter}) # type uint256 required for id in the smart contract
+                function_call = self.contract.functions.interledgerCommit(Web3.toInt(text=id)) # type uint256 required for id in the smart contract
+            commit_tx_hash = await self.send_transaction(function_call)
             # tx_receipt = self.web3.eth.waitForTransactionReceipt(commit_tx_hash, timeout=self.timeout)
-            tx_receipt = await asyncio.get_event_loop().run_in_executor(
-                None, functools.partial(self.web3.eth.waitForTransactionReceipt, commit_tx_hash, timeout=self.timeout))
+            tx_receipt = await self.wait_for_receipt(commit_tx_hash)
 
             if tx_receipt['status']:
                 return {"commit_status": True,
@@ -222,7 +419,7 @@ class EthereumInitiator(Web3Initializer, EthereumCommonMixin, Initiator):
             return {"commit_status": False,
                     "commit_error_code": ErrorCode.TRANSACTION_FAILURE,
                     "commit_message": e.__str__(),
-                    "commit_tx_hash": commit_tx_hash.hex(),
+                    "commit_tx_hash": commit_tx_hash.hex() if commit_tx_hash else None,
                     "exception": e}
 
     async def abort_sending(self, id: str, reason: int) -> dict:
@@ -242,35 +439,11 @@ class EthereumInitiator(Web3Initializer, EthereumCommonMixin, Initiator):
         """
         abort_tx_hash = None
         try:
-            # unlock using the private key
-            if self.private_key and not self.isUnlocked(self.minter): # needs to unlock with private key
-                transaction = self.contract.functions \
-                    .interledgerAbort(Web3.toInt(text=id), reason) \
-                    .buildTransaction({'from': self.minter})
-                transaction.update({'nonce': self.web3.eth.getTransactionCount(self.minter)})
-                signed_tx = self.web3.eth.account.signTransaction(transaction, self.private_key)
-                abort_tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-            # unlock using password
-            elif self.password is not None:
-                unlock = self.web3.geth.personal.unlockAccount(self.minter, self.password, 0) # unlock indefinitely
-                if not unlock:
-                    return {"status": False,
-                            "error_code": ErrorCode.TRANSACTION_FAILURE,
-                            "message": "Wrong password",
-                            "abort_tx_hash": None}
-                abort_tx_hash = self.contract.functions \
-                    .interledgerAbort(Web3.toInt(text=id), reason) \
-                    .transact({'from': self.minter}) # type uint256 required for id in the smart contract
-                # lock the account again
-                self.web3.geth.personal.lockAccount(self.minter)
-            # no need to unlock
-            else:
-                abort_tx_hash = self.contract.functions \
-                    .interledgerAbort(Web3.toInt(text=id), reason) \
-                    .transact({'from': self.minter}) # type uint256 required for id in the smart contract
+            abort_tx_hash = await self.send_transaction(
+                self.contract.functions.interledgerAbort(Web3.toInt(text=id), reason) # type uint256 required for id in the smart contract
+            )
             # tx_receipt = self.web3.eth.waitForTransactionReceipt(abort_tx_hash, timeout=self.timeout)
-            tx_receipt = await asyncio.get_event_loop().run_in_executor(
-                None, functools.partial(self.web3.eth.waitForTransactionReceipt, abort_tx_hash, timeout=self.timeout))
+            tx_receipt = await self.wait_for_receipt(abort_tx_hash)
 
             if tx_receipt['status']:
                 return {"abort_status": True,
@@ -294,9 +467,39 @@ class EthereumInitiator(Web3Initializer, EthereumCommonMixin, Initiator):
             return {"abort_status": False,
                     "abort_error_code": ErrorCode.TRANSACTION_FAILURE,
                     "abort_message": e.__str__(),
-                    "abort_tx_hash": abort_tx_hash.hex(),
+                    "abort_tx_hash": abort_tx_hash.hex() if abort_tx_hash else None,
                     "exception": e}
 
+    async def commit_sending_batch(self, ids: List[str]) -> List[dict]:
+        """Commit many transfers with one interledgerCommitBatch() transaction,
+        if the contract has it, see commit_sending() for the results
+        """
+        if not self.has_function(COMMIT_BATCH):
+            return await super().commit_sending_batch(ids)
+        result = await self.send_batch(
+            self.contract.functions.interledgerCommitBatch([Web3.toInt(text=id) for id in ids])
+        )
+        return [self.batch_result('commit', result) for _ in ids]
+
+    async def abort_sending_batch(self, ids: List[str], reasons: List[int]) -> List[dict]:
+        """Abort many transfers with one interledgerAbortBatch() transaction,
+        if the contract has it, see abort_sending() for the results
+        """
+        if not self.has_function(ABORT_BATCH):
+            return await super().abort_sending_batch(ids, reasons)
+        result = await self.send_batch(
+            self.contract.functions.interledgerAbortBatch([Web3.toInt(text=id) for id in ids], list(reasons))
+        )
+        return [self.batch_result('abort', result) for _ in ids]
+
+    @staticmethod
+    def batch_result(prefix: str, result: dict) -> dict:
+        # 'status' -> 'commit_status' etc. like in the results of commit_sending() and abort_sending()
+        return {
+            (k if k in ('blockNumber', 'exception') else f'{prefix}_{k}'): v
+            for k, v in result.items() if k != 'receipt'
+        }
+
     def generate_transfer_id(self, event: dict) -> str:
         # If two events are logged in one transaction, `transactionIndex` is going to be the same.
         # Using `transactionHash` and `logIndex` should enable you to identify unique event logs.
@@ -323,85 +526,94 @@ class EthereumInitiator(Web3Initializer, EthereumCommonMixin, Initiator):
         return transfer
 
     async def check_confirmation(self, tx: Dict[str, str]) -> str:
-        tx = self.web3.eth.get_transaction(tx['txID'])
-        tx_function, tx_parameters = self.contract.decode_function_input(tx["input"])
+        tx = await self.rpc.get_transaction(tx['txID'])
+        selector = selector_of(tx["input"])
 
-        # get the object of function that should have been called
-        commit_function = self.contract.get_function_by_signature('interledgerCommit(uint256)')
-        abort_function = self.contract.get_function_by_signature('interledgerAbort(uint256,uint256)')
+        if selector == self.selectors['interledgerCommit(uint256)'].selector:
+            return 'interledgerCommit'
+
+        if selector == self.selectors['interledgerAbort(uint256,uint256)'].selector:
+            return 'interledgerAbort'
 
-        if str(tx_function) == str(commit_function):
+        if self.has_function(COMMIT_BATCH) and selector == self.selectors[COMMIT_BATCH].selector:
             return 'interledgerCommit'
 
-        if str(tx_function) == str(abort_function):
+        if self.has_function(ABORT_BATCH) and selector == self.selectors[ABORT_BATCH].selector:
             return 'interledgerAbort'
 
         return ''
 
     async def get_interledgerCommit_tx(self, transfer: Transfer):
-        return await self.find_function_call(
+        call = await self.find_function_call(
             'interledgerCommit(uint256)',
             {'id': int(transfer.initiator_id)},
             until=transfer.initiation_timestamp
         )
+        if not call and self.has_function(COMMIT_BATCH):
+            call = await self.find_function_call(
+                COMMIT_BATCH,
+                {'ids': int(transfer.initiator_id)},
+                until=transfer.initiation_timestamp
+            )
+        return call
 
     async def get_interledgerAbort_tx(self, transfer: Transfer):
-        return await self.find_function_call(
+        call = await self.find_function_call(
             'interledgerAbort(uint256,uint256)',
             {'id': int(transfer.initiator_id)},
             until=transfer.initiation_timestamp
         )
+        if not call and self.has_function(ABORT_BATCH):
+            call = await self.find_function_call(
+                ABORT_BATCH,
+                {'ids': int(transfer.initiator_id)},
+                until=transfer.initiation_timestamp
+            )
+        return call
 
     async def monitor_confirmations(self) -> List[str]:
-        function_signatures = [
-            str(self.contract.get_function_by_signature('interledgerCommit(uint256)')),
-            str(self.contract.get_function_by_signature('interledgerAbort(uint256,uint256)')),
-        ]
-        block = await self.get_block(
-            self.monitor_confirmations_cursor,
-            full_transactions=True
-        )
-        self.monitor_confirmations_cursor = min(
-            self.monitor_confirmations_cursor + 1,
-            self.web3.eth.blockNumber
-        )
+        head = await self.head.get()
+        self.block_cache.update_head(head)
+
+        # catch up with the head, up to monitor_max_blocks blocks per call
+        start = self.monitor_confirmations_cursor
+        end = min(head, start + self.monitor_max_blocks - 1)
+        self.monitor_confirmations_lag = max(head - start + 1, 0)
+        if self.monitor_confirmations_lag > self.scan_concurrency:
+            Logger.log('confirmations lag', self.monitor_confirmations_lag, 'blocks behind the head')
+
         initiator_ids = []
-        for tx in block.transactions:
-            if tx.to == self.contract.address:
-                # decode the input data of the transaction
-                tx_function, tx_parameters = self.contract.decode_function_input(tx.input)
-                if str(tx_function) in function_signatures:
-                    initiator_ids.append(str(tx_parameters['id']))
+        for window in range(start, end + 1, self.scan_concurrency):
+            window_calls = await asyncio.gather(*[
+                self.get_block_calls(block_number, self.confirmation_selectors)
+                for block_number in range(window, min(window + self.scan_concurrency, end + 1))
+            ])
+            for calls in window_calls:  # in block order
+                for call in calls:
+                    if call['txFunc'] in self.confirmation_functions:
+                        if 'ids' in call['txParams']:  # batch
+                            initiator_ids.extend(str(id) for id in call['txParams']['ids'])
+                        else:
+                            initiator_ids.append(str(call['txParams']['id']))
+        self.monitor_confirmations_cursor = max(start, end + 1)
         return initiator_ids
 
+    def stats(self) -> dict:
+        return {
+            'endpoint': self.endpoint,
+            'account': self.tx_factory.account,
+            'monitor_confirmations_lag': self.monitor_confirmations_lag,
+            'block_cache': self.block_cache.stats(),
+            'rpc': self.rpc.stats(),
+            'transactions': self.tx_factory.stats(),
+            'chain': self.chain.stats(),
+            'pending_events': self.pending_events.stats() if self.pending_events is not None else None,
+        }
+
     async def report_error(self, id: str, reason: int):
 
-        # unlock using the private key
-        if self.private_key and not self.isUnlocked(self.minter): # needs to unlock with private key
-            transaction = self.contract.functions \
-                .interledgerError(Web3.toInt(text=id), reason) \
-                .buildTransaction({'from': self.minter})
-            transaction.update({'nonce': self.web3.eth.getTransactionCount(self.minter)})
-            signed_tx = self.web3.eth.account.signTransaction(transaction, self.private_key)
-            abort_tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-        # unlock using password
-        elif self.password is not None:
-            unlock = self.web3.geth.personal.unlockAccount(self.minter, self.password, 0) # unlock indefinitely
-            if not unlock:
-                raise Exception("Wrong password")
-            abort_tx_hash = self.contract.functions \
-                .interledgerError(Web3.toInt(text=id), reason) \
-                .transact({'from': self.minter}) # type uint256 required for id in the smart contract
-            # lock the account again
-            self.web3.geth.personal.lockAccount(self.minter)
-        # no need to unlock
-        else:
-            abort_tx_hash = self.contract.functions \
-                .interledgerError(Web3.toInt(text=id), reason) \
-                .transact({'from': self.minter}) # type uint256 required for id in the smart contract
-        return await asyncio.get_event_loop().run_in_executor(
-            None, functools.partial(self.web3.eth.waitForTransactionReceipt, abort_tx_hash, timeout=self.timeout)
-        )
+        abort_tx_hash = await self.send_transaction(self.contract.functions.interledgerError(Web3.toInt(text=id), reason))
+        return await self.wait_for_receipt(abort_tx_hash)
 
 # Responder implementation
 class EthereumResponder(Web3Initializer, EthereumCommonMixin, Responder):
@@ -413,15 +625,32 @@ class EthereumResponder(Web3Initializer, EthereumCommonMixin, Responder):
         """
         :param DIBEthereumConfig cfg: config object
         """
-        Web3Initializer.__init__(self, cfg.url, cfg.port, cfg.poa, cfg.ipc_path)
+        Web3Initializer.__init__(self, cfg.url, cfg.port, cfg.poa, cfg.ipc_path, cfg.async_rpc, cfg.rpc_concurrency,
+                                 cfg.rpc_batch, cfg.rpc_batch_window, cfg.rpc_batch_size)
         self.contract = self.web3.eth.contract(abi=cfg.contract_abi, address=cfg.contract_address)
-        self.last_block = self.web3.eth.blockNumber
-        self.private_key = cfg.private_key
+        self.head = ChainHead.for_rpc(self.rpc, cfg.head_poll_interval, cfg.event_subscription)
+        self.last_block = self.head.current_sync()
         self.minter = cfg.minter
-        self.password = cfg.password
         self.timeout=120
+        self.block_cache = BlockCache.for_endpoint(self.endpoint, cfg.block_cache_size, cfg.block_cache_ttl, cfg.confirmation_depth)
+        self.block_cache.update_head(self.last_block)
+        self.selectors = SelectorIndex(self.contract)
+        self.transaction_index = TransactionIndex(self.contract.address, self.selectors, cfg.transaction_index_blocks)
+        self.scan_concurrency = cfg.scan_concurrency
+        self.nonce_manager = NonceManager.for_account(self.rpc, self.minter)
+        self.tx_factory = TransactionFactory.for_account(self.rpc, self.minter, cfg.gas_margin, cfg.fee_refresh_interval)
+        self.signer = Signer.for_account(
+            self.rpc, self.minter, self.tx_factory, self.nonce_manager, cfg.private_key, cfg.password, cfg.unlock_lease
+        )
+        self.receipt_tracker = ReceiptTracker.for_rpc(self.rpc, cfg.receipt_poll_interval, self.head)
+        self.chain = CanonicalChain.for_rpc(self.rpc, self.head, cfg.confirmation_depth)
         self.ledger_type = LedgerType.ETHEREUM
 
+        self.response_events = None
+        self.response_cache = OrderedDict()  # nonce -> event name
+        self.response_cache_size = cfg.response_cache_size
+        self.log_window = cfg.log_window
+
     async def send_data(self, nonce: str, data: bytes) -> dict:
         """Initiate the interledger receive operation to the connected ledger.
 
@@ -444,35 +673,7 @@ class EthereumResponder(Web3Initializer, EthereumCommonMixin, Responder):
         tx_hash = None
         tx_receipt = None
         try:
-            # unlock using private_key
-            if self.private_key and not self.isUnlocked(self.minter): # needs to unlock with private key
-                #print("unlock with priv_key")
-                transaction = self.contract.functions \
-                    .interledgerReceive(Web3.toInt(text=nonce), data) \
-                    .buildTransaction({'from': self.minter})
-                transaction.update({'nonce': self.web3.eth.getTransactionCount(self.minter)})
-                signed_tx = self.web3.eth.account.signTransaction(transaction, self.private_key)
-                tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-            # unlock using password
-            elif self.password is not None:
-                #print("unlock with password")
-                unlock = self.web3.geth.personal.unlockAccount(self.minter, self.password, 0) # unlock indefinitely
-                if not unlock:
-                    return {"status": False,
-                            "error_code": ErrorCode.TRANSACTION_FAILURE,
-                            "message": "Wrong password",
-                            "tx_hash": None}
-                tx_hash = self.contract.functions \
-                    .interledgerReceive(Web3.toInt(text=nonce), data) \
-                    .transact({'from': self.minter})
-                # lock the account again
-                self.web3.geth.personal.lockAccount(self.minter)
-            # no need to unlock
-            else:
-                #print("default")
-                tx_hash = self.contract.functions \
-                    .interledgerReceive(Web3.toInt(text=nonce), data) \
-                    .transact({'from': self.minter})
+            tx_hash = await self.send_transaction(self.contract.functions.interledgerReceive(Web3.toInt(text=nonce), data))
             # tx_receipt = self.web3.eth.waitForTransactionReceipt(tx_hash, timeout=self.timeout)
             return await self.get_send_response(tx_hash.hex(), nonce)
         except web3.exceptions.TimeExhausted as e :
@@ -487,32 +688,64 @@ class EthereumResponder(Web3Initializer, EthereumCommonMixin, Responder):
             return {"status": False,
                     "error_code": ErrorCode.TRANSACTION_FAILURE,
                     "message": e.__str__(),
-                    "tx_hash": tx_hash.hex(),
+                    "tx_hash": tx_hash.hex() if tx_hash else None,
                     "exception": e}
 
+    async def send_data_batch(self, nonces: List[str], data: List[bytes]) -> List[dict]:
+        """Send many data items with one interledgerReceiveBatch() transaction,
+        if the contract has it, see send_data() for the results
+        """
+        if not self.has_function(RECEIVE_BATCH):
+            return await super().send_data_batch(nonces, data)
+        result = await self.send_batch(
+            self.contract.functions.interledgerReceiveBatch([Web3.toInt(text=nonce) for nonce in nonces], list(data))
+        )
+        if not result['status']:
+            return [dict(result) for _ in nonces]
+        responses = self.get_receipt_responses(result['receipt'])
+        return [
+            self.make_send_response(result['tx_hash'], result['receipt'], nonce, responses)
+            for nonce in nonces
+        ]
+
+    def get_receipt_responses(self, tx_receipt) -> dict:
+        """InterledgerEventAccepted() and InterledgerEventRejected() events of the receipt by nonce
+        """
+        events = self.get_response_events()
+        responses = {}
+        for log in tx_receipt['logs']:
+            if log['address'] != self.contract.address or not log['topics']:
+                continue
+            event = events.get(HexBytes(log['topics'][0]))
+            if event is not None:
+                entry = event.processLog(log)
+                responses[entry['args']['nonce']] = (event.event_name, entry)
+        return responses
+
     async def get_send_response(self, tx_hash: str, nonce: str):
-        tx_receipt = await asyncio.get_event_loop().run_in_executor(
-            None, functools.partial(self.web3.eth.waitForTransactionReceipt, tx_hash, timeout=self.timeout))
+        tx_receipt = await self.wait_for_receipt(tx_hash)
+        return self.make_send_response(tx_hash, tx_receipt, nonce)
 
+    def make_send_response(self, tx_hash: str, tx_receipt, nonce: str, responses: dict = None) -> dict:
         #print("tx receipt: ", tx_receipt)
 
         if tx_receipt['status']:
-            logs_accept = self.contract.events.InterledgerEventAccepted().processReceipt(tx_receipt)
-            logs_reject = self.contract.events.InterledgerEventRejected().processReceipt(tx_receipt)
-            if len(logs_reject) != 0 and logs_reject[0]['args']['nonce'] == int(nonce):
+            if responses is None:
+                responses = self.get_receipt_responses(tx_receipt)
+            event_name, entry = responses.get(int(nonce), ('', None))
+            if event_name == 'InterledgerEventRejected':
                 return {"status": False,
                         "error_code": ErrorCode.APPLICATION_REJECT,
                         "message": "InterledgerEventRejected() event received",
                         "tx_hash": tx_hash,
-                        "blockNumber": logs_reject[0]['blockNumber'],
-                        "additionalData": logs_reject[0]['logIndex'],
+                        "blockNumber": entry['blockNumber'],
+                        "additionalData": entry['logIndex'],
                         "nonce": nonce}
-            if len(logs_accept) != 0 and logs_accept[0]['args']['nonce'] == int(nonce):
-                #print("\t\tsend_data logs: ", logs_accept)
+            if event_name == 'InterledgerEventAccepted':
                 return {"status": True,
                         "tx_hash": tx_hash,
-                        "blockNumber": logs_accept[0]['blockNumber'],
-                        "additionalData": logs_accept[0]['logIndex'],
+                        "blockNumber": entry['blockNumber'],
+                        "additionalData": entry['logIndex'],
                         "nonce": nonce}
             else:
                 return {"status": False,
@@ -529,66 +762,106 @@ class EthereumResponder(Web3Initializer, EthereumCommonMixin, Responder):
                     "message": "Error in the transaction",
                     "tx_hash": tx_hash}
 
-    async def check_response(self, transfer_id: str) -> str:
-        event_accepted = (
-            self.contract.events
-            .InterledgerEventAccepted()
-            .createFilter(
-                fromBlock=0,  # TODO: fix
-                argument_filters={'nonce': Web3.toInt(text=transfer_id)},
-            )
-        )
-        if event_accepted:
-            return 'InterledgerEventAccepted'
-
-        event_rejected = (
-            self.contract.events
-            .InterledgerEventRejected()
-            .createFilter(
-                fromBlock=0,  # TODO: fix
-                argument_filters={'nonce': Web3.toInt(text=transfer_id)},
+    def get_response_events(self) -> dict:
+        if self.response_events is None:
+            events = (
+                self.contract.events.InterledgerEventAccepted(),
+                self.contract.events.InterledgerEventRejected(),
             )
-        )
-        if event_rejected:
-            return 'InterledgerEventRejected'
+            self.response_events = {
+                HexBytes(event_abi_to_log_topic(event._get_event_abi())): event
+                for event in events
+            }
+        return self.response_events
+
+    async def get_logs(self, from_block: int, to_block: int, topics: list) -> list:
+        return await self.rpc.get_logs({
+            'address': self.contract.address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': topics,
+        })
+
+    def cache_response(self, nonce: int, response: str):
+        if self.response_cache.get(nonce) == 'InterledgerEventAccepted':
+            return
+        self.response_cache[nonce] = response
+        self.response_cache.move_to_end(nonce)
+        while len(self.response_cache) > self.response_cache_size:
+            self.response_cache.popitem(last=False)
+
+    async def check_responses(self, transfer_ids: List[str], from_block: int = 0) -> Dict[str, str]:
+        """Resolve the responses of many transfers with eth_getLogs queries of both events.
+
+        :param list transfer_ids: transfer ids used as the nonces of interledgerReceive
+        :param int from_block: block to start searching from, e.g. the block of interledgerReceive
+
+        :returns: transfer id -> 'InterledgerEventAccepted', 'InterledgerEventRejected' or ''
+        :rtype: dict
+        """
+        nonces = {Web3.toInt(text=transfer_id): transfer_id for transfer_id in transfer_ids}
+        responses = {nonce: self.response_cache[nonce] for nonce in nonces if nonce in self.response_cache}
+        missing = set(nonces) - set(responses)
+
+        if missing:
+            events = self.get_response_events()
+            topics = [list(events)]  # topic-OR of the event signatures
+            head = await self.head.get()
+            for start in range(from_block, head + 1, self.log_window):
+                end = min(start + self.log_window - 1, head)
+                for log in await self.get_logs(start, end, topics):
+                    event = events[HexBytes(log['topics'][0])]
+                    nonce = event.processLog(log)['args']['nonce']
+                    self.cache_response(nonce, event.event_name)
+                    if nonce in nonces and responses.get(nonce) != 'InterledgerEventAccepted':
+                        # kept apart from the cache, which the other logs may evict it from
+                        responses[nonce] = event.event_name
+                    missing.discard(nonce)
+                if not missing:
+                    break
+
+        return {
+            transfer_id: responses.get(nonce, '')
+            for nonce, transfer_id in nonces.items()
+        }
 
-        return ''
+    async def check_response(self, transfer_id: str, from_block: int = 0) -> str:
+        responses = await self.check_responses([transfer_id], from_block)
+        return responses[transfer_id]
+
+    def stats(self) -> dict:
+        return {
+            'endpoint': self.endpoint,
+            'account': self.tx_factory.account,
+            'block_cache': self.block_cache.stats(),
+            'rpc': self.rpc.stats(),
+            'transactions': self.tx_factory.stats(),
+            'chain': self.chain.stats(),
+        }
 
     async def get_interledgerReceive_tx(self, transfer: Transfer):
-        return await self.find_function_call(
+        call = await self.find_function_call(
             'interledgerReceive(uint256,bytes)',
             {'nonce': int(transfer.id)},
             until=transfer.initiation_timestamp
         )
+        if not call and self.has_function(RECEIVE_BATCH):
+            call = await self.find_function_call(
+                RECEIVE_BATCH,
+                {'nonces': int(transfer.id)},
+                until=transfer.initiation_timestamp
+            )
+            if call:
+                # the item of the transfer, as if it was sent with interledgerReceive()
+                params = call['txParams']
+                idx = params['nonces'].index(int(transfer.id))
+                call = {**call, 'txParams': {'nonce': params['nonces'][idx], 'data': params['data'][idx]}}
+        return call
 
     async def report_error(self, nonce: str, reason: int):
 
-        # unlock using the private key
-        if self.private_key and not self.isUnlocked(self.minter): # needs to unlock with private key
-            transaction = self.contract.functions \
-                .interledgerError(Web3.toInt(text=nonce), reason) \
-                .buildTransaction({'from': self.minter})
-            transaction.update({'nonce': self.web3.eth.getTransactionCount(self.minter)})
-            signed_tx = self.web3.eth.account.signTransaction(transaction, self.private_key)
-            abort_tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-        # unlock using password
-        elif self.password is not None:
-            unlock = self.web3.geth.personal.unlockAccount(self.minter, self.password, 0) # unlock indefinitely
-            if not unlock:
-                raise Exception("Wrong password")
-            abort_tx_hash = self.contract.functions \
-                .interledgerError(Web3.toInt(text=nonce), reason) \
-                .transact({'from': self.minter})
-            # lock the account again
-            self.web3.geth.personal.lockAccount(self.minter)
-        # no need to unlock
-        else:
-            abort_tx_hash = self.contract.functions \
-                .interledgerError(Web3.toInt(text=nonce), reason) \
-                .transact({'from': self.minter})
-        return await asyncio.get_event_loop().run_in_executor(
-            None, functools.partial(self.web3.eth.waitForTransactionReceipt, abort_tx_hash, timeout=self.timeout)
-        )
+        abort_tx_hash = await self.send_transaction(self.contract.functions.interledgerError(Web3.toInt(text=nonce), reason))
+        return await self.wait_for_receipt(abort_tx_hash)
 
 class EthereumMultiResponder(EthereumResponder, MultiResponder):
     """Similar working unit as EthereumResponder, but should be used under multi-ledger mode only.
@@ -612,38 +885,9 @@ class EthereumMultiResponder(EthereumResponder, MultiResponder):
         tx_hash = None
         tx_receipt = None
         try:
-            # unlock using private_key
-            if self.private_key and not self.isUnlocked(self.minter): # needs to unlock with private key
-                #print("unlock with priv_key")
-                transaction = self.contract.functions \
-                    .interledgerInquire(Web3.toInt(text=nonce), data) \
-                    .buildTransaction({'from': self.minter})
-                transaction.update({'nonce': self.web3.eth.getTransactionCount(self.minter)})
-                signed_tx = self.web3.eth.account.signTransaction(transaction, self.private_key)
-                tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-            # unlock using password
-            elif self.password is not None:
-                #print("unlock with password")
-                unlock = self.web3.geth.personal.unlockAccount(self.minter, self.password, 0) # unlock indefinitely
-                if not unlock:
-                    return {"status": False,
-                            "error_code": ErrorCode.TRANSACTION_FAILURE,
-                            "message": "Wrong password",
-                            "tx_hash": None}
-                tx_hash = self.contract.functions \
-                    .interledgerInquire(Web3.toInt(text=nonce), data) \
-                    .transact({'from': self.minter})
-                # lock the account again
-                self.web3.geth.personal.lockAccount(self.minter)
-            # no need to unlock
-            else:
-                #print("default")
-                tx_hash = self.contract.functions \
-                    .interledgerInquire(Web3.toInt(text=nonce), data) \
-                    .transact({'from': self.minter})
+            tx_hash = await self.send_transaction(self.contract.functions.interledgerInquire(Web3.toInt(text=nonce), data))
             # tx_receipt = self.web3.eth.waitForTransactionReceipt(tx_hash, timeout=self.timeout)
-            tx_receipt = await asyncio.get_event_loop().run_in_executor(
-                None, functools.partial(self.web3.eth.waitForTransactionReceipt, tx_hash, timeout=self.timeout))
+            tx_receipt = await self.wait_for_receipt(tx_hash)
 
             if tx_receipt['status']:
                 logs_accept = self.contract.events.InterledgerInquiryAccepted().processReceipt(tx_receipt)
@@ -700,38 +944,9 @@ class EthereumMultiResponder(EthereumResponder, MultiResponder):
         tx_hash = None
         tx_receipt = None
         try:
-            # unlock using private_key
-            if self.private_key and not self.isUnlocked(self.minter): # needs to unlock with private key
-                #print("unlock with priv_key")
-                transaction = self.contract.functions \
-                    .interledgerReceiveAbort(Web3.toInt(text=nonce), reason) \
-                    .buildTransaction({'from': self.minter})
-                transaction.update({'nonce': self.web3.eth.getTransactionCount(self.minter)})
-                signed_tx = self.web3.eth.account.signTransaction(transaction, self.private_key)
-                tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-            # unlock using password
-            elif self.password is not None:
-                #print("unlock with password")
-                unlock = self.web3.geth.personal.unlockAccount(self.minter, self.password, 0) # unlock indefinitely
-                if not unlock:
-                    return {"status": False,
-                            "error_code": ErrorCode.TRANSACTION_FAILURE,
-                            "message": "Wrong password",
-                            "tx_hash": None}
-                tx_hash = self.contract.functions \
-                    .interledgerReceiveAbort(Web3.toInt(text=nonce), reason) \
-                    .transact({'from': self.minter})
-                # lock the account again
-                self.web3.geth.personal.lockAccount(self.minter)
-            # no need to unlock
-            else:
-                #print("default")
-                tx_hash = self.contract.functions \
-                    .interledgerReceiveAbort(Web3.toInt(text=nonce), reason) \
-                    .transact({'from': self.minter})
+            tx_hash = await self.send_transaction(self.contract.functions.interledgerReceiveAbort(Web3.toInt(text=nonce), reason))
             # tx_receipt = self.web3.eth.waitForTransactionReceipt(tx_hash, timeout=self.timeout)
-            tx_receipt = await asyncio.get_event_loop().run_in_executor(
-                None, functools.partial(self.web3.eth.waitForTransactionReceipt, tx_hash, timeout=self.timeout))
+            tx_receipt = await self.wait_for_receipt(tx_hash)
 
             if tx_receipt['status']:
                 logs_accept = self.contract.events.InterledgerEventAccepted().processReceipt(tx_receipt)
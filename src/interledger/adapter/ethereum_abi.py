@@ -0,0 +1,101 @@
+from typing import (
+    Dict,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from eth_abi.decoding import TupleDecoder
+from eth_utils import function_abi_to_4byte_selector
+from hexbytes import HexBytes
+from web3._utils.abi import (
+    abi_to_signature,
+    get_abi_input_names,
+    get_abi_input_types,
+    map_abi_data,
+)
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+
+class ContractFunction(NamedTuple):
+    name: str  # same as str() of the web3 contract function, e.g. '<Function interledgerCommit(uint256)>'
+    signature: str
+    selector: str  # '0x' + 4 bytes in hex
+    input_names: Tuple[str, ...]
+    input_types: Tuple[str, ...]
+    decoder: TupleDecoder
+    normalize: bool  # addresses need checksumming
+
+
+def selector_of(input) -> str:
+    """Function selector of transaction input data, as '0x' + 8 lower case hex digits
+    """
+    if isinstance(input, str):
+        return input[:10].lower()
+    return '0x' + bytes(input[:4]).hex()
+
+
+def param_matches(value, expected) -> bool:
+    """Whether a decoded argument is the expected value or, for an array argument, contains it
+    """
+    return value == expected or (isinstance(value, (list, tuple)) and expected in value)
+
+
+class SelectorIndex:
+    """Functions of a contract by their 4-byte selector.
+
+    The names, selectors and argument decoders are built once, so telling
+    which function a transaction calls is a string comparison on its raw
+    input and the arguments are decoded only when they are needed.
+    """
+
+    def __init__(self, contract):
+        codec = contract.web3.codec
+        self.stream_class = codec.stream_class
+        self.functions: Dict[str, ContractFunction] = {}  # selector -> function
+        self.signatures: Dict[str, ContractFunction] = {}  # signature -> function
+
+        for abi in contract.abi:
+            if abi.get('type') != 'function':
+                continue
+            signature = abi_to_signature(abi)
+            input_types = tuple(get_abi_input_types(abi))
+            function = ContractFunction(
+                name=f'<Function {signature}>',
+                signature=signature,
+                selector='0x' + function_abi_to_4byte_selector(abi).hex(),
+                input_names=tuple(get_abi_input_names(abi)),
+                input_types=input_types,
+                decoder=TupleDecoder(decoders=[codec._registry.get_decoder(t) for t in input_types]),
+                normalize=any('address' in t for t in input_types),
+            )
+            self.functions[function.selector] = function
+            self.signatures[signature] = function
+
+    def __getitem__(self, signature: str) -> ContractFunction:
+        return self.signatures[signature]
+
+    def selectors_of(self, signatures: Iterable[str]) -> Set[str]:
+        return {self.signatures[signature].selector for signature in signatures}
+
+    def function_of(self, input) -> Optional[ContractFunction]:
+        return self.functions.get(selector_of(input))
+
+    def decode(self, input, selectors: Set[str] = None) -> Optional[Tuple[str, dict]]:
+        """Name and arguments of the function called with the input data
+
+        :param set selectors: decode only calls of these functions
+        :returns: None for calls of unknown or unselected functions
+        """
+        selector = selector_of(input)
+        if selectors is not None and selector not in selectors:
+            return None
+        function = self.functions.get(selector)
+        if function is None:
+            return None
+        values = function.decoder(self.stream_class(HexBytes(input)[4:]))
+        if function.normalize:
+            values = map_abi_data(BASE_RETURN_NORMALIZERS, function.input_types, values)
+        return function.name, dict(zip(function.input_names, values))
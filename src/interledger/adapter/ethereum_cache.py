@@ -0,0 +1,256 @@
+from collections import OrderedDict
+from operator import itemgetter
+from time import monotonic
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from web3.datastructures import AttributeDict
+
+from .ethereum_abi import param_matches
+
+
+BLOCK_HEADER_SIZE = 1024
+TRANSACTION_HASH_SIZE = 32
+TRANSACTION_SIZE = 512
+
+
+def estimate_block_size(block) -> int:
+    """Rough size of a block in memory in bytes, good enough for budgeting
+    """
+    size = BLOCK_HEADER_SIZE
+    for tx in block['transactions']:
+        if isinstance(tx, (bytes, str)):
+            size += TRANSACTION_HASH_SIZE
+        else:
+            size += TRANSACTION_SIZE + len(tx.get('input') or '')
+    return size
+
+
+def header_view(block):
+    """Block with transaction hashes only, as returned by get_block(full_transactions=False)
+    """
+    return AttributeDict({
+        **block,
+        'transactions': [tx['hash'] for tx in block['transactions']],
+    })
+
+
+class BlockCache:
+    """LRU cache of blocks bounded by an estimated byte budget.
+
+    Blocks less than `confirmation_depth` blocks behind the highest known
+    block are never cached, since they can still be replaced by a reorg.
+    A cached full-transaction block also serves header-only requests.
+    The adapters connected to the same endpoint share a cache, see for_endpoint().
+    """
+
+    caches: Dict[Tuple[str, int], 'BlockCache'] = {}
+
+    def __init__(self, max_size: int, ttl: float = 0, confirmation_depth: int = 0):
+        """
+        :param int max_size: byte budget of the cache, 0 disables caching
+        :param float ttl: seconds a block stays cached, 0 for no limit
+        :param int confirmation_depth: number of blocks a block needs on top of it before it is cached
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.confirmation_depth = confirmation_depth
+        self.head = -1
+
+        # (block_number, full_transactions) -> (block, size, expires)
+        self.blocks: OrderedDict = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def for_endpoint(cls, endpoint: str, max_size: int, ttl: float = 0, confirmation_depth: int = 0) -> 'BlockCache':
+        """Cache of the blocks of an endpoint, shared by the adapters with the same confirmation depth
+        """
+        key = (endpoint, confirmation_depth)
+        if key not in cls.caches:
+            cls.caches[key] = cls(max_size, ttl, confirmation_depth)
+        return cls.caches[key]
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def update_head(self, block_number: int):
+        self.head = max(self.head, block_number)
+
+    def is_final(self, block_number: int) -> bool:
+        return block_number <= self.head - self.confirmation_depth
+
+    def _lookup(self, key: Tuple[int, bool]):
+        entry = self.blocks.get(key)
+        if entry is None:
+            return None
+        block, _, expires = entry
+        if expires and expires < monotonic():
+            self._remove(key)
+            return None
+        self.blocks.move_to_end(key)
+        return block
+
+    def get(self, block_number: int, full_transactions: bool = False) -> Optional[AttributeDict]:
+        block = self._lookup((block_number, full_transactions))
+        if block is None and not full_transactions:
+            block = self._lookup((block_number, True))
+            if block is not None:
+                block = header_view(block)
+        if block is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return block
+
+    def put(self, block_number: int, full_transactions: bool, block):
+        self.update_head(block_number)
+        if not self.is_final(block_number):
+            return
+        size = estimate_block_size(block)
+        if size > self.max_size:
+            return
+        if full_transactions:
+            # the full block serves the header requests too
+            self._remove((block_number, False))
+        key = (block_number, full_transactions)
+        self._remove(key)
+        expires = monotonic() + self.ttl if self.ttl else 0
+        self.blocks[key] = (block, size, expires)
+        self.size += size
+        while self.size > self.max_size:
+            self._remove(next(iter(self.blocks)))
+            self.evictions += 1
+
+    def _remove(self, key: Tuple[int, bool]):
+        entry = self.blocks.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def stats(self) -> dict:
+        return {
+            'blocks': len(self.blocks),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class TransactionIndex:
+    """Decoded calls to the contract, indexed by the blocks the node has fetched.
+
+    Every call is indexed by (function, parameter name, value) for each of
+    its integer parameters, e.g. the id of interledgerCommit or the nonce of
+    interledgerReceive. Only final blocks are indexed, so a block is either
+    fully indexed or not at all, and the oldest blocks are dropped once more
+    than `max_blocks` blocks are indexed.
+    """
+
+    def __init__(self, address: str, selectors, max_blocks: int):
+        """
+        :param str address: address of the contract
+        :param SelectorIndex selectors: functions of the contract
+        :param int max_blocks: number of blocks indexed, 0 disables indexing
+        """
+        self.address = address
+        self.selectors = selectors
+        self.max_blocks = max_blocks
+
+        # block_number -> (timestamp, calls)
+        self.blocks: Dict[int, Tuple[int, List[dict]]] = {}
+        # (function, parameter name, value) -> calls, oldest first
+        self.calls: Dict[Tuple[str, str, int], List[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def is_indexed(self, block_number: int) -> bool:
+        return block_number in self.blocks
+
+    def timestamp_of(self, block_number: int) -> int:
+        return self.blocks[block_number][0]
+
+    def decode_block(self, block, selectors: Set[str] = None) -> List[dict]:
+        calls = []
+        for tx in block['transactions']:
+            if tx['to'] == self.address:
+                decoded = self.selectors.decode(tx['input'], selectors)
+                if decoded is None:
+                    continue
+                tx_function, tx_parameters = decoded
+                calls.append({
+                    'blockID': block['number'],
+                    'txID': tx['hash'].hex(),
+                    'txFunc': tx_function,
+                    'txParams': tx_parameters,
+                })
+        return calls
+
+    def get_calls(self, block, final: bool, selectors: Set[str] = None) -> List[dict]:
+        """Decoded contract calls of a full-transaction block, indexing the block if it is final
+
+        :param set selectors: the functions the caller needs, only these are
+            decoded from a block which is not indexed
+        """
+        block_number = block['number']
+        if block_number in self.blocks:
+            return self.blocks[block_number][1]
+        if final and self.max_blocks:
+            calls = self.decode_block(block)
+            self._add(block_number, block['timestamp'], calls)
+            return calls
+        return self.decode_block(block, selectors)
+
+    def _add(self, block_number: int, timestamp: int, calls: List[dict]):
+        self.blocks[block_number] = (timestamp, calls)
+        for call in calls:
+            for key in self._keys(call):
+                indexed = self.calls.setdefault(key, [])
+                indexed.append(call)
+                if len(indexed) > 1 and indexed[-2]['blockID'] > block_number:
+                    indexed.sort(key=itemgetter('blockID'))
+        # prune in bulk, finding the oldest blocks is not cheap
+        if len(self.blocks) > self.max_blocks * 1.1:
+            for block_number in sorted(self.blocks)[:len(self.blocks) - self.max_blocks]:
+                self._remove(block_number)
+
+    def _remove(self, block_number: int):
+        _, calls = self.blocks.pop(block_number)
+        for call in calls:
+            for key in self._keys(call):
+                indexed = [c for c in self.calls.get(key, []) if c is not call]
+                if indexed:
+                    self.calls[key] = indexed
+                else:
+                    self.calls.pop(key, None)
+
+    @staticmethod
+    def _keys(call: dict):
+        for name, value in call['txParams'].items():
+            if isinstance(value, int):
+                yield (call['txFunc'], name, value)
+            elif isinstance(value, (list, tuple)):  # e.g. the ids of a batch
+                for item in {item for item in value if isinstance(item, int)}:
+                    yield (call['txFunc'], name, item)
+
+    def find(self, function: str, function_params: dict, until: int = None) -> dict:
+        """Latest indexed call of the function with matching parameters, made at or after `until`
+        """
+        if not function_params:
+            return {}
+        name, value = next(iter(function_params.items()))
+        for call in reversed(self.calls.get((function, name, value), [])):
+            if until is not None and self.timestamp_of(call['blockID']) < until:
+                break
+            if all(param_matches(call['txParams'].get(k), v) for k, v in function_params.items()):
+                return call
+        return {}
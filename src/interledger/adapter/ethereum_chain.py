@@ -0,0 +1,212 @@
+import asyncio
+
+from collections import OrderedDict
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Set,
+    Tuple,
+)
+
+from hexbytes import HexBytes
+from web3.exceptions import BlockNotFound
+
+from ..utils import Logger
+
+
+class CanonicalChain:
+    """Hashes of the recent blocks of the canonical chain of a ledger.
+
+    sync() follows the head block by block and compares the parent hash of
+    every new block with the hash it knows at the height below. When they
+    differ, the chain was reorganized: it walks back to the fork, replacing
+    the hashes on the way, and tells the listeners which heights changed.
+    Only the last `max_blocks` blocks are kept, deeper reorgs are logged.
+
+    Adapters on the same ledger share the chain, see for_rpc().
+    """
+
+    chains: Dict[Tuple[str, int], 'CanonicalChain'] = {}
+
+    def __init__(self, rpc, head, confirmation_depth: int, max_blocks: int = 256):
+        """
+        :param EthereumRPC rpc: connection to the ledger
+        :param ChainHead head: head of the ledger
+        :param int confirmation_depth: number of blocks on top of a block before it is final
+        """
+        self.rpc = rpc
+        self.head = head
+        self.confirmation_depth = confirmation_depth
+        self.max_blocks = max(max_blocks, confirmation_depth + 1)
+
+        self.hashes: Dict[int, HexBytes] = {}
+        self.tip = -1
+        self._lock = None
+        # called with the heights whose blocks were replaced
+        self.listeners: List[Callable[[List[int]], None]] = []
+
+        self.reorgs = 0
+        self.replaced_blocks = 0
+
+    @classmethod
+    def for_rpc(cls, rpc, head, confirmation_depth: int) -> 'CanonicalChain':
+        key = (rpc.endpoint, confirmation_depth)
+        if key not in cls.chains:
+            cls.chains[key] = cls(rpc, head, confirmation_depth)
+        return cls.chains[key]
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def is_final(self, block_number: int) -> bool:
+        return block_number <= self.tip - self.confirmation_depth
+
+    async def sync(self):
+        async with self.lock:
+            head = await self.head.get()
+            if self.tip < 0:
+                self.tip = max(head - self.confirmation_depth - 1, -1)
+            number = self.tip + 1
+            replaced = []
+            while number <= head:
+                try:
+                    block = await self.rpc.get_block(number)
+                except BlockNotFound:
+                    break  # the node switched to a shorter chain
+                parent = self.hashes.get(number - 1)
+                if parent is not None and HexBytes(block['parentHash']) != parent:
+                    # the parent is no longer canonical, check the block below it
+                    del self.hashes[number - 1]
+                    replaced.append(number - 1)
+                    number -= 1
+                    continue
+                known = self.hashes.get(number)
+                if known is not None and known != HexBytes(block['hash']):
+                    replaced.append(number)
+                self.hashes[number] = HexBytes(block['hash'])
+                number += 1
+            self.tip = number - 1
+            for old in [n for n in self.hashes if n <= self.tip - self.max_blocks]:
+                del self.hashes[old]
+
+            if replaced:
+                self.reorgs += 1
+                self.replaced_blocks += len(set(replaced))
+                fork = min(replaced)
+                Logger.log(f'reorg of {len(set(replaced))} block(s) from block {fork}', important=True)
+                if fork <= self.tip - self.confirmation_depth:
+                    Logger.log('the reorg replaced final blocks, increase confirmation_depth', important=True)
+                for listener in self.listeners:
+                    listener(sorted(set(replaced)))
+
+    async def is_canonical(self, block_number: int, block_hash) -> bool:
+        await self.sync()
+        known = self.hashes.get(block_number)
+        if known is None:  # older than the blocks followed
+            known = HexBytes((await self.rpc.get_block(block_number))['hash'])
+        return known == HexBytes(block_hash)
+
+    async def wait_final(self, block_number: int, block_hash, timeout: float = None) -> bool:
+        """Wait until the block is final
+
+        :returns: whether the block is in the canonical chain
+        :raises asyncio.TimeoutError: after `timeout` seconds
+        """
+        await self.head.wait_for(block_number + self.confirmation_depth, timeout)
+        return await self.is_canonical(block_number, block_hash)
+
+    def stats(self) -> dict:
+        return {'reorgs': self.reorgs, 'replaced_blocks': self.replaced_blocks}
+
+
+class PendingEvents:
+    """Events held until their blocks are final.
+
+    The events are kept by block hash. When a reorg replaces a block, its
+    events are retracted and the events of the block that replaced it are
+    fetched with `fetch(block_hash)`, so a transfer is acted on once and
+    only if its block stays in the canonical chain.
+    """
+
+    def __init__(self, chain: CanonicalChain, fetch: Callable[[HexBytes], Awaitable[list]], max_released: int = 10000):
+        """
+        :param CanonicalChain chain: chain of the ledger
+        :param fetch: coroutine function returning the events of a block
+        """
+        self.chain = chain
+        self.fetch = fetch
+        self.max_released = max_released
+
+        # block hash -> (block number, log index -> event)
+        self.pending: Dict[HexBytes, Tuple[int, Dict[int, dict]]] = {}
+        # (block hash, log index) of the events returned
+        self.released: OrderedDict = OrderedDict()
+        self.replaced: Set[int] = set()
+        chain.listeners.append(self.replaced.update)
+
+        self.retracted = 0
+        self.replayed = 0
+
+    def __len__(self) -> int:
+        return sum(len(events) for _, events in self.pending.values())
+
+    def first_block(self) -> int:
+        """Lowest block with events held, or the tip of the chain
+        """
+        return min((block_number for block_number, _ in self.pending.values()), default=self.chain.tip + 1)
+
+    def add(self, events: list):
+        for event in events:
+            block_hash = HexBytes(event['blockHash'])
+            if (block_hash, event['logIndex']) in self.released:
+                continue
+            _, block_events = self.pending.setdefault(block_hash, (event['blockNumber'], {}))
+            block_events[event['logIndex']] = event
+
+    async def confirm(self, events: list) -> list:
+        """Add the new events and return the events whose blocks became final, in order
+        """
+        self.add(events)
+        await self.chain.sync()
+        if self.replaced:
+            await self.replay()
+
+        final = []
+        for block_hash, (block_number, block_events) in list(self.pending.items()):
+            if not self.chain.is_final(block_number):
+                continue
+            del self.pending[block_hash]
+            if await self.chain.is_canonical(block_number, block_hash):
+                final.extend(block_events.values())
+            else:
+                self.retracted += len(block_events)
+                Logger.log(f'{len(block_events)} event(s) of an orphaned block {block_number} dropped')
+
+        final.sort(key=lambda event: (event['blockNumber'], event['logIndex']))
+        for event in final:
+            self.released[(HexBytes(event['blockHash']), event['logIndex'])] = None
+        while len(self.released) > self.max_released:
+            self.released.popitem(last=False)
+        return final
+
+    async def replay(self):
+        replaced, self.replaced = self.replaced, set()
+        for block_hash, (block_number, block_events) in list(self.pending.items()):
+            if block_number in replaced and self.chain.hashes.get(block_number) != block_hash:
+                del self.pending[block_hash]
+                self.retracted += len(block_events)
+        for block_number in sorted(replaced):
+            block_hash = self.chain.hashes.get(block_number)
+            if block_hash is None:
+                continue
+            events = await self.fetch(block_hash)
+            self.replayed += len(events)
+            self.add(events)
+
+    def stats(self) -> dict:
+        return {'held': len(self), 'retracted': self.retracted, 'replayed': self.replayed}
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import sys
+
+from typing import (
+    Optional,
+    Tuple,
+)
+
+import websockets
+
+from web3._utils.method_formatters import log_entry_formatter
+from web3.datastructures import AttributeDict
+
+from ..utils import Logger
+
+
+class AdaptiveInterval:
+    """Polling interval which backs off while idle and tightens while busy
+    """
+
+    def __init__(self, minimum: float, maximum: float, factor: float = 2):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.current = minimum
+
+    def busy(self):
+        self.current = self.minimum
+
+    def idle(self):
+        self.current = min(self.current * self.factor, self.maximum)
+
+
+class LogSubscription:
+    """Logs of a contract pushed over a WebSocket with eth_subscribe('logs').
+
+    The logs are put to `queue` formatted like the logs of eth_getLogs, in
+    order and once each. When the connection or the subscription drops, the
+    subscription reconnects and replays the logs it missed with eth_getLogs,
+    starting from the block of the last log delivered, `log_window` blocks
+    per request.
+    """
+
+    def __init__(self, endpoint: str, rpc, address: str, topics: list, from_block: int, reconnect_delay: float = 1,
+                 log_window: int = 1000):
+        """
+        :param str endpoint: ws:// or wss:// URL of the node
+        :param EthereumRPC rpc: used for the replays
+        :param list topics: topic filter of the logs
+        :param int from_block: first block whose logs are delivered
+        """
+        self.endpoint = endpoint
+        self.rpc = rpc
+        self.address = address
+        self.topics = topics
+        self.reconnect_delay = reconnect_delay
+        self.log_window = log_window
+
+        # created in the event loop that gets the logs, see get()
+        self._queue: Optional[asyncio.Queue] = None
+        # (block number, log index) of the last log delivered
+        self.cursor: Tuple[int, int] = (from_block - 1, sys.maxsize)
+        self.task: Optional[asyncio.Task] = None
+        # subscribed and caught up with the missed logs
+        self.live = False
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        while True:
+            try:
+                await self.subscribe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                Logger.log('log subscription dropped:', repr(e))
+            self.live = False
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def subscribe(self):
+        async with websockets.connect(self.endpoint, max_size=None) as ws:
+            await ws.send(json.dumps({
+                'jsonrpc': '2.0',
+                'id': 1,
+                'method': 'eth_subscribe',
+                'params': ['logs', {'address': self.address, 'topics': self.topics}],
+            }))
+            response = json.loads(await ws.recv())
+            if 'error' in response:
+                raise ValueError(response['error'])
+            subscription = response['result']
+
+            # the logs sent while the subscription was down, pushed logs
+            # received meanwhile wait in the socket
+            await self.replay()
+            self.live = True
+
+            async for message in ws:
+                message = json.loads(message)
+                params = message.get('params', {})
+                if message.get('method') == 'eth_subscription' and params.get('subscription') == subscription:
+                    self.deliver(AttributeDict(log_entry_formatter(params['result'])))
+
+    async def replay(self):
+        # the logs of the blocks after the head are pushed
+        head = await self.rpc.block_number()
+        for start in range(max(self.cursor[0], 0), head + 1, self.log_window):
+            logs = await self.rpc.get_logs({
+                'address': self.address,
+                'fromBlock': start,
+                'toBlock': min(start + self.log_window - 1, head),
+                'topics': self.topics,
+            })
+            for log in logs:
+                self.deliver(log)
+
+    def deliver(self, log):
+        if log.get('removed'):
+            return
+        position = (log['blockNumber'], log['logIndex'])
+        if position <= self.cursor:
+            return  # replayed already
+        self.cursor = position
+        self.queue.put_nowait(log)
+
+    async def get(self, timeout: float) -> list:
+        """Logs received so far, waiting for up to `timeout` seconds for the first
+        """
+        self.start()
+        try:
+            logs = [await asyncio.wait_for(self.queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.queue.empty():
+            logs.append(self.queue.get_nowait())
+        return logs
@@ -0,0 +1,148 @@
+import asyncio
+import heapq
+import json
+
+from itertools import count
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import websockets
+
+from ..utils import Logger
+
+
+class ChainHead:
+    """Latest block of a ledger, kept in memory.
+
+    One task per connection follows the head, from eth_subscribe('newHeads')
+    over a WebSocket or else by polling the latest block every
+    `poll_interval` seconds. The adapters read the head without a
+    round-trip and can wait until a block arrives with wait_for().
+
+    Adapters on the same ledger share the head, see for_rpc().
+    """
+
+    heads: Dict[str, 'ChainHead'] = {}
+
+    def __init__(self, rpc, poll_interval: float = 0.1, subscribe: bool = True, reconnect_delay: float = 1):
+        """
+        :param EthereumRPC rpc: connection to the ledger
+        :param float poll_interval: seconds between the polls of the latest block
+        :param bool subscribe: use eth_subscribe('newHeads') if the endpoint is ws:// or wss://
+        """
+        self.rpc = rpc
+        self.poll_interval = poll_interval
+        self.subscribe = subscribe and rpc.endpoint.split(':')[0].lower() in ('ws', 'wss')
+        self.reconnect_delay = reconnect_delay
+
+        self.number = -1
+        self.timestamp = None
+        self.hash = None
+
+        # (block number, sequence, future) of the callers of wait_for()
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.sequence = count()
+        self.task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_rpc(cls, rpc, poll_interval: float = 0.1, subscribe: bool = True) -> 'ChainHead':
+        if rpc.endpoint not in cls.heads:
+            cls.heads[rpc.endpoint] = cls(rpc, poll_interval, subscribe)
+        return cls.heads[rpc.endpoint]
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def current_sync(self) -> int:
+        """Head for the constructors of the adapters, fetched with a blocking call only for the first one
+        """
+        if self.number < 0:
+            self.update(self.rpc.web3.eth.get_block('latest'))
+        return self.number
+
+    async def get(self) -> int:
+        """Latest block number, from memory once the head is followed
+        """
+        self.start()
+        if self.number < 0:
+            await self.refresh()
+        return self.number
+
+    async def wait_for(self, block_number: int, timeout: float = None) -> int:
+        """Wait until the head reaches the block
+
+        :returns: the head
+        :raises asyncio.TimeoutError: after `timeout` seconds
+        """
+        if self.number >= block_number:
+            return self.number
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self.waiters, (block_number, next(self.sequence), future))
+        self.start()
+        return await asyncio.wait_for(future, timeout)
+
+    def update(self, block):
+        number = block['number']
+        if isinstance(number, str):  # newHeads are not formatted by web3
+            number, timestamp = int(number, 16), int(block['timestamp'], 16)
+        else:
+            timestamp = block['timestamp']
+        if number <= self.number:
+            return
+        self.number = number
+        self.timestamp = timestamp
+        self.hash = block.get('hash')
+        while self.waiters and self.waiters[0][0] <= number:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(number)
+
+    async def refresh(self):
+        self.update(await self.rpc.get_block('latest'))
+
+    async def run(self):
+        while True:
+            try:
+                if self.subscribe:
+                    await self.follow()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                Logger.log('head update failed:', repr(e))
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            await asyncio.sleep(self.poll_interval)
+
+    async def follow(self):
+        async with websockets.connect(self.rpc.endpoint, max_size=None) as ws:
+            await ws.send(json.dumps({
+                'jsonrpc': '2.0',
+                'id': 1,
+                'method': 'eth_subscribe',
+                'params': ['newHeads'],
+            }))
+            response = json.loads(await ws.recv())
+            if 'error' in response:
+                raise ValueError(response['error'])
+            subscription = response['result']
+
+            # the blocks mined while the subscription was down
+            await self.refresh()
+
+            async for message in ws:
+                message = json.loads(message)
+                params = message.get('params', {})
+                if message.get('method') == 'eth_subscription' and params.get('subscription') == subscription:
+                    self.update(params['result'])
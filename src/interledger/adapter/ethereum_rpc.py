@@ -0,0 +1,281 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import monotonic
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+)
+
+import aiohttp
+import web3
+
+from eth_utils import to_bytes
+from web3._utils.encoding import FriendlyJsonSerde
+from web3.eth import AsyncEth
+from web3.middleware import async_geth_poa_middleware
+from web3.providers.async_rpc import AsyncHTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+
+Web3 = web3.Web3
+
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider keeping one aiohttp session, i.e. one connection pool,
+    and bounding the number of requests in flight.
+
+    AsyncHTTPProvider opens a new session for every request.
+    """
+
+    def __init__(self, endpoint_uri: str, concurrency: int, request_timeout: float = 10):
+        super().__init__(endpoint_uri)
+        self.concurrency = concurrency
+        self.request_timeout = request_timeout
+        self.session = None
+        self._semaphore = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(self.request_timeout),
+                raise_for_status=True,
+            )
+        return self.session
+
+    async def post(self, request_data: bytes) -> bytes:
+        async with self.semaphore:
+            async with self.get_session().post(
+                self.endpoint_uri,
+                data=request_data,
+                **self.get_request_kwargs()
+            ) as response:
+                return await response.read()
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = await self.post(request_data)
+        return self.decode_rpc_response(raw_response)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+class BatchingAsyncHTTPProvider(PooledAsyncHTTPProvider):
+    """PooledAsyncHTTPProvider sending the requests made together as one JSON-RPC batch.
+
+    A request waits for the others made in the same loop iteration, or
+    within `window` seconds, and they are posted in one batch of at most
+    `max_size` requests, so many concurrent lookups cost one round-trip.
+    """
+
+    def __init__(self, endpoint_uri: str, concurrency: int, window: float = 0, max_size: int = 100,
+                 request_timeout: float = 10):
+        """
+        :param float window: seconds a request waits for others, 0 for the current loop iteration only
+        :param int max_size: maximum number of requests in a batch
+        """
+        super().__init__(endpoint_uri, concurrency, request_timeout)
+        self.window = window
+        self.max_size = max(1, max_size)
+        self.pending: List[Tuple[dict, asyncio.Future]] = []
+        self.timer = None
+        self.tasks = set()
+
+        self.batches = 0
+        self.requests = 0
+        self.max_batch = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.pending.append(({
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or [],
+            "id": next(self.request_counter),
+        }, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            if self.window:
+                self.timer = loop.call_later(self.window, self.flush)
+            else:
+                self.timer = loop.call_soon(self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.pending:
+            batch, self.pending = self.pending, []
+            task = asyncio.ensure_future(self.send_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def send_batch(self, batch: List[Tuple[dict, asyncio.Future]]):
+        start = monotonic()
+        try:
+            request_data = to_bytes(text=FriendlyJsonSerde().json_encode([request for request, _ in batch]))
+            responses = self.decode_rpc_response(await self.post(request_data))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.record(len(batch), monotonic() - start)
+
+        if isinstance(responses, dict):
+            # the node refused the whole batch, e.g. it is too large
+            responses = [{**responses, "id": request["id"]} for request, _ in batch]
+        by_id = {response.get("id"): response for response in responses}
+        for request, future in batch:
+            if future.done():
+                continue
+            response = by_id.get(request["id"])
+            if response is None:
+                future.set_exception(ValueError(f'no response to {request["method"]} in the batch'))
+            else:
+                future.set_result(response)
+
+    def record(self, size: int, latency: float):
+        self.batches += 1
+        self.requests += size
+        self.max_batch = max(self.max_batch, size)
+        # moving average of the round-trip time
+        self.latency = latency if self.batches == 1 else 0.9 * self.latency + 0.1 * latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch': self.requests / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch,
+            'latency': self.latency,
+            'max_latency': self.max_latency,
+        }
+
+
+class EthereumRPC:
+    """The eth_* calls of the Ethereum adapters as coroutines.
+
+    This one runs the blocking web3 calls in its own thread pool of
+    `concurrency` threads, so they never block the event loop and do not
+    compete for the default executor. Adapters connected to the same
+    endpoint share the instance, see connect().
+    """
+
+    connections: Dict[str, 'EthereumRPC'] = {}
+
+    def __init__(self, web3: Web3, endpoint: str, concurrency: int):
+        self.web3 = web3
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='rpc')
+
+    @classmethod
+    def connect(cls, web3: Web3, endpoint: str, concurrency: int, async_rpc: bool = False, poa: bool = False,
+                batch: bool = False, batch_window: float = 0, batch_size: int = 100) -> 'EthereumRPC':
+        """Shared instance of the endpoint
+
+        :param bool async_rpc: use AsyncEthereumRPC for http(s) endpoints
+        :param bool batch: send the concurrent requests of AsyncEthereumRPC as JSON-RPC batches, implies async_rpc
+        """
+        if endpoint not in cls.connections:
+            if (async_rpc or batch) and endpoint.split(':')[0].lower() in ('http', 'https'):
+                if batch:
+                    provider = BatchingAsyncHTTPProvider(endpoint, concurrency, batch_window, batch_size)
+                else:
+                    provider = PooledAsyncHTTPProvider(endpoint, concurrency)
+                cls.connections[endpoint] = AsyncEthereumRPC(web3, endpoint, concurrency, poa, provider)
+            else:
+                cls.connections[endpoint] = EthereumRPC(web3, endpoint, concurrency)
+        return cls.connections[endpoint]
+
+    def stats(self) -> dict:
+        return {}
+
+    async def run(self, func, *args, **kwargs):
+        """Run any other blocking call in the thread pool
+        """
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, partial(func, *args, **kwargs)
+        )
+
+    async def block_number(self) -> int:
+        return await self.run(lambda: self.web3.eth.block_number)
+
+    async def get_block(self, block_identifier, full_transactions: bool = False):
+        return await self.run(self.web3.eth.get_block, block_identifier, full_transactions=full_transactions)
+
+    async def get_transaction(self, tx_hash):
+        return await self.run(self.web3.eth.get_transaction, tx_hash)
+
+    async def get_transaction_receipt(self, tx_hash):
+        return await self.run(self.web3.eth.get_transaction_receipt, tx_hash)
+
+    async def get_transaction_count(self, account: str, block_identifier='pending') -> int:
+        return await self.run(self.web3.eth.get_transaction_count, account, block_identifier)
+
+    async def get_logs(self, filter_params: dict) -> list:
+        return await self.run(self.web3.eth.get_logs, filter_params)
+
+    async def send_raw_transaction(self, raw_transaction):
+        return await self.run(self.web3.eth.send_raw_transaction, raw_transaction)
+
+
+class AsyncEthereumRPC(EthereumRPC):
+    """EthereumRPC on a native async HTTP provider with a shared connection pool.
+
+    Only the calls web3 has no async version of (filters, contract
+    transactions, account management) still go through the thread pool.
+    """
+
+    def __init__(self, web3: Web3, endpoint: str, concurrency: int, poa: bool = False,
+                 provider: PooledAsyncHTTPProvider = None):
+        super().__init__(web3, endpoint, concurrency)
+        self.provider = provider or PooledAsyncHTTPProvider(endpoint, concurrency)
+        self.async_web3 = Web3(self.provider, modules={'eth': (AsyncEth,)}, middlewares=[])
+        if poa:
+            self.async_web3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+
+    def stats(self) -> dict:
+        if isinstance(self.provider, BatchingAsyncHTTPProvider):
+            return {'batching': self.provider.stats()}
+        return {}
+
+    async def block_number(self) -> int:
+        return await self.async_web3.eth.block_number
+
+    async def get_block(self, block_identifier, full_transactions: bool = False):
+        return await self.async_web3.eth.get_block(block_identifier, full_transactions)
+
+    async def get_transaction(self, tx_hash):
+        return await self.async_web3.eth.get_transaction(tx_hash)
+
+    async def get_transaction_receipt(self, tx_hash):
+        return await self.async_web3.eth.get_transaction_receipt(tx_hash)
+
+    async def get_transaction_count(self, account: str, block_identifier='pending') -> int:
+        return await self.async_web3.eth.get_transaction_count(account, block_identifier)
+
+    async def get_logs(self, filter_params: dict) -> list:
+        return await self.async_web3.eth.get_logs(filter_params)
+
+    async def send_raw_transaction(self, raw_transaction):
+        return await self.async_web3.eth.send_raw_transaction(raw_transaction)
@@ -0,0 +1,148 @@
+import asyncio
+
+from time import monotonic
+from typing import Dict
+
+from eth_account import Account
+
+from .ethereum_tx import NonceManager, TransactionFactory, is_known_transaction
+from ..utils import Logger
+
+
+class Signer:
+    """Sends the contract calls of an account, signed by the node.
+
+    The way an account signs is chosen once when the adapters start, see
+    for_account(), so sending a transaction never probes or changes the
+    lock state of the account:
+
+    - LocalSigner signs with the private key,
+    - SessionSigner unlocks the account on the node with the password for a
+      lease of `unlock_lease` seconds and renews it before it ends,
+    - Signer lets the node sign for an account it keeps unlocked.
+
+    Adapters sharing an account on the same ledger share the signer.
+    """
+
+    signers: Dict[tuple, 'Signer'] = {}
+
+    def __init__(self, rpc, account: str, tx_factory: TransactionFactory):
+        """
+        :param EthereumRPC rpc: connection to the ledger
+        :param str account: address the transactions are sent from
+        """
+        self.rpc = rpc
+        self.account = account
+        self.tx_factory = tx_factory
+
+    @classmethod
+    def for_account(cls, rpc, account: str, tx_factory: TransactionFactory, nonce_manager: NonceManager,
+                    private_key: str = None, password: str = None, unlock_lease: float = 300) -> 'Signer':
+        """Signer of the account, from the private key, the password or else the node
+
+        :raises ValueError: if the private key is not the key of the account
+        """
+        key = (rpc.endpoint, account)
+        if key not in cls.signers:
+            if private_key:
+                signer = LocalSigner(rpc, account, tx_factory, nonce_manager, private_key)
+            elif password is not None:
+                signer = SessionSigner(rpc, account, tx_factory, password, unlock_lease)
+            else:
+                signer = Signer(rpc, account, tx_factory)
+            cls.signers[key] = signer
+        return cls.signers[key]
+
+    async def send(self, function_call):
+        """Send the contract call
+
+        :returns: the transaction hash
+        :raises ValueError: if the node rejects the transaction
+        """
+        data = function_call._encode_transaction_data()
+        params = await self.tx_factory.params(function_call.address, data)
+        tx_hash = await self.rpc.run(function_call.transact, params)
+        self.tx_factory.track(tx_hash, function_call.address, data, params['gas'])
+        return tx_hash
+
+
+class LocalSigner(Signer):
+    """Signs the transactions with the private key of the account and sends
+    them with the nonces of the NonceManager
+    """
+
+    def __init__(self, rpc, account: str, tx_factory: TransactionFactory, nonce_manager: NonceManager, private_key: str):
+        super().__init__(rpc, account, tx_factory)
+        if Account.from_key(private_key).address.lower() != account.lower():
+            raise ValueError(f'The private key is not the key of {account}')
+        self.nonce_manager = nonce_manager
+        self.private_key = private_key
+
+    async def send(self, function_call):
+        transaction = await self.tx_factory.build(function_call)
+
+        async def sign_and_send(nonce):
+            # signing takes milliseconds, off the event loop
+            signed_tx = await self.rpc.run(Account.sign_transaction, {**transaction, 'nonce': nonce}, self.private_key)
+            try:
+                return await self.rpc.send_raw_transaction(signed_tx.rawTransaction)
+            except ValueError as e:
+                if is_known_transaction(e):
+                    return signed_tx.hash  # sent already, e.g. by a retried request
+                raise
+
+        tx_hash = await self.nonce_manager.send(sign_and_send)
+        self.tx_factory.track(tx_hash, transaction['to'], transaction['data'], transaction['gas'])
+        return tx_hash
+
+
+class SessionSigner(Signer):
+    """Lets the node sign for the account while it is unlocked with the password.
+
+    The account is unlocked for `lease` seconds, 0 for as long as the node
+    runs, and unlocked again at half of the lease, or when the node answers
+    that the account is locked. Concurrent senders wait only for a renewal.
+    """
+
+    def __init__(self, rpc, account: str, tx_factory: TransactionFactory, password: str, lease: float = 300):
+        super().__init__(rpc, account, tx_factory)
+        self.password = password
+        self.lease = lease
+        self.renew_at = None
+        self._lock = None
+        self.unlocks = 0
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def expired(self) -> bool:
+        return self.renew_at is None or monotonic() >= self.renew_at
+
+    async def unlock(self):
+        async with self.lock:
+            if not self.expired():
+                return  # renewed by a concurrent sender
+            unlocked = await self.rpc.run(
+                self.rpc.web3.geth.personal.unlock_account, self.account, self.password, int(self.lease)
+            )
+            if not unlocked:
+                raise ValueError("Wrong password")
+            self.unlocks += 1
+            self.renew_at = float('inf') if self.lease == 0 else monotonic() + self.lease / 2
+            Logger.log(f'account {self.account} unlocked', f'for {self.lease} s' if self.lease else 'for the session')
+
+    async def send(self, function_call):
+        if self.expired():
+            await self.unlock()
+        try:
+            return await super().send(function_call)
+        except ValueError as e:
+            if 'authentication needed' not in str(e):
+                raise
+        # locked on the node, e.g. after a restart
+        self.renew_at = None
+        await self.unlock()
+        return await super().send(function_call)
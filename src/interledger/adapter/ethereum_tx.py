@@ -0,0 +1,416 @@
+import asyncio
+import heapq
+
+from collections import OrderedDict
+from contextlib import suppress
+from time import monotonic
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Set,
+    Tuple,
+)
+
+from hexbytes import HexBytes
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+from ..utils import Logger
+
+
+# errors of eth_sendRawTransaction telling the local nonce is out of sync with the node
+NONCE_ERRORS = (
+    'nonce too low',
+    'replacement transaction underpriced',
+    'correct nonce',
+    'invalid nonce',
+)
+
+# errors of eth_sendRawTransaction telling the same signed transaction is in the pool already
+KNOWN_TRANSACTION_ERRORS = (
+    'already known',
+    'known transaction',
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(e in message for e in NONCE_ERRORS)
+
+
+def is_known_transaction(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(e in message for e in KNOWN_TRANSACTION_ERRORS)
+
+
+class NonceManager:
+    """Hands out the nonces of an account locally.
+
+    Concurrent transactions of the account get consecutive nonces without
+    an eth_getTransactionCount round-trip each. The next nonce is read from
+    the node only at start and after a nonce error, and the nonces of
+    transactions the node dropped are handed out again to fill the gap.
+
+    Adapters sharing an account on the same ledger share the manager, see
+    for_account().
+    """
+
+    managers: Dict[tuple, 'NonceManager'] = {}
+
+    def __init__(self, rpc, account: str, retries: int = 3):
+        """
+        :param EthereumRPC rpc: connection to the ledger
+        """
+        self.rpc = rpc
+        self.account = account
+        self.retries = retries
+
+        self.next_nonce = None
+        self.released: List[int] = []  # heap of nonces to reuse
+        self.in_flight: Dict[HexBytes, int] = {}  # tx hash -> nonce
+        self._lock = None
+
+    @classmethod
+    def for_account(cls, rpc, account: str) -> 'NonceManager':
+        key = (rpc.endpoint, account)
+        if key not in cls.managers:
+            cls.managers[key] = cls(rpc, account)
+        return cls.managers[key]
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def sync(self):
+        """Continue from the nonce the node expects next
+        """
+        self.next_nonce = await self.rpc.get_transaction_count(self.account, 'pending')
+        self.released = []
+
+    async def get(self) -> int:
+        async with self.lock:
+            if self.released:
+                return heapq.heappop(self.released)
+            if self.next_nonce is None:
+                await self.sync()
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def release(self, nonce: int):
+        """Return a nonce that did not end up in a transaction
+        """
+        if self.next_nonce is not None and nonce < self.next_nonce and nonce not in self.released:
+            heapq.heappush(self.released, nonce)
+
+    async def send(self, sign_and_send: Callable[[int], Awaitable[HexBytes]]) -> HexBytes:
+        """Sign and send a transaction with the next nonce
+
+        :param sign_and_send: signs the transaction with the given nonce and sends it, returning the hash
+        """
+        for attempt in range(self.retries + 1):
+            nonce = await self.get()
+            try:
+                tx_hash = await sign_and_send(nonce)
+            except ValueError as e:
+                if attempt < self.retries and is_nonce_error(e):
+                    Logger.log('resync nonce of', self.account, 'after:', e)
+                    async with self.lock:
+                        await self.sync()
+                    continue
+                self.release(nonce)
+                raise
+            except BaseException:
+                # e.g. a connection error or a timeout: if the node has the
+                # transaction after all, reusing the nonce fails with a nonce
+                # error and resyncs, otherwise the gap is filled
+                self.release(nonce)
+                raise
+            self.in_flight[HexBytes(tx_hash)] = nonce
+            return tx_hash
+
+    def confirm(self, tx_hash):
+        self.in_flight.pop(HexBytes(tx_hash), None)
+
+    async def recover(self, tx_hash):
+        """Reuse the nonce of a transaction the node no longer knows, e.g. after a receipt timeout
+        """
+        nonce = self.in_flight.get(HexBytes(tx_hash))
+        if nonce is None:
+            return
+        try:
+            await self.rpc.get_transaction(tx_hash)
+            return  # still pending
+        except TransactionNotFound:
+            pass
+        confirmed = await self.rpc.get_transaction_count(self.account, 'latest')
+        del self.in_flight[HexBytes(tx_hash)]
+        if nonce >= confirmed:
+            Logger.log('transaction dropped, reusing nonce', nonce)
+            self.release(nonce)
+
+
+class ReceiptTracker:
+    """Waits for the receipts of all transactions sent to a ledger in one loop.
+
+    Instead of polling eth_getTransactionReceipt per transaction, the
+    tracker waits for a new block on the ChainHead, or polls the block
+    number once per `poll_interval` without one, and when a new block
+    arrives requests the receipts of all pending transactions concurrently,
+    one eth_getTransactionReceipt each, which rpc_batch sends as a single
+    batch. A transaction is also checked right after it is added, in case
+    it was mined already. The loop runs only while someone waits.
+
+    Adapters on the same ledger share the tracker, see for_rpc().
+    """
+
+    trackers: Dict[str, 'ReceiptTracker'] = {}
+
+    def __init__(self, rpc, poll_interval: float = 0.1, head=None):
+        """
+        :param EthereumRPC rpc: connection to the ledger
+        :param float poll_interval: seconds between block number polls
+        :param ChainHead head: head of the ledger, if followed
+        """
+        self.rpc = rpc
+        self.poll_interval = poll_interval
+        self.head = head
+
+        self.waiters: Dict[HexBytes, List[asyncio.Future]] = {}
+        self.unchecked: Set[HexBytes] = set()  # added after the last fetch
+        self.last_block = None
+        self.task = None
+
+    @classmethod
+    def for_rpc(cls, rpc, poll_interval: float = 0.1, head=None) -> 'ReceiptTracker':
+        if rpc.endpoint not in cls.trackers:
+            cls.trackers[rpc.endpoint] = cls(rpc, poll_interval, head)
+        return cls.trackers[rpc.endpoint]
+
+    def __len__(self) -> int:
+        return len(self.waiters)
+
+    async def wait(self, tx_hash, timeout: float):
+        """Receipt of the transaction, raises TimeExhausted after `timeout` seconds like web3
+        """
+        tx_hash = HexBytes(tx_hash)
+        future = asyncio.get_event_loop().create_future()
+        self.waiters.setdefault(tx_hash, []).append(future)
+        self.unchecked.add(tx_hash)
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeExhausted(
+                f'Transaction {tx_hash.hex()} is not in the chain after {timeout} seconds'
+            )
+        finally:
+            self._remove(tx_hash, future)
+
+    def _remove(self, tx_hash: HexBytes, future: asyncio.Future):
+        futures = self.waiters.get(tx_hash)
+        if futures and future in futures:
+            futures.remove(future)
+            if not futures:
+                del self.waiters[tx_hash]
+                self.unchecked.discard(tx_hash)
+
+    async def run(self):
+        while self.waiters:
+            try:
+                await self.poll()
+            except Exception as e:
+                Logger.log('receipt polling failed:', e)
+            if self.waiters:
+                await self.wait_for_block()
+
+    async def wait_for_block(self):
+        if self.head is None or self.last_block is None:
+            await asyncio.sleep(self.poll_interval)
+            return
+        # the transactions added meanwhile are checked after poll_interval at the latest
+        with suppress(asyncio.TimeoutError):
+            await self.head.wait_for(self.last_block + 1, self.poll_interval)
+
+    async def poll(self):
+        if self.head is not None:
+            block_number = await self.head.get()
+        else:
+            block_number = await self.rpc.block_number()
+        if block_number != self.last_block:
+            self.last_block = block_number
+            tx_hashes = list(self.waiters)
+        else:
+            tx_hashes = list(self.unchecked)
+        self.unchecked.clear()
+        if not tx_hashes:
+            return
+
+        receipts = await asyncio.gather(*[self.get_receipt(tx_hash) for tx_hash in tx_hashes])
+        for tx_hash, receipt in zip(tx_hashes, receipts):
+            if receipt is None:
+                continue
+            self.unchecked.discard(tx_hash)
+            for future in self.waiters.pop(tx_hash, []):
+                if not future.done():
+                    future.set_result(receipt)
+
+    async def get_receipt(self, tx_hash: HexBytes):
+        try:
+            receipt = await self.rpc.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+        # pending transactions have a receipt without a block on some nodes
+        if receipt is None or receipt['blockHash'] is None:
+            return None
+        return receipt
+
+
+class TransactionFactory:
+    """Builds the contract transactions of an account without RPCs in the steady state.
+
+    buildTransaction asks the node for the gas estimate, the fees and the
+    chain id of every transaction. The factory reads the chain id once,
+    reuses the gas estimate of a function for calls with input of the same
+    size class, scaled to the size of the input and with a safety margin,
+    and refreshes the fees every
+    `fee_refresh` seconds in the background (EIP-1559 fees on chains with
+    a base fee, the gas price otherwise). An estimate is dropped when a
+    transaction built with it runs out of gas.
+
+    Adapters sharing an account on the same ledger share the factory, see
+    for_account().
+    """
+
+    factories: Dict[tuple, 'TransactionFactory'] = {}
+
+    def __init__(self, rpc, account: str, gas_margin: float = 1.2, fee_refresh: float = 10, max_sent: int = 10000):
+        """
+        :param EthereumRPC rpc: connection to the ledger
+        :param float gas_margin: multiplier of the gas estimates
+        :param float fee_refresh: seconds the fees are reused
+        """
+        self.rpc = rpc
+        self.account = account
+        self.gas_margin = gas_margin
+        self.fee_refresh = fee_refresh
+        self.max_sent = max_sent
+
+        self.chain_id = None
+        # (contract address, selector, size class) -> (gas estimate, input size)
+        self.gas_estimates: Dict[tuple, Tuple[int, int]] = {}
+        self.fees = None
+        self.fees_at = 0.0
+        self.fee_task = None
+        # tx hash -> (gas key, gas limit), until the receipt is seen
+        self.sent: OrderedDict = OrderedDict()
+
+        self.estimates = 0
+        self.reused = 0
+
+    @classmethod
+    def for_account(cls, rpc, account: str, gas_margin: float = 1.2, fee_refresh: float = 10) -> 'TransactionFactory':
+        key = (rpc.endpoint, account)
+        if key not in cls.factories:
+            cls.factories[key] = cls(rpc, account, gas_margin, fee_refresh)
+        return cls.factories[key]
+
+    @staticmethod
+    def gas_key(to: str, data: str) -> tuple:
+        # calls with input of the same power of two size use a similar amount of gas
+        return (to, data[:10], (len(data) // 2).bit_length())
+
+    async def get_chain_id(self) -> int:
+        if self.chain_id is None:
+            self.chain_id = await self.rpc.run(lambda: self.rpc.web3.eth.chain_id)
+        return self.chain_id
+
+    async def get_gas(self, to: str, data: str) -> int:
+        key = self.gas_key(to, data)
+        size = len(data) // 2
+        cached = self.gas_estimates.get(key)
+        if cached is not None:
+            self.reused += 1
+            estimate, estimated_size = cached
+            # the gas of a call grows at most linearly with its input, e.g.
+            # the ids of a batch or the stored data
+            return int(estimate * max(1, size / estimated_size) * self.gas_margin)
+        estimate = await self.rpc.run(self.rpc.web3.eth.estimate_gas, {'from': self.account, 'to': to, 'data': data})
+        self.estimates += 1
+        self.gas_estimates[key] = (estimate, size)
+        return int(estimate * self.gas_margin)
+
+    async def get_fees(self) -> dict:
+        if self.fees is None:
+            await self.refresh_fees()
+        elif monotonic() - self.fees_at > self.fee_refresh and (self.fee_task is None or self.fee_task.done()):
+            # the current fees are used until the new ones arrive
+            self.fee_task = asyncio.ensure_future(self.refresh_fees())
+        return self.fees
+
+    async def refresh_fees(self):
+        try:
+            block = await self.rpc.get_block('latest')
+            base_fee = block.get('baseFeePerGas')
+            fees = None
+            if base_fee is not None:
+                with suppress(ValueError):  # no eth_maxPriorityFeePerGas
+                    priority_fee = await self.rpc.run(lambda: self.rpc.web3.eth.max_priority_fee)
+                    fees = {'maxFeePerGas': 2 * base_fee + priority_fee, 'maxPriorityFeePerGas': priority_fee}
+            if fees is None:
+                fees = {'gasPrice': await self.rpc.run(lambda: self.rpc.web3.eth.gas_price)}
+        except Exception as e:
+            if self.fees is None:
+                raise
+            Logger.log('fee refresh failed:', repr(e))
+            return
+        self.fees = fees
+        self.fees_at = monotonic()
+
+    async def params(self, to: str, data: str) -> dict:
+        """Parameters of ContractFunction.transact(), the node fills in the nonce
+        """
+        return {
+            'from': self.account,
+            'gas': await self.get_gas(to, data),
+            **await self.get_fees(),
+        }
+
+    async def build(self, function_call) -> dict:
+        """Transaction of the contract call, without the nonce, for signing
+        """
+        data = function_call._encode_transaction_data()
+        return {
+            'from': self.account,
+            'to': function_call.address,
+            'data': data,
+            'value': 0,
+            'chainId': await self.get_chain_id(),
+            'gas': await self.get_gas(function_call.address, data),
+            **await self.get_fees(),
+        }
+
+    def track(self, tx_hash, to: str, data: str, gas: int):
+        """Remember the gas limit a sent transaction used, see check()
+        """
+        self.sent[HexBytes(tx_hash)] = (self.gas_key(to, data), gas)
+        while len(self.sent) > self.max_sent:
+            self.sent.popitem(last=False)
+
+    def check(self, tx_hash, receipt):
+        """Drop the gas estimate of a transaction that ran out of gas
+        """
+        entry = self.sent.pop(HexBytes(tx_hash), None)
+        if entry is None:
+            return
+        key, gas = entry
+        if not receipt['status'] and receipt['gasUsed'] >= gas:
+            Logger.log('out of gas, estimating the gas again')
+            self.gas_estimates.pop(key, None)
+
+    def stats(self) -> dict:
+        return {'gas_estimates': self.estimates, 'gas_reused': self.reused}
@@ -1,4 +1,7 @@
+import asyncio
+
 from enum import Enum, IntEnum
+from typing import List
 
 
 # Error codes
@@ -67,6 +70,39 @@ class Initiator(object):
         # return True/False for success/failure
         assert False, "must be implemented in child class"
 
+    async def commit_sending_batch(self, ids: List[str]) -> List[dict]:
+        """Commit many data items, in one transaction if the ledger supports it.
+
+        :param list ids: the identifiers in the originating ledger
+        :returns: a commit_sending() result per id, in order
+        """
+        return list(await asyncio.gather(*[self.commit_sending(id) for id in ids]))
+
+    async def abort_sending_batch(self, ids: List[str], reasons: List[int]) -> List[dict]:
+        """Abort many data items, in one transaction if the ledger supports it.
+
+        :param list ids: the identifiers in the originating ledger
+        :param list reasons: the reason of each abort
+        :returns: an abort_sending() result per id, in order
+        """
+        return list(await asyncio.gather(*[self.abort_sending(id, reason) for id, reason in zip(ids, reasons)]))
+
+    def get_checkpoint(self):
+        """Position in the ledger from which the events need to be replayed after a restart, e.g. a block number.
+        Every event before it has been returned by listen_for_events().
+
+        :returns: a JSON serializable position or None if resuming is not supported
+        """
+        return None
+
+    async def resume_from(self, checkpoint):
+        """Return the events from the checkpoint on in the following listen_for_events() calls.
+        Events returned again are skipped by the node.
+
+        :param checkpoint: from get_checkpoint() before the restart
+        """
+        pass
+
 
 class Responder(object):
     """
@@ -92,6 +128,15 @@ class Responder(object):
         # but for now: True = accept, False = reject
         assert False, "must be implemented in child class"
 
+    async def send_data_batch(self, nonces: List[str], data: List[bytes]) -> List[dict]:
+        """Send many data items, in one transaction if the ledger supports it.
+
+        :param list nonces: the identifiers to be unique inside interledger
+        :param list data: the content of each data item
+        :returns: a send_data() result per nonce, in order
+        """
+        return list(await asyncio.gather(*[self.send_data(nonce, d) for nonce, d in zip(nonces, data)]))
+
 
 class MultiResponder(Responder):
     """
@@ -0,0 +1,71 @@
+import asyncio
+
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    List,
+)
+
+
+class Batcher:
+    """Collects items submitted concurrently into batches.
+
+    A batch is handed to `flush` when it has `max_size` items or when its
+    first item has waited `max_delay` seconds. `flush` returns one result
+    per item, in order, and every submit() gets the result of its own item.
+    """
+
+    def __init__(self, flush: Callable[[List[Any]], Awaitable[List[Any]]], max_size: int, max_delay: float):
+        self.flush = flush
+        self.max_size = max(1, max_size)
+        self.max_delay = max_delay
+
+        self.items: List[Any] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer = None
+        self.tasks = set()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    async def submit(self, item):
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.items.append(item)
+        self.futures.append(future)
+        if len(self.items) >= self.max_size:
+            self.flush_now()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_delay, self.flush_now)
+        return await future
+
+    def flush_now(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.items:
+            return
+        items, futures = self.items, self.futures
+        self.items, self.futures = [], []
+        task = asyncio.ensure_future(self._flush(items, futures))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _flush(self, items: List[Any], futures: List[asyncio.Future]):
+        try:
+            results = await self.flush(items)
+            if len(results) != len(items):
+                raise ValueError(f'{len(results)} results for a batch of {len(items)}')
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
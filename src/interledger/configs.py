@@ -1,7 +1,8 @@
 import json
 import sys
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 from web3 import Web3
 
@@ -19,6 +20,41 @@ class NodeConfig:
     verification_enabled: bool
     route_to_first_node: bool
 
+    # pipeline mode
+    pipeline_enabled: bool = False
+    pipeline_queue_size: int = 1000
+    intake_workers: int = 4
+    execution_workers: int = 16
+    confirmation_workers: int = 16
+    verification_workers: int = 8
+    timeout_workers: int = 4
+    poll_interval: float = 0.1
+
+    # logging
+    log_level: str = 'INFO'
+    log_format: str = 'text'
+    log_queue: bool = False
+
+    # journal
+    journal_path: Optional[str] = None
+    journal_retention: float = 86400
+
+    # duty scheduling
+    duty_scheduler: str = 'modulo'
+    node_ids: List[int] = field(default_factory=list)  # members, 1..node_count if empty
+    virtual_nodes: int = 100
+    duty_replicas: int = 0
+
+    # gossip
+    gossip_listen: Optional[str] = None
+    gossip_peers: List[str] = field(default_factory=list)
+    gossip_max_age: float = 60
+
+    # batching
+    batch_enabled: bool = False
+    batch_size: int = 50
+    batch_delay: float = 0.1
+
 
 # Class for storing all Ethereum-related configuration options
 class EthereumConfig(object):
@@ -44,10 +80,65 @@ class EthereumConfig(object):
         # private key/password to unlock the account if used
         self.private_key = None
         self.password = None
+        # seconds the account is unlocked with the password, renewed at half of it, 0 for the session
+        self.unlock_lease = 300
 
         # whether to inject the PoA middleware for the ledger connection
         self.poa = None
 
+        # byte budget and time to live (seconds, 0 = no limit) of the block cache
+        self.block_cache_size = 64 * 1024 * 1024
+        self.block_cache_ttl = 0
+
+        # number of blocks on top of a block before it is considered final
+        self.confirmation_depth = 0
+
+        # number of final blocks whose contract calls are indexed
+        self.transaction_index_blocks = 100000
+
+        # number of blocks fetched concurrently when searching blocks missing from the index
+        self.scan_concurrency = 8
+
+        # native async HTTP provider instead of running the blocking calls in a thread pool
+        self.async_rpc = False
+
+        # number of concurrent requests to the node
+        self.rpc_concurrency = 16
+
+        # send the concurrent requests of the async provider as JSON-RPC batches
+        self.rpc_batch = False
+        # seconds a request waits for others to join its batch, 0 for one loop iteration
+        self.rpc_batch_window = 0
+        # maximum number of requests in a batch
+        self.rpc_batch_size = 100
+
+        # seconds between the polls of the latest block when it is not pushed over a WebSocket
+        self.head_poll_interval = 0.1
+
+        # seconds between the block number polls of the receipt tracker
+        self.receipt_poll_interval = 0.1
+
+        # multiplier of the gas estimates reused for the calls of a function
+        self.gas_margin = 1.2
+        # seconds the fee parameters of the transactions are reused
+        self.fee_refresh_interval = 10
+
+        # eth_subscribe to the events of the initiator with a ws:// or wss:// URL
+        self.event_subscription = True
+
+        # bounds of the event filter polling interval, which backs off while idle
+        self.event_poll_min_interval = 0.05
+        self.event_poll_max_interval = 1.0
+
+        # number of blocks monitor_confirmations processes per call when behind the head
+        self.monitor_max_blocks = 1000
+
+        # number of blocks per eth_getLogs query
+        self.log_window = 5000
+
+        # number of transfer responses (accepted / rejected) cached
+        self.response_cache_size = 100000
+
 
 def parse_node_config(parser, args_config={}):
     section = 'node'
@@ -65,7 +156,42 @@ def parse_node_config(parser, args_config={}):
         # for testing
         confirm_transfer = cfg.getboolean('confirm_transfer', fallback=True),
         verification_enabled = not cfg.getboolean('verification_disabled', fallback=False),
-        route_to_first_node = cfg.getboolean('route_to_first_node', fallback=False)
+        route_to_first_node = cfg.getboolean('route_to_first_node', fallback=False),
+
+        # pipeline
+        pipeline_enabled = cfg.getboolean('pipeline', fallback=False),
+        pipeline_queue_size = cfg.getint('pipeline_queue_size', fallback=1000),
+        intake_workers = cfg.getint('intake_workers', fallback=4),
+        execution_workers = cfg.getint('execution_workers', fallback=16),
+        confirmation_workers = cfg.getint('confirmation_workers', fallback=16),
+        verification_workers = cfg.getint('verification_workers', fallback=8),
+        timeout_workers = cfg.getint('timeout_workers', fallback=4),
+        poll_interval = cfg.getfloat('poll_interval', fallback=0.1),
+
+        # logging
+        log_level = cfg.get('log_level', fallback='INFO'),
+        log_format = cfg.get('log_format', fallback='text'),
+        log_queue = cfg.getboolean('log_queue', fallback=False),
+
+        # journal
+        journal_path = cfg.get('journal', fallback=None),
+        journal_retention = cfg.getfloat('journal_retention', fallback=86400),
+
+        # duty scheduling
+        duty_scheduler = cfg.get('duty_scheduler', fallback='modulo'),
+        node_ids = [int(node_id) for node_id in cfg.get('nodes', fallback='').split(',') if node_id.strip()],
+        virtual_nodes = cfg.getint('virtual_nodes', fallback=100),
+        duty_replicas = cfg.getint('duty_replicas', fallback=0),
+
+        # gossip
+        gossip_listen = cfg.get('gossip_listen', fallback=None),
+        gossip_peers = [peer.strip() for peer in cfg.get('gossip_peers', fallback='').split(',') if peer.strip()],
+        gossip_max_age = cfg.getfloat('gossip_max_age', fallback=60),
+
+        # batching
+        batch_enabled = cfg.getboolean('batch', fallback=False),
+        batch_size = cfg.getint('batch_size', fallback=50),
+        batch_delay = cfg.getfloat('batch_delay', fallback=0.1),
     )
 
 
@@ -105,6 +231,7 @@ def parse_ethereum(parser, section):
         cfg.password = parser.get(section, 'password')
     except:
         pass
+    cfg.unlock_lease = parser.getfloat(section, 'unlock_lease', fallback=cfg.unlock_lease)
 
     try:
         cfg.poa = parser.get(section, 'poa') in ('true', 'True')
@@ -116,6 +243,27 @@ def parse_ethereum(parser, section):
     except:
         pass
 
+    cfg.block_cache_size = parser.getint(section, 'block_cache_size', fallback=cfg.block_cache_size)
+    cfg.block_cache_ttl = parser.getfloat(section, 'block_cache_ttl', fallback=cfg.block_cache_ttl)
+    cfg.confirmation_depth = parser.getint(section, 'confirmation_depth', fallback=cfg.confirmation_depth)
+    cfg.transaction_index_blocks = parser.getint(section, 'transaction_index_blocks', fallback=cfg.transaction_index_blocks)
+    cfg.scan_concurrency = parser.getint(section, 'scan_concurrency', fallback=cfg.scan_concurrency)
+    cfg.monitor_max_blocks = parser.getint(section, 'monitor_max_blocks', fallback=cfg.monitor_max_blocks)
+    cfg.async_rpc = parser.getboolean(section, 'async_rpc', fallback=cfg.async_rpc)
+    cfg.rpc_concurrency = parser.getint(section, 'rpc_concurrency', fallback=cfg.rpc_concurrency)
+    cfg.rpc_batch = parser.getboolean(section, 'rpc_batch', fallback=cfg.rpc_batch)
+    cfg.rpc_batch_window = parser.getfloat(section, 'rpc_batch_window', fallback=cfg.rpc_batch_window)
+    cfg.rpc_batch_size = parser.getint(section, 'rpc_batch_size', fallback=cfg.rpc_batch_size)
+    cfg.receipt_poll_interval = parser.getfloat(section, 'receipt_poll_interval', fallback=cfg.receipt_poll_interval)
+    cfg.head_poll_interval = parser.getfloat(section, 'head_poll_interval', fallback=cfg.head_poll_interval)
+    cfg.gas_margin = parser.getfloat(section, 'gas_margin', fallback=cfg.gas_margin)
+    cfg.fee_refresh_interval = parser.getfloat(section, 'fee_refresh_interval', fallback=cfg.fee_refresh_interval)
+    cfg.event_subscription = parser.getboolean(section, 'event_subscription', fallback=cfg.event_subscription)
+    cfg.event_poll_min_interval = parser.getfloat(section, 'event_poll_min_interval', fallback=cfg.event_poll_min_interval)
+    cfg.event_poll_max_interval = parser.getfloat(section, 'event_poll_max_interval', fallback=cfg.event_poll_max_interval)
+    cfg.log_window = parser.getint(section, 'log_window', fallback=cfg.log_window)
+    cfg.response_cache_size = parser.getint(section, 'response_cache_size', fallback=cfg.response_cache_size)
+
     return cfg
 
 
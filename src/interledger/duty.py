@@ -0,0 +1,120 @@
+from bisect import bisect_right
+from hashlib import blake2b
+from typing import (
+    List,
+    Sequence,
+    Tuple,
+)
+
+
+class DutyScheduler:
+    """Decides which node is on duty for a transfer in each timeout period.
+
+    The key of a transfer is its id as an integer (0 with route_to_first_node).
+    """
+
+    def duty_of(self, key: int, period_idx: int) -> int:
+        """Node on duty for the transfer in the timeout period
+        """
+        assert False, "must be implemented in child class"
+
+    def is_responsible(self, key: int, node_id: int) -> bool:
+        """Whether the node can ever be on duty for the transfer, i.e. needs to keep it registered
+        """
+        return True
+
+    def update_members(self, node_ids: Sequence[int]):
+        """Apply a change of the members of the bridge
+        """
+        assert False, "must be implemented in child class"
+
+
+class ModuloScheduler(DutyScheduler):
+    """The nodes take turns: node (key + period) % node_count + 1 is on duty.
+
+    Every node keeps every transfer, and a change in the node count moves
+    almost every transfer to another node.
+    """
+
+    def __init__(self, node_count: int):
+        self.node_count = node_count
+
+    def duty_of(self, key: int, period_idx: int) -> int:
+        increment = period_idx % self.node_count
+        return ((key + increment) % self.node_count) + 1
+
+    def update_members(self, node_ids: Sequence[int]):
+        self.node_count = len(node_ids)
+
+
+def ring_hash(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ConsistentHashScheduler(DutyScheduler):
+    """Consistent hash ring with virtual nodes.
+
+    The nodes following the key of a transfer on the ring are its owner and
+    `replicas - 1` backups. The owner is on duty in the first timeout
+    period, the backups in the following ones, and then the turn goes
+    round again. Only these nodes need to keep the transfer registered, and
+    adding or removing a node moves only the transfers next to its points
+    on the ring.
+    """
+
+    def __init__(self, node_ids: Sequence[int], virtual_nodes: int = 100, replicas: int = 0):
+        """
+        :param list node_ids: members of the bridge
+        :param int virtual_nodes: points of each node on the ring
+        :param int replicas: number of nodes responsible for a transfer, 0 for all
+        """
+        self.virtual_nodes = virtual_nodes
+        self.replicas = replicas
+        self.ring: List[Tuple[int, int]] = []
+        self.points: List[int] = []
+        self.node_count = 0
+        self.update_members(node_ids)
+
+    def update_members(self, node_ids: Sequence[int]):
+        node_ids = sorted(set(node_ids))
+        if not node_ids:
+            raise ValueError('at least one node is needed')
+        self.ring = sorted(
+            (ring_hash(f'{node_id}#{vnode}'), node_id)
+            for node_id in node_ids
+            for vnode in range(self.virtual_nodes)
+        )
+        self.points = [point for point, _ in self.ring]
+        self.node_count = len(node_ids)
+
+    def preference_list(self, key: int) -> List[int]:
+        """Owner and backups of the transfer, in the order of their turns
+        """
+        count = min(self.replicas or self.node_count, self.node_count)
+        nodes = []
+        idx = bisect_right(self.points, ring_hash(str(key)))
+        for i in range(len(self.ring)):
+            node_id = self.ring[(idx + i) % len(self.ring)][1]
+            if node_id not in nodes:
+                nodes.append(node_id)
+                if len(nodes) == count:
+                    break
+        return nodes
+
+    def duty_of(self, key: int, period_idx: int) -> int:
+        nodes = self.preference_list(key)
+        return nodes[period_idx % len(nodes)]
+
+    def is_responsible(self, key: int, node_id: int) -> bool:
+        return node_id in self.preference_list(key)
+
+
+def create_duty_scheduler(config) -> DutyScheduler:
+    """Scheduler of the [node] config
+    """
+    if config.duty_scheduler == 'modulo':
+        return ModuloScheduler(config.node_count)
+    if config.duty_scheduler == 'consistent_hash':
+        node_ids = config.node_ids or range(1, config.node_count + 1)
+        return ConsistentHashScheduler(node_ids, config.virtual_nodes, config.duty_replicas)
+    raise ValueError(f'unknown duty_scheduler: {config.duty_scheduler}')
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+from collections import OrderedDict
+from time import time
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+)
+
+from .utils import Logger
+
+
+# kinds of announcements
+SENT = 'sent'  # interledgerReceive is in the responder ledger, info: {'txID', 'blockID'}
+CONFIRMED = 'confirmed'  # interledgerCommit / interledgerAbort sent to the initiator ledger
+VERIFIED = 'verified'  # the transfer has been verified
+
+KINDS = (SENT, CONFIRMED, VERIFIED)
+
+
+class LocalTransport:
+    """In-process transport, e.g. for tests: a message sent by one transport
+    of a hub is received by all the others.
+    """
+
+    def __init__(self, hub: List['LocalTransport']):
+        self.hub = hub
+        self.hub.append(self)
+        self.receivers: List[Callable[[bytes], None]] = []
+
+    def add_receiver(self, receiver: Callable[[bytes], None]):
+        self.receivers.append(receiver)
+
+    async def start(self):
+        pass
+
+    def send(self, data: bytes):
+        loop = asyncio.get_event_loop()
+        for transport in self.hub:
+            if transport is not self:
+                for receiver in transport.receivers:
+                    loop.call_soon(receiver, data)
+
+    def close(self):
+        if self in self.hub:
+            self.hub.remove(self)
+
+
+class UDPTransport(asyncio.DatagramProtocol):
+    """Sends every message to every peer as one UDP datagram.
+
+    Delivery is not guaranteed, which is fine for gossip: a node missing
+    an announcement only does the lookups it would do anyway. The bridges
+    of a node share the transport of a listen address, see connect().
+    """
+
+    transports: Dict[str, 'UDPTransport'] = {}
+
+    def __init__(self, listen: str, peers: List[str]):
+        """
+        :param str listen: host:port to receive from
+        :param list peers: host:port of every other node
+        """
+        self.listen = listen
+        self.peers = [self.parse_address(peer) for peer in peers]
+        self.receivers: List[Callable[[bytes], None]] = []
+        self.transport = None
+
+    @classmethod
+    def connect(cls, listen: str, peers: List[str]) -> 'UDPTransport':
+        if listen not in cls.transports:
+            cls.transports[listen] = cls(listen, peers)
+        return cls.transports[listen]
+
+    @staticmethod
+    def parse_address(address: str):
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+
+    def add_receiver(self, receiver: Callable[[bytes], None]):
+        self.receivers.append(receiver)
+
+    async def start(self):
+        if self.transport is None:
+            self.transport, _ = await asyncio.get_event_loop().create_datagram_endpoint(
+                lambda: self, local_addr=self.parse_address(self.listen)
+            )
+
+    def datagram_received(self, data: bytes, addr):
+        for receiver in self.receivers:
+            receiver(data)
+
+    def send(self, data: bytes):
+        if self.transport is None:
+            return
+        for peer in self.peers:
+            self.transport.sendto(data, peer)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self.transports.pop(self.listen, None)
+
+
+class Gossip:
+    """Announcements of the progress of transfers between the nodes of a bridge.
+
+    Messages are signed with HMAC-SHA256 using the shared secret of the
+    nodes. Messages with a wrong signature, from another bridge, older
+    than `max_age` seconds or seen already are dropped.
+
+    The announcements heard are kept in `reports` until the transfer is
+    forgotten, so the node can skip the lookups a peer has done already.
+    """
+
+    def __init__(self, node_id: int, secret: str, transport, scope: str = '',
+                 max_age: float = 60, max_reports: int = 100000):
+        self.node_id = node_id
+        self.key = secret.encode('utf-8')
+        self.transport = transport
+        self.scope = scope
+        self.max_age = max_age
+        self.max_reports = max_reports
+
+        # transfer id -> {kind: info}
+        self.reports: OrderedDict = OrderedDict()
+        self.seen: OrderedDict = OrderedDict()  # signatures of the recent messages
+        self.on_message: Optional[Callable[[str, str, dict], None]] = None
+
+        self.transport.add_receiver(self.receive)
+
+    async def start(self):
+        await self.transport.start()
+
+    def close(self):
+        self.transport.close()
+
+    def sign(self, payload: bytes) -> str:
+        return hmac.new(self.key, payload, hashlib.sha256).hexdigest()
+
+    def announce(self, kind: str, transfer_id: str, info: dict = None):
+        payload = json.dumps({
+            'scope': self.scope,
+            'node_id': self.node_id,
+            'kind': kind,
+            'transfer_id': transfer_id,
+            'info': info or {},
+            'time': time(),
+        }).encode('utf-8')
+        self.transport.send(json.dumps({'payload': payload.decode('utf-8'), 'mac': self.sign(payload)}).encode('utf-8'))
+
+    def receive(self, data: bytes):
+        try:
+            message = json.loads(data)
+            payload = message['payload'].encode('utf-8')
+            mac = message['mac']
+            if not hmac.compare_digest(self.sign(payload), mac):
+                Logger.log('gossip with a wrong signature dropped')
+                return
+            payload = json.loads(payload)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            Logger.log('malformed gossip dropped:', repr(e))
+            return
+
+        if payload['scope'] != self.scope or payload['node_id'] == self.node_id:
+            return
+        if abs(time() - payload['time']) > self.max_age or mac in self.seen:
+            return  # stale or replayed
+        self.seen[mac] = True
+        if len(self.seen) > self.max_reports:
+            self.seen.popitem(last=False)
+        if payload['kind'] not in KINDS:
+            return
+
+        self.report(payload['kind'], payload['transfer_id'], payload['info'])
+        if self.on_message:
+            self.on_message(payload['kind'], payload['transfer_id'], payload['info'])
+
+    def report(self, kind: str, transfer_id: str, info: dict):
+        self.reports.setdefault(transfer_id, {})[kind] = info
+        self.reports.move_to_end(transfer_id)
+        while len(self.reports) > self.max_reports:
+            self.reports.popitem(last=False)
+
+    def report_of(self, transfer_id: str) -> Dict[str, dict]:
+        return self.reports.get(transfer_id, {})
+
+    def forget(self, transfer_id: str):
+        self.reports.pop(transfer_id, None)
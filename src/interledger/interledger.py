@@ -6,11 +6,20 @@ from time import time
 from typing import (
     Dict,
     List,
+    Set,
     Tuple,
     Optional,
 )
 
-from .transfer import Transfer
+from . import gossip
+from .batch import Batcher
+from .duty import DutyScheduler, create_duty_scheduler
+from .gossip import Gossip, UDPTransport
+from .journal import TransferJournal
+from .pipeline import TransferPipeline
+from .register import TransferRegister
+from .timeout import TimeoutPeriod, TimeoutSchedule
+from .transfer import Transfer, TransferState
 from .utils import Logger
 
 
@@ -19,19 +28,48 @@ SUPPRESS_WARNINGS = True
 
 class DecentralizedInterledger:
 
-    def __init__(self, initiator, responder, config):
+    def __init__(self, initiator, responder, config, name: str = ''):
+        """
+        :param str name: identifies the bridge in the journal shared by the bridges of a node
+        """
         self.initiator = initiator
         self.responder = responder
         self.config = config
+        self.name = name
 
         self.background_tasks = set()
-        self.transfer_register: Dict[Transfer] = {}
+        self.transfer_register = TransferRegister()
+        self.journal = None
+        if self.config.journal_path:
+            self.journal = TransferJournal(self.config.journal_path, name, self.config.journal_retention)
+        # transfers finished before a restart, skipped when their events are replayed
+        self.completed_transfers: Set[str] = set()
+        self.gossip = None
+        if self.config.gossip_listen:
+            transport = UDPTransport.connect(self.config.gossip_listen, self.config.gossip_peers)
+            self.gossip = Gossip(self.config.node_id, self.config.secret, transport, name, self.config.gossip_max_age)
+            self.gossip.on_message = self.on_gossip
+        # many transfers per destination / confirmation transaction
+        self.send_batcher = self.commit_batcher = self.abort_batcher = None
+        if self.config.batch_enabled:
+            self.send_batcher = Batcher(self._send_batch, self.config.batch_size, self.config.batch_delay)
+            self.commit_batcher = Batcher(self._commit_batch, self.config.batch_size, self.config.batch_delay)
+            self.abort_batcher = Batcher(self._abort_batch, self.config.batch_size, self.config.batch_delay)
+        self.timeout_schedule = TimeoutSchedule(self.config.timeout_initial, self.config.timeout_backoff)
+        self.duty_scheduler = create_duty_scheduler(self.config)
+        # duty scheduler of the transfers registered before the last membership change
+        self.previous_duty: Dict[str, DutyScheduler] = {}
         self.running = False
 
         self.initiator.secret = self.config.secret
         self.responder.secret = self.config.secret
 
-        Logger.init(node_id=self.config.node_id)
+        Logger.init(
+            node_id=self.config.node_id,
+            level=self.config.log_level,
+            format=self.config.log_format,
+            use_queue=self.config.log_queue,
+        )
         self.time_previous = 0
 
     def run_in_background(self, coroutine):
@@ -46,68 +84,187 @@ class DecentralizedInterledger:
         task.add_done_callback(self.background_tasks.discard)
 
     def register_transfer(self, transfer: Transfer):
-        self.transfer_register[transfer.id] = transfer
+        deadline = transfer.initiation_timestamp + self.config.timeout_initial
+        self.transfer_register.add(transfer, deadline)
+        if self.journal:
+            self.journal.register(transfer)
 
     def deregister_transfer(self, transfer_id: str) -> Transfer:
-        return self.transfer_register.pop(transfer_id, None)
+        transfer = self.transfer_register.pop(transfer_id, None)
+        if transfer:
+            transfer.state = TransferState.DONE
+            if self.journal:
+                self.journal.deregister(transfer)
+        self.previous_duty.pop(transfer_id, None)
+        if self.gossip:
+            self.gossip.forget(transfer_id)
+        return transfer
+
+    def is_known_transfer(self, transfer_id: str) -> bool:
+        return transfer_id in self.transfer_register or transfer_id in self.completed_transfers
+
+    def record_state(self, transfer: Transfer):
+        if self.journal and transfer.state is not TransferState.DONE:
+            self.journal.update_state(transfer)
+
+    def record_checkpoint(self):
+        """Call when every event listen_for_events() has returned so far is registered
+        """
+        if self.journal:
+            self.journal.checkpoint(self.initiator.get_checkpoint())
+
+    def announce(self, kind: str, transfer: Transfer, info: dict = None):
+        if self.gossip:
+            self.gossip.announce(kind, transfer.id, info)
+
+    def announce_sent(self, transfer: Transfer, response: dict):
+        if response.get('tx_hash') and response.get('blockNumber') is not None:
+            self.announce(gossip.SENT, transfer, {'txID': response['tx_hash'], 'blockID': response['blockNumber']})
+
+    def on_gossip(self, kind: str, transfer_id: str, info: dict):
+        # a peer finished the transfer, forget it unless it is being worked on
+        done = kind == gossip.VERIFIED or (kind == gossip.CONFIRMED and not self.config.verification_enabled)
+        transfer = self.transfer_register.get(transfer_id)
+        if done and transfer and transfer.state is TransferState.REGISTERED:
+            Logger.log(f'transfer {transfer.short_id} {kind} by a peer')
+            self.deregister_transfer(transfer_id)
+
+    async def flush_journal(self):
+        if self.journal and (self.journal.pending or self.journal.pending_checkpoint):
+            batch = self.journal.take_pending()
+            await asyncio.get_event_loop().run_in_executor(None, self.journal.flush, batch)
+
+    async def restore(self):
+        """Reload the unfinished transfers from the journal and replay the events missed while down
+        """
+        transfers, self.completed_transfers, checkpoint = self.journal.load()
+        for transfer in transfers:
+            self.transfer_register.add(transfer, transfer.initiation_timestamp + self.config.timeout_initial)
+        Logger.log(
+            'restored', len(transfers), 'transfers,',
+            len(self.completed_transfers), 'finished, checkpoint:', checkpoint,
+            important=True,
+        )
+        if checkpoint is not None:
+            await self.initiator.resume_from(checkpoint)
 
     def find_transfer_by_initiator_id(self, initiator_id: str) -> Optional[Transfer]:
-        for transfer in list(self.transfer_register.values()):
-            if transfer.initiator_id == initiator_id:
-                return transfer
+        return self.transfer_register.find_by_initiator_id(initiator_id)
 
     def get_transfer_age(self, transfer: Transfer) -> int:
         return (time() - transfer.initiation_timestamp)
 
-    def resolve_timeout_period(self, target_time, period_idx=0):
-        backoff_factor = self.config.timeout_backoff ** period_idx  # exponent
-        period_duration = self.config.timeout_initial * backoff_factor
-        if target_time < period_duration:
-            time_left = period_duration - target_time
-            return period_idx, period_duration, time_left
-        return self.resolve_timeout_period(
-            target_time - period_duration,
-            period_idx + 1
-        )
+    def resolve_timeout_period(self, target_time):
+        period = self.timeout_schedule.period_at(target_time)
+        return period.idx, period.duration, period.time_left(target_time)
+
+    def get_timeout_period(self, transfer: Transfer, transfer_age: float) -> TimeoutPeriod:
+        return self.timeout_schedule.period_of(transfer, transfer_age)
 
     def is_my_duty(self, transfer: Transfer) -> bool:
         transfer_age = self.get_transfer_age(transfer)
-        period_idx, period_duration, time_left = self.resolve_timeout_period(transfer_age)
-        if time_left < (period_duration / 2):
+        period = self.get_timeout_period(transfer, transfer_age)
+        if period.time_left(transfer_age) < (period.duration / 2):
             return False
-        increment = period_idx % self.config.node_count
-        transfer_id = 0 if self.config.route_to_first_node else int(transfer.id)
-        node_id = ((transfer_id + increment) % self.config.node_count) + 1
+        node_id = self.get_duty_scheduler(transfer).duty_of(self.get_duty_key(transfer), period.idx)
         return node_id == self.config.node_id
 
+    def get_duty_scheduler(self, transfer: Transfer) -> DutyScheduler:
+        return self.previous_duty.get(transfer.id, self.duty_scheduler)
+
+    def get_duty_key(self, transfer: Transfer) -> int:
+        return 0 if self.config.route_to_first_node else int(transfer.id)
+
+    def is_responsible(self, transfer: Transfer) -> bool:
+        """Whether this node can be on duty for the transfer, other nodes do not register it
+        """
+        return self.duty_scheduler.is_responsible(self.get_duty_key(transfer), self.config.node_id)
+
+    def reload_config(self, config):
+        """Apply the membership and the duty settings of the reloaded [node] config without a restart
+
+        The new schedule applies to the transfers registered from now on. The
+        nodes which became responsible for a registered transfer never
+        registered it, so the transfers registered before keep the duty of
+        the previous schedule until they are done here or by a peer.
+        """
+        for transfer_id in self.transfer_register:
+            self.previous_duty.setdefault(transfer_id, self.duty_scheduler)
+        self.config.node_count = config.node_count
+        self.config.node_ids = config.node_ids
+        self.config.duty_scheduler = config.duty_scheduler
+        self.config.virtual_nodes = config.virtual_nodes
+        self.config.duty_replicas = config.duty_replicas
+        self.duty_scheduler = create_duty_scheduler(self.config)
+        Logger.log('members:', config.node_ids or config.node_count, important=True)
+
     def is_timed_out(self, transfer: Transfer) -> bool:
         transfer_age = self.get_transfer_age(transfer)
-        period_idx, *_ = self.resolve_timeout_period(transfer_age)
-        return (0 < period_idx)
+        period = self.get_timeout_period(transfer, transfer_age)
+        return (0 < period.idx)
 
     def get_timed_out_transfers(self) -> List[Transfer]:
-        return [
-            t for t in list(self.transfer_register.values())
-            if self.is_timed_out(t) and self.is_my_duty(t)
-        ]
+        now = time()
+        transfers = []
+        for t in self.transfer_register.pop_due(now):
+            if self.is_timed_out(t) and self.is_my_duty(t):
+                transfers.append(t)
+                # keep retrying on every sweep while on duty
+                self.transfer_register.schedule(t.id, now)
+            else:
+                # duty can change only when the next period starts
+                period = self.get_timeout_period(t, self.get_transfer_age(t))
+                self.transfer_register.schedule(t.id, t.initiation_timestamp + period.end)
+        return transfers
+
+    async def send_data(self, transfer: Transfer) -> dict:
+        """Send the data of the transfer to the responder, batched with other transfers if batching is enabled
+        """
+        if self.send_batcher:
+            return await self.send_batcher.submit((transfer.id, transfer.data))
+        return await self.responder.send_data(transfer.id, transfer.data)
+
+    async def commit_sending(self, initiator_id: str) -> dict:
+        if self.commit_batcher:
+            return await self.commit_batcher.submit(initiator_id)
+        return await self.initiator.commit_sending(initiator_id)
+
+    async def abort_sending(self, initiator_id: str, reason: int) -> dict:
+        if self.abort_batcher:
+            return await self.abort_batcher.submit((initiator_id, reason))
+        return await self.initiator.abort_sending(initiator_id, reason)
+
+    async def _send_batch(self, items: List[Tuple[str, bytes]]) -> List[dict]:
+        Logger.log('send batch of', len(items))
+        return await self.responder.send_data_batch([nonce for nonce, _ in items], [data for _, data in items])
+
+    async def _commit_batch(self, initiator_ids: List[str]) -> List[dict]:
+        Logger.log('commit batch of', len(initiator_ids))
+        return await self.initiator.commit_sending_batch(initiator_ids)
+
+    async def _abort_batch(self, items: List[Tuple[str, int]]) -> List[dict]:
+        Logger.log('abort batch of', len(items))
+        return await self.initiator.abort_sending_batch([id for id, _ in items], [reason for _, reason in items])
 
     async def execute_transfer(self, transfer: Transfer):
         Logger.log(transfer.short_id)
-        response = await self.responder.send_data(transfer.id, transfer.data)
+        response = await self.send_data(transfer)
+        self.announce_sent(transfer, response)
         if self.config.confirm_transfer and response['status'] is True:
             await self.confirm_transfer(transfer, response.get('error_code'))
 
     async def confirm_transfer(self, transfer: Transfer, error: int):
         if error:
             Logger.log('abort:', transfer.short_id)
-            await self.initiator.abort_sending(transfer.initiator_id, error)
+            await self.abort_sending(transfer.initiator_id, error)
         else:
             Logger.log('commit:', transfer.short_id)
-            await self.initiator.commit_sending(transfer.initiator_id)
+            await self.commit_sending(transfer.initiator_id)
+        self.announce(gossip.CONFIRMED, transfer)
         self.deregister_transfer(transfer.id)
 
-    async def get_responder_ack(self, transfer: Transfer) -> Tuple[str, dict]:
-        ack = await self.responder.check_response(transfer.id)
+    async def get_responder_ack(self, transfer: Transfer, from_block: int = 0) -> Tuple[str, dict]:
+        ack = await self.responder.check_response(transfer.id, from_block)
 
         if ack == 'InterledgerEventAccepted':
             Logger.log('InterledgerEventAccepted')
@@ -131,7 +288,7 @@ class DecentralizedInterledger:
         data_match = transfer.data == responder_data
 
         # check that ack from responder to initiator matches
-        responder_ack, final_tx = await self.get_responder_ack(transfer)
+        responder_ack, final_tx = await self.get_responder_ack(transfer, responder_tx['blockID'])
         initiator_ack = await self.initiator.check_confirmation(final_tx)
 
         ack_match = (
@@ -161,10 +318,13 @@ class DecentralizedInterledger:
             await self.responder.report_error(transfer.id, reason)
             Logger.log('INVALID TRANSFER:', transfer.id)
 
+        self.announce(gossip.VERIFIED, transfer)
         self.deregister_transfer(transfer.id)
 
     async def process_initiator_event(self, event):
         transfer = await self.initiator.process_event(event)
+        if self.is_known_transfer(transfer.id) or not self.is_responsible(transfer):
+            return  # replayed or owned by other nodes
         self.register_transfer(transfer)
         Logger.log(f"transfer {transfer.short_id} registered")
 
@@ -176,13 +336,19 @@ class DecentralizedInterledger:
         events = await self.initiator.listen_for_events()
         tasks = [asyncio.create_task(self.process_initiator_event(e)) for e in events]
         await asyncio.gather(*tasks)
+        self.record_checkpoint()
 
     async def process_timeout(self, transfer: Transfer):
         Logger.log('transfer id:', transfer.short_id)
 
+        report = self.gossip.report_of(transfer.id) if self.gossip else {}
+        if gossip.CONFIRMED in report:
+            Logger.log('transfer confirmed by a peer')
+            return
+
         # 1. transfer not sent
 
-        send_tx = await self.responder.get_interledgerReceive_tx(transfer)
+        send_tx = report.get(gossip.SENT) or await self.responder.get_interledgerReceive_tx(transfer)
 
         if not send_tx:
             Logger.log('transfer not sent')
@@ -190,7 +356,7 @@ class DecentralizedInterledger:
             return
 
         # 1.2. transfer sent but event not received
-        ack, ack_tx = await self.get_responder_ack(transfer)
+        ack, ack_tx = await self.get_responder_ack(transfer, send_tx['blockID'])
         if not ack:
             return  # vague problem, report to client
 
@@ -225,6 +391,13 @@ class DecentralizedInterledger:
                 tasks.append(task)
         await asyncio.gather(*tasks)
 
+    def stats(self) -> dict:
+        stats = {'name': self.name, 'transfers': len(self.transfer_register)}
+        for role, adapter in (('initiator', self.initiator), ('responder', self.responder)):
+            if hasattr(adapter, 'stats'):
+                stats[role] = adapter.stats()
+        return stats
+
     def print_transfer_register(self):
         time_now = int(time() / 10)
         if time_now > self.time_previous:
@@ -232,6 +405,9 @@ class DecentralizedInterledger:
             Logger.log(self.transfer_register)
 
     async def _run(self):
+        if self.config.pipeline_enabled:
+            await TransferPipeline(self).run()
+            return
         while self.running:
             # NOTE! don't change the order, unless you know what you are doing
             await self.process_initiator_events()
@@ -239,6 +415,7 @@ class DecentralizedInterledger:
                 await self.process_verifications()
             if self.config.timeout_enabled:
                 await self.process_timeouts()
+            await self.flush_journal()
             self.print_transfer_register()
 
     async def run(self):
@@ -246,13 +423,23 @@ class DecentralizedInterledger:
         print("DIL running...")
         print("*******************************************")
         self.running = True
-
-        if SUPPRESS_WARNINGS:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
+        if self.journal:
+            await self.restore()
+        if self.gossip:
+            await self.gossip.start()
+
+        try:
+            if SUPPRESS_WARNINGS:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    await self._run()
+            else:
                 await self._run()
-        else:
-            await self._run()
+        finally:
+            if self.journal:
+                self.journal.close()
+            if self.gossip:
+                self.gossip.close()
 
     def stop(self):
         """Stop the interledger run() operation
@@ -0,0 +1,163 @@
+import json
+import sqlite3
+
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import (
+    Any,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from .transfer import Transfer
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    scope TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data BLOB,
+    initiator_id TEXT NOT NULL,
+    initiation_timestamp INTEGER NOT NULL,
+    initiator_tx_key TEXT,
+    state TEXT NOT NULL,
+    done_at REAL,
+    PRIMARY KEY (scope, id)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    scope TEXT PRIMARY KEY,
+    position TEXT NOT NULL
+);
+"""
+
+
+class TransferJournal:
+    """Transfers of a node and the position of its initiator, kept on disk.
+
+    The journal is an SQLite database in WAL mode, i.e. an append-only log
+    on disk. Changes are buffered in memory, where consecutive changes of
+    a transfer collapse into its latest row, and written by flush() in one
+    transaction, so a batch costs one fsync.
+
+    Finished transfers are kept for `retention` seconds, so that events
+    replayed after a restart are not executed twice.
+    """
+
+    def __init__(self, path: str, scope: str = '', retention: float = 86400):
+        """
+        :param str path: database file
+        :param str scope: separates the bridges of a node sharing the file
+        :param float retention: seconds a finished transfer is remembered
+        """
+        self.path = path
+        self.scope = scope
+        self.retention = retention
+
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=FULL')
+        self.db.executescript(SCHEMA)
+        self.lock = Lock()  # flush() runs in an executor
+
+        self.pending: OrderedDict = OrderedDict()  # transfer id -> row
+        self.pending_checkpoint = None
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def _row(self, transfer: Transfer, done_at: float = None) -> tuple:
+        return (
+            self.scope,
+            transfer.id,
+            transfer.data,
+            transfer.initiator_id,
+            transfer.initiation_timestamp,
+            json.dumps(transfer.initiator_tx_key),
+            transfer.state.value,
+            done_at,
+        )
+
+    def register(self, transfer: Transfer):
+        self.pending[transfer.id] = self._row(transfer)
+        self.pending.move_to_end(transfer.id)
+
+    def update_state(self, transfer: Transfer):
+        self.register(transfer)
+
+    def deregister(self, transfer: Transfer):
+        self.pending[transfer.id] = self._row(transfer, done_at=time())
+        self.pending.move_to_end(transfer.id)
+
+    def checkpoint(self, position: Any):
+        """Position of the initiator, e.g. a block number, from which the events are replayed after a restart
+        """
+        if position is not None:
+            self.pending_checkpoint = json.dumps(position)
+
+    def take_pending(self) -> Tuple[List[tuple], Optional[str]]:
+        rows, checkpoint = list(self.pending.values()), self.pending_checkpoint
+        self.pending = OrderedDict()
+        self.pending_checkpoint = None
+        return rows, checkpoint
+
+    def flush(self, batch: Tuple[List[tuple], Optional[str]] = None):
+        """Write the buffered changes in one transaction
+
+        :param batch: from take_pending(), lets the caller write in another thread
+        """
+        rows, checkpoint = batch or self.take_pending()
+        if not rows and checkpoint is None:
+            return
+        with self.lock:
+            self.db.execute('BEGIN')
+            try:
+                self.db.executemany('INSERT OR REPLACE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                if checkpoint is not None:
+                    self.db.execute('INSERT OR REPLACE INTO checkpoints VALUES (?, ?)', (self.scope, checkpoint))
+                self.db.execute('COMMIT')
+            except Exception:
+                self.db.execute('ROLLBACK')
+                raise
+
+    def load(self) -> Tuple[List[Transfer], Set[str], Any]:
+        """Read the journal at startup
+
+        :returns: the unfinished transfers, the ids of the finished ones and the checkpoint of the initiator
+        """
+        with self.lock:
+            self.db.execute(
+                'DELETE FROM transfers WHERE scope = ? AND done_at < ?',
+                (self.scope, time() - self.retention),
+            )
+            rows = self.db.execute(
+                'SELECT id, data, initiator_id, initiation_timestamp, initiator_tx_key, state, done_at'
+                ' FROM transfers WHERE scope = ?',
+                (self.scope,),
+            ).fetchall()
+            checkpoint = self.db.execute(
+                'SELECT position FROM checkpoints WHERE scope = ?', (self.scope,)
+            ).fetchone()
+
+        transfers, completed = [], set()
+        for id, data, initiator_id, initiation_timestamp, initiator_tx_key, state, done_at in rows:
+            if done_at is not None:
+                completed.add(id)
+                continue
+            # whatever the transfer was doing was cut short, the timeout
+            # sweeps find out how far it got
+            transfers.append(Transfer(
+                id=id,
+                data=data,
+                initiator_id=initiator_id,
+                initiation_timestamp=initiation_timestamp,
+                initiator_tx_key=json.loads(initiator_tx_key),
+            ))
+        return transfers, completed, json.loads(checkpoint[0]) if checkpoint else None
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.db.close()
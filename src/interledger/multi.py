@@ -0,0 +1,217 @@
+import asyncio
+
+from time import monotonic
+from typing import (
+    Dict,
+    List,
+    Set,
+)
+
+from .adapter.interfaces import ErrorCode, MultiResponder, Responder
+from .utils import Logger
+
+
+class LedgerLatency:
+    """Latency of the operations sent to one destination ledger
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        self.calls += 1
+        self.timeouts += timed_out
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self) -> dict:
+        return {
+            'calls': self.calls,
+            'timeouts': self.timeouts,
+            'mean': self.total / self.calls if self.calls else 0.0,
+            'last': self.last,
+            'max': self.max,
+        }
+
+
+class MultiLedgerResponder(Responder):
+    """Sends a transfer to several destination ledgers, as one Responder of a DecentralizedInterledger.
+
+    A transfer is first inquired from every ledger with send_data_inquire().
+    If every ledger accepts it, the data is sent to all of them with
+    send_data(), otherwise the transfer is aborted everywhere with
+    abort_send_data(). Each phase runs on all the ledgers concurrently and
+    every ledger has its own `timeout`, so a slow ledger delays the phase
+    only up to its timeout instead of queueing the others behind it.
+
+    When the data reaches only some of the ledgers, a retry of the transfer
+    inquires and sends to the other ledgers only. The ledgers that have the
+    data are remembered from the responses, and after a restart from
+    get_interledgerReceive_tx().
+
+    The block of interledgerReceive in each ledger is kept from the same
+    responses until the transfer is resolved, and each ledger searches for
+    the response of the transfer from its own block in check_response().
+    """
+
+    def __init__(self, responders: Dict[str, MultiResponder], timeout: float = 120):
+        """
+        :param dict responders: name of the ledger -> its responder
+        :param float timeout: seconds each ledger has for an operation
+        """
+        if not responders:
+            raise ValueError('at least one responder is needed')
+        self.responders = responders
+        self.timeout = timeout
+        self._secret = None
+        self.latency = {name: LedgerLatency() for name in responders}
+        # nonce -> the ledgers holding the data, while not every ledger does
+        self.delivered: Dict[str, Set[str]] = {}
+        # nonce -> name of the ledger -> block of its interledgerReceive
+        self.receive_blocks: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def secret(self):
+        return self._secret
+
+    @secret.setter
+    def secret(self, secret):
+        self._secret = secret
+        for responder in self.responders.values():
+            responder.secret = secret
+
+    async def call(self, name: str, operation: str, *args) -> dict:
+        """Run the operation of one ledger within its timeout
+        """
+        start = monotonic()
+        try:
+            response = await asyncio.wait_for(getattr(self.responders[name], operation)(*args), self.timeout)
+        except asyncio.TimeoutError as e:
+            self.latency[name].record(monotonic() - start, timed_out=True)
+            Logger.log(f'{operation} timed out in {name}')
+            return {"status": False,
+                    "error_code": ErrorCode.TIMEOUT,
+                    "message": f"{operation} timed out after {self.timeout} seconds",
+                    "exception": e}
+        except Exception as e:
+            # one broken ledger must not fail the operation in the others
+            self.latency[name].record(monotonic() - start)
+            Logger.log(f'{operation} failed in {name}:', repr(e))
+            return {"status": False,
+                    "error_code": ErrorCode.TRANSACTION_FAILURE,
+                    "message": str(e),
+                    "exception": e}
+        self.latency[name].record(monotonic() - start)
+        return response
+
+    async def fan_out(self, operation: str, *args, names: List[str] = None) -> Dict[str, dict]:
+        """Run the operation in every ledger, or in the given ones, concurrently
+
+        :returns: name of the ledger -> its response
+        """
+        names = list(self.responders) if names is None else names
+        responses = await asyncio.gather(*[self.call(name, operation, *args) for name in names])
+        return dict(zip(names, responses))
+
+    async def send_data(self, nonce: str, data: bytes) -> dict:
+        """Inquire every ledger, then send the data to all of them or abort in all of them
+
+        :returns: a send_data() result, with the response of each ledger in 'responses'
+            and the ledgers that had the data from an earlier attempt in 'delivered'
+        """
+        delivered = self.delivered.get(nonce, set())
+        names = [name for name in self.responders if name not in delivered]
+        if delivered:
+            Logger.log(f'sending {nonce} again to', ', '.join(names))
+
+        inquiries = await self.fan_out('send_data_inquire', nonce, data, names=names)
+        rejected = [name for name, response in inquiries.items() if not response.get('status')]
+        if rejected:
+            Logger.log('inquiry rejected by', ', '.join(rejected))
+            responses = await self.fan_out('abort_send_data', nonce, ErrorCode.INQUIRY_REJECT, names=names)
+            return {"status": False,
+                    "error_code": ErrorCode.INQUIRY_REJECT,
+                    "message": f"Inquiry rejected by {', '.join(rejected)}",
+                    "nonce": nonce,
+                    "inquiries": inquiries,
+                    "responses": responses,
+                    "delivered": sorted(delivered)}
+
+        responses = await self.fan_out('send_data', nonce, data, names=names)
+        self.record_blocks(nonce, {name: response.get('blockNumber') for name, response in responses.items()
+                                   if response.get('status')})
+        failed = [name for name, response in responses.items() if not response.get('status')]
+        result = {"nonce": nonce,
+                  "inquiries": inquiries,
+                  "responses": responses,
+                  "delivered": sorted(delivered)}
+        if failed:
+            self.delivered[nonce] = delivered | {name for name in names if name not in failed}
+            return {"status": False,
+                    "error_code": ErrorCode.TRANSACTION_FAILURE,
+                    "message": f"Sending failed in {', '.join(failed)}",
+                    **result}
+        self.delivered.pop(nonce, None)
+        return {"status": True, **result}
+
+    def record_blocks(self, nonce: str, blocks: Dict[str, int]):
+        blocks = {name: block for name, block in blocks.items() if block is not None}
+        if blocks:
+            self.receive_blocks.setdefault(nonce, {}).update(blocks)
+
+    async def check_response(self, transfer_id: str, from_block: int = 0) -> str:
+        # from_block is the block of the first ledger, as in get_interledgerReceive_tx()
+        first = next(iter(self.responders))
+        blocks = self.receive_blocks.get(transfer_id, {})
+        acks = await asyncio.gather(*[
+            responder.check_response(transfer_id, blocks.get(name, from_block if name == first else 0))
+            for name, responder in self.responders.items()
+        ])
+        if 'InterledgerEventRejected' in acks:
+            ack = 'InterledgerEventRejected'
+        elif all(ack == 'InterledgerEventAccepted' for ack in acks):
+            ack = 'InterledgerEventAccepted'
+        else:
+            return ''
+        # the responders answer again from their response caches
+        self.receive_blocks.pop(transfer_id, None)
+        return ack
+
+    async def get_send_response(self, tx_hash: str, nonce: str) -> dict:
+        # there is a transaction per ledger, the responses tell how the transfer ended
+        ack = await self.check_response(nonce)
+        if ack == 'InterledgerEventAccepted':
+            return {"status": True, "nonce": nonce}
+        return {"status": False,
+                "error_code": ErrorCode.APPLICATION_REJECT if ack else ErrorCode.TRANSACTION_FAILURE,
+                "message": ack or "No response received from every ledger",
+                "nonce": nonce}
+
+    async def get_interledgerReceive_tx(self, transfer) -> dict:
+        """The call of the first ledger, if the transfer was sent to every ledger
+        """
+        calls = await asyncio.gather(*[
+            responder.get_interledgerReceive_tx(transfer) for responder in self.responders.values()
+        ])
+        self.record_blocks(transfer.id, {
+            name: call.get('blockID') for name, call in zip(self.responders, calls) if call
+        })
+        if not all(calls):
+            # a retry sends only to the ledgers without the transfer
+            delivered = {name for name, call in zip(self.responders, calls) if call}
+            if delivered:
+                self.delivered[transfer.id] = self.delivered.get(transfer.id, set()) | delivered
+            return {}
+        self.delivered.pop(transfer.id, None)
+        return calls[0]
+
+    async def report_error(self, nonce: str, reason: int) -> Dict[str, dict]:
+        return await self.fan_out('report_error', nonce, reason)
+
+    def stats(self) -> dict:
+        return {name: latency.stats() for name, latency in self.latency.items()}
@@ -0,0 +1,216 @@
+import asyncio
+
+from typing import (
+    Dict,
+    Set,
+)
+
+from .transfer import Transfer, TransferState
+from .utils import Logger
+
+
+class TransferPipeline:
+    """Runs the phases of a DecentralizedInterledger as independent workers.
+
+    The stages are connected with bounded queues:
+
+        intake -> events -> execution -> confirmation
+        monitor -> verification
+        sweeper -> timeout
+
+    The serial loop relies on the global order of the phases, here a stage
+    only gets a transfer after claiming it from the state the stage expects,
+    so one transfer is never executed, confirmed, verified and timed out at
+    the same time while other transfers keep flowing.
+    """
+
+    def __init__(self, dil):
+        self.dil = dil
+        self.config = dil.config
+
+        size = self.config.pipeline_queue_size
+        self.event_queue = asyncio.Queue(size)
+        self.execution_queue = asyncio.Queue(size)
+        self.confirmation_queue = asyncio.Queue(size)
+        self.verification_queue = asyncio.Queue(size)
+        self.timeout_queue = asyncio.Queue(size)
+
+        # events fetched from the initiator but not registered yet
+        self.intake_backlog = 0
+        self.intake_round = 0
+        # confirmations seen before the transfer was registered: {initiator_id: intake_round}
+        self.unmatched_confirmations: Dict[str, int] = {}
+        # confirmations seen while the transfer was busy in another stage
+        self.deferred_verifications: Set[str] = set()
+
+        self.tasks = []
+
+    # state transitions
+
+    def claim(self, transfer: Transfer, state: TransferState) -> bool:
+        if transfer.state is not TransferState.REGISTERED:
+            return False
+        transfer.state = state
+        self.dil.record_state(transfer)
+        return True
+
+    async def release(self, transfer: Transfer):
+        if transfer.state is TransferState.DONE:
+            self.deferred_verifications.discard(transfer.initiator_id)
+            return
+        transfer.state = TransferState.REGISTERED
+        self.dil.record_state(transfer)
+        if transfer.initiator_id in self.deferred_verifications:
+            await self.schedule_verification(transfer)
+
+    async def schedule_verification(self, transfer: Transfer) -> bool:
+        if not self.claim(transfer, TransferState.VERIFYING):
+            self.deferred_verifications.add(transfer.initiator_id)
+            return False
+        self.deferred_verifications.discard(transfer.initiator_id)
+        await self.verification_queue.put(transfer)
+        return True
+
+    def prune_unmatched_confirmations(self):
+        # the events preceding these confirmations would have been registered already
+        if self.intake_backlog:
+            return
+        for initiator_id, intake_round in list(self.unmatched_confirmations.items()):
+            if intake_round < self.intake_round - 1:
+                del self.unmatched_confirmations[initiator_id]
+
+    # producers
+
+    async def intake(self) -> bool:
+        events = await self.dil.initiator.listen_for_events()
+        for event in events:
+            self.intake_backlog += 1
+            await self.event_queue.put(event)
+        self.intake_round += 1
+        if not self.intake_backlog:
+            self.dil.record_checkpoint()
+        self.prune_unmatched_confirmations()
+        return not events
+
+    async def monitor(self) -> bool:
+        initiator_ids = await self.dil.initiator.monitor_confirmations()
+        scheduled = False
+        for initiator_id in initiator_ids:
+            transfer = self.dil.find_transfer_by_initiator_id(initiator_id)
+            if transfer:
+                scheduled |= await self.schedule_verification(transfer)
+            elif initiator_id not in self.unmatched_confirmations:
+                self.unmatched_confirmations[initiator_id] = self.intake_round
+        return not scheduled
+
+    async def sweep_timeouts(self) -> bool:
+        for transfer in self.dil.get_timed_out_transfers():
+            if self.claim(transfer, TransferState.TIMING_OUT):
+                await self.timeout_queue.put(transfer)
+        return True
+
+    # consumers
+
+    async def register(self, event):
+        try:
+            transfer = await self.dil.initiator.process_event(event)
+            if self.dil.is_known_transfer(transfer.id) or not self.dil.is_responsible(transfer):
+                return  # replayed or owned by other nodes
+            self.dil.register_transfer(transfer)
+            Logger.log(f"transfer {transfer.short_id} registered")
+
+            if self.unmatched_confirmations.pop(transfer.initiator_id, None) is not None:
+                await self.schedule_verification(transfer)
+            elif self.dil.is_my_duty(transfer) and self.claim(transfer, TransferState.EXECUTING):
+                await self.execution_queue.put(transfer)
+        finally:
+            self.intake_backlog -= 1
+            if not self.intake_backlog:
+                self.dil.record_checkpoint()
+
+    async def execute(self, transfer: Transfer):
+        response = {}
+        try:
+            Logger.log(transfer.short_id)
+            response = await self.dil.send_data(transfer)
+            self.dil.announce_sent(transfer, response)
+        finally:
+            if self.config.confirm_transfer and response.get('status') is True:
+                transfer.state = TransferState.CONFIRMING
+                self.dil.record_state(transfer)
+                await self.confirmation_queue.put((transfer, response.get('error_code')))
+            else:
+                await self.release(transfer)
+
+    async def confirm(self, item):
+        transfer, error = item
+        try:
+            await self.dil.confirm_transfer(transfer, error)
+        finally:
+            await self.release(transfer)
+
+    async def verify(self, transfer: Transfer):
+        try:
+            await self.dil.verify_transfer(transfer)
+        finally:
+            await self.release(transfer)
+
+    async def time_out(self, transfer: Transfer):
+        try:
+            await self.dil.process_timeout(transfer)
+        finally:
+            await self.release(transfer)
+
+    # workers
+
+    async def poll(self, step):
+        while self.dil.running:
+            try:
+                idle = await step()
+            except Exception as e:
+                Logger.log(f'{step.__name__} failed:', repr(e))
+                idle = True
+            if idle:
+                await asyncio.sleep(self.config.poll_interval)
+            else:
+                await asyncio.sleep(0)
+
+    async def consume(self, queue: asyncio.Queue, handler):
+        while True:
+            item = await queue.get()
+            try:
+                await handler(item)
+            except Exception as e:
+                Logger.log(f'{handler.__name__} failed:', repr(e))
+            finally:
+                queue.task_done()
+
+    def spawn(self, coroutine):
+        self.tasks.append(asyncio.create_task(coroutine))
+
+    def spawn_consumers(self, count: int, queue: asyncio.Queue, handler):
+        for _ in range(max(1, count)):
+            self.spawn(self.consume(queue, handler))
+
+    async def run(self):
+        self.spawn(self.poll(self.intake))
+        self.spawn_consumers(self.config.intake_workers, self.event_queue, self.register)
+        self.spawn_consumers(self.config.execution_workers, self.execution_queue, self.execute)
+        self.spawn_consumers(self.config.confirmation_workers, self.confirmation_queue, self.confirm)
+        if self.config.verification_enabled:
+            self.spawn(self.poll(self.monitor))
+            self.spawn_consumers(self.config.verification_workers, self.verification_queue, self.verify)
+        if self.config.timeout_enabled:
+            self.spawn(self.poll(self.sweep_timeouts))
+            self.spawn_consumers(self.config.timeout_workers, self.timeout_queue, self.time_out)
+
+        try:
+            while self.dil.running:
+                self.dil.print_transfer_register()
+                await self.dil.flush_journal()
+                await asyncio.sleep(self.config.poll_interval)
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks = []
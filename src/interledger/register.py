@@ -0,0 +1,97 @@
+import heapq
+
+from itertools import count
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .transfer import Transfer
+
+
+class TransferRegister:
+    """In-flight transfers indexed by transfer id, initiator id and timeout deadline.
+
+    Initiator ids are not unique (the same asset can be transferred again),
+    so the initiator index keeps every transfer sharing the id in
+    registration order. Deadlines are kept in a heap with lazy deletion:
+    stale heap entries are skipped when popped.
+    """
+
+    def __init__(self):
+        self.transfers: Dict[str, Transfer] = {}
+        self.initiator_index: Dict[str, Dict[str, Transfer]] = {}
+        self.deadlines: Dict[str, float] = {}
+        self.timeouts: List[Tuple[float, int, str]] = []
+        self.counter = count()
+
+    def __len__(self) -> int:
+        return len(self.transfers)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.transfers)
+
+    def __contains__(self, transfer_id: str) -> bool:
+        return transfer_id in self.transfers
+
+    def __getitem__(self, transfer_id: str) -> Transfer:
+        return self.transfers[transfer_id]
+
+    def __repr__(self) -> str:
+        return repr(self.transfers)
+
+    def get(self, transfer_id: str, default=None) -> Optional[Transfer]:
+        return self.transfers.get(transfer_id, default)
+
+    def values(self):
+        return self.transfers.values()
+
+    def add(self, transfer: Transfer, deadline: float):
+        self.pop(transfer.id)
+        self.transfers[transfer.id] = transfer
+        self.initiator_index.setdefault(transfer.initiator_id, {})[transfer.id] = transfer
+        self.schedule(transfer.id, deadline)
+
+    def pop(self, transfer_id: str, default=None) -> Optional[Transfer]:
+        transfer = self.transfers.pop(transfer_id, None)
+        if transfer is None:
+            return default
+        self.deadlines.pop(transfer_id, None)
+        transfers = self.initiator_index.get(transfer.initiator_id, {})
+        transfers.pop(transfer_id, None)
+        if not transfers:
+            self.initiator_index.pop(transfer.initiator_id, None)
+        return transfer
+
+    def find_by_initiator_id(self, initiator_id: str) -> Optional[Transfer]:
+        for transfer in self.initiator_index.get(initiator_id, {}).values():
+            return transfer
+
+    def find_all_by_initiator_id(self, initiator_id: str) -> List[Transfer]:
+        return list(self.initiator_index.get(initiator_id, {}).values())
+
+    def schedule(self, transfer_id: str, deadline: float):
+        """Set the next time the transfer needs to be looked at by a timeout sweep
+        """
+        if transfer_id not in self.transfers:
+            return
+        self.deadlines[transfer_id] = deadline
+        heapq.heappush(self.timeouts, (deadline, next(self.counter), transfer_id))
+
+    def pop_due(self, now: float) -> List[Transfer]:
+        """Remove and return the transfers whose deadline has passed.
+
+        The caller is expected to schedule a new deadline for the transfers
+        that stay registered, otherwise they are not swept again.
+        """
+        due = []
+        while self.timeouts and self.timeouts[0][0] <= now:
+            deadline, _, transfer_id = heapq.heappop(self.timeouts)
+            if self.deadlines.get(transfer_id) != deadline:
+                continue  # deregistered or rescheduled
+            del self.deadlines[transfer_id]
+            due.append(self.transfers[transfer_id])
+        return due
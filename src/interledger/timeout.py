@@ -0,0 +1,61 @@
+from bisect import bisect_right
+from typing import (
+    List,
+    NamedTuple,
+)
+
+from .transfer import Transfer
+
+
+class TimeoutPeriod(NamedTuple):
+    idx: int
+    start: float  # offset from the initiation of the transfer
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def time_left(self, age: float) -> float:
+        return self.end - age
+
+
+class TimeoutSchedule:
+    """Timeout periods of a transfer, period k lasting `initial * backoff ** k`.
+
+    The start of each period is kept in a table, so resolving the period of
+    a transfer age is a binary search over a few dozen entries (the table
+    grows exponentially with backoff > 1) and a division with backoff == 1.
+    """
+
+    def __init__(self, initial: int, backoff: int):
+        if initial <= 0:
+            raise ValueError('timeout_initial must be positive')
+        if backoff < 1:
+            raise ValueError('timeout_backoff must be at least 1')
+        self.initial = initial
+        self.backoff = backoff
+        self.boundaries: List[float] = [0, initial]
+
+    def _extend(self, age: float):
+        while self.boundaries[-1] <= age:
+            idx = len(self.boundaries) - 1
+            self.boundaries.append(self.boundaries[-1] + self.initial * self.backoff ** idx)
+
+    def period_at(self, age: float) -> TimeoutPeriod:
+        if age < self.initial:
+            return TimeoutPeriod(0, 0, self.initial)
+        if self.backoff == 1:
+            idx = int(age // self.initial)
+            return TimeoutPeriod(idx, idx * self.initial, (idx + 1) * self.initial)
+        self._extend(age)
+        idx = bisect_right(self.boundaries, age) - 1
+        return TimeoutPeriod(idx, self.boundaries[idx], self.boundaries[idx + 1])
+
+    def period_of(self, transfer: Transfer, age: float) -> TimeoutPeriod:
+        """Same as period_at(), but reuses the period cached on the transfer until it ends
+        """
+        period = transfer.timeout_period
+        if period is None or not (period.start <= age < period.end):
+            period = transfer.timeout_period = self.period_at(age)
+        return period
@@ -1,7 +1,26 @@
 from dataclasses import (
     asdict,
     dataclass,
+    field,
 )
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+)
+
+if TYPE_CHECKING:
+    from .timeout import TimeoutPeriod
+
+
+class TransferState(Enum):
+    REGISTERED = 'registered'  # idle, waiting for the next stage
+    EXECUTING = 'executing'  # interledgerReceive in progress
+    CONFIRMING = 'confirming'  # interledgerCommit / interledgerAbort in progress
+    VERIFYING = 'verifying'
+    TIMING_OUT = 'timing_out'
+    DONE = 'done'
+
 
 @dataclass
 class Transfer:
@@ -10,6 +29,9 @@ class Transfer:
     initiator_id: str
     initiation_timestamp: int
     initiator_tx_key: str
+    state: TransferState = field(default=TransferState.REGISTERED, compare=False)
+    # timeout period of the latest duty / timeout check
+    timeout_period: Optional['TimeoutPeriod'] = field(default=None, init=False, repr=False, compare=False)
 
     def as_dict(self) -> dict:
         return asdict(self)
@@ -1,5 +1,10 @@
 import asyncio
-import inspect
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
 
 from datetime import datetime
 from hashlib import sha256
@@ -10,35 +15,161 @@ def generate_hash_id(seed: str, salt: str) -> str:
     return str(int(f'0x{hash}', 0))
 
 
+class LogMessage:
+    """Log arguments which are joined only when the record is formatted
+    """
+    __slots__ = ('args',)
+
+    def __init__(self, args):
+        self.args = args
+
+    def __str__(self) -> str:
+        return ' '.join(str(arg) for arg in self.args)
+
+
+def node_of(record: logging.LogRecord):
+    # node_id/worker for the records of the worker processes
+    node_id = getattr(record, 'node_id', '')
+    worker = getattr(record, 'worker', None)
+    return node_id if worker is None else f'{node_id}/{worker}'
+
+
+class TextFormatter(logging.Formatter):
+    """node_id, line number, timestamp, module, function, message
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.line_number = 1
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = datetime.utcfromtimestamp(record.created).strftime('%m/%d %H:%M:%S.%f')[:-3]
+        line = ' '.join([
+            str(node_of(record)),
+            str(self.line_number),
+            timestamp,
+            record.module.ljust(15),
+            record.funcName.ljust(25),
+            record.getMessage(),
+        ])
+        self.line_number += 1
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            'time': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'node_id': node_of(record),
+            'level': record.levelname,
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }, default=str)
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues the records as they are, for a listener thread of the same process
+
+    QueueHandler.prepare() formats the message for other processes, which
+    would join the LogMessage on the thread that logs.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
 class Logger:
 
-    log_line_number = 1
+    logger = logging.getLogger('interledger')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    node_id = ''
+    listener = None
+    # set in the worker processes, see forward()
+    forward_queue = None
+    worker = None
+
+    formatters = {
+        'text': TextFormatter,
+        'json': JSONFormatter,
+    }
 
     @classmethod
-    def init(cls, node_id):
+    def init(cls, node_id, level='INFO', format='text', use_queue=False, stream=None):
+        """Configure the output of the log lines
+
+        :param node_id: included in every line
+        :param level: name or number of the lowest level printed, e.g. 'WARNING' prints only important lines
+        :param str format: 'text' or 'json' (JSON lines)
+        :param bool use_queue: format and print in a background thread so logging never blocks the event loop
+        :param stream: defaults to stdout
+        """
+        cls.shutdown()
         cls.node_id = node_id
+        cls.logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+        if cls.forward_queue is not None:
+            # formatted and printed by the parent process
+            cls.logger.addHandler(logging.handlers.QueueHandler(cls.forward_queue))
+            return
+
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(cls.formatters[format]())
+        if use_queue:
+            cls.listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler)
+            cls.listener.start()
+            handler = LocalQueueHandler(cls.listener.queue)
+        cls.logger.addHandler(handler)
+
+    @classmethod
+    def forward(cls, queue, worker):
+        """Send the log records of a worker process to the parent, which prints them with serve()
+
+        :param queue: multiprocessing queue shared with the parent
+        :param worker: number of the worker, included in every line
+        """
+        cls.forward_queue = queue
+        cls.worker = worker
+        cls.init(cls.node_id, cls.logger.level)
+
+    @classmethod
+    def serve(cls, queue) -> logging.handlers.QueueListener:
+        """Print the log records the worker processes forward to the queue with the handlers of init(),
+        stop() the returned listener when done
+        """
+        listener = logging.handlers.QueueListener(queue, *cls.logger.handlers)
+        listener.start()
+        return listener
+
+    @classmethod
+    def shutdown(cls):
+        for handler in list(cls.logger.handlers):
+            cls.logger.removeHandler(handler)
+        if cls.listener:
+            cls.listener.stop()
+            cls.listener = None
 
     @classmethod
     def log(cls, *args, important=False):
-        include = [
-            '*',
-        ]
-        exclude = [
-        ]
-
-        frame = inspect.stack()[1]
-        func = frame.function
-        module = inspect.getmodule(frame[0]).__name__.split('.')[-1]
-        condition = include and (func not in exclude) and (('*' in include) or (func in include))
-
-        if condition or important:
-            print(
-                getattr(cls, 'node_id', ''),
-                cls.log_line_number,
-                datetime.utcnow().strftime('%m/%d %H:%M:%S.%f')[:-3],
-                module.ljust(15),
-                func.ljust(25),
-                *args,
-                flush=True
-            )
-            cls.log_line_number += 1
+        level = logging.WARNING if important else logging.INFO
+        if not cls.logger.isEnabledFor(level):
+            return
+
+        # the caller of log(), much cheaper than inspect.stack()
+        frame = sys._getframe(1)
+        code = frame.f_code
+        record = cls.logger.makeRecord(
+            cls.logger.name, level, code.co_filename, frame.f_lineno,
+            LogMessage(args), None, None, code.co_name,
+            extra={'node_id': cls.node_id, 'worker': cls.worker},
+        )
+        cls.logger.handle(record)
+
+
+Logger.init(node_id='')
+atexit.register(Logger.shutdown)
@@ -0,0 +1,257 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import signal
+
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Sequence,
+)
+
+from .utils import Logger
+
+
+# stats shared by the adapters of a process connected to the same ledger
+SHARED_STATS = ('rpc', 'block_cache', 'chain')
+# stats shared by the adapters of a process sending from the same account
+ACCOUNT_STATS = ('transactions',)
+
+
+def partition(accounts: Sequence[Sequence[Hashable]], workers: int) -> List[List[int]]:
+    """Split the bridges of a node between worker processes.
+
+    Nonces are allocated per process, so the bridges sending transactions
+    from the same account stay in the same process: bridges sharing an
+    account form a group, and the groups are spread over the workers,
+    largest first onto the least loaded worker.
+
+    :param list accounts: for each bridge, the accounts it sends transactions from
+    :param int workers: number of processes
+    :returns: the indexes of the bridges of each worker, without the workers left empty
+    """
+    parents = list(range(len(accounts)))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    owners: Dict[Hashable, int] = {}
+    for i, keys in enumerate(accounts):
+        for key in keys:
+            if key in owners:
+                parents[find(i)] = find(owners[key])
+            else:
+                owners[key] = i
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(accounts)):
+        groups.setdefault(find(i), []).append(i)
+
+    loads: List[List[int]] = [[] for _ in range(max(1, workers))]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(loads, key=len).extend(group)
+    return [sorted(load) for load in loads if load]
+
+
+def merge_stats(stats: Sequence[dict]) -> dict:
+    """Totals of the stats of several adapters or processes
+
+    Counters are summed, maxima and lags kept at their highest, and means
+    and latencies averaged. Nested stats are merged key by key.
+    """
+    merged: Dict[str, Any] = {}
+    for key in dict.fromkeys(key for s in stats for key in s):
+        values = [s[key] for s in stats if s.get(key) is not None]
+        if values and all(isinstance(value, dict) for value in values):
+            merged[key] = merge_stats(values)
+        elif values and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            if key.startswith('max') or key.endswith('lag'):
+                merged[key] = max(values)
+            elif key.startswith('mean') or key in ('latency', 'last'):
+                merged[key] = sum(values) / len(values)
+            else:
+                merged[key] = sum(values)
+    return merged
+
+
+class WorkerSupervisor:
+    """Runs the workers of a node as processes and restarts the ones that fail.
+
+    A worker is started with `target(worker, bridges, log_queue, stats_queue)`:
+    it forwards its log records to `log_queue` (see Logger.forward()) and
+    puts its stats to `stats_queue` as {'worker': int, 'bridges': [dict]}.
+    The supervisor prints the records with the handlers of Logger.init() and
+    logs the totals of the latest stats every `stats_interval` seconds, see
+    aggregate().
+
+    With handle_signals(), SIGTERM stops the workers and the supervisor, and
+    SIGHUP is passed on to the workers to reload the node configuration.
+    """
+
+    def __init__(self, target: Callable, partitions: List[List[Any]], stats_interval: float = 10,
+                 max_restart_delay: float = 30):
+        """
+        :param target: function run in the worker processes, must be importable by them
+        :param list partitions: the bridges of each worker, see partition()
+        """
+        self.target = target
+        self.partitions = partitions
+        self.stats_interval = stats_interval
+        self.max_restart_delay = max_restart_delay
+
+        self.context = multiprocessing.get_context('spawn')
+        self.log_queue = self.context.Queue()
+        self.stats_queue = self.context.Queue()
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.restarts: Dict[int, int] = {worker: 0 for worker in range(len(partitions))}
+        self.restart_at: Dict[int, float] = {}
+        self.stats: Dict[int, List[dict]] = {}
+        self.stopping = False
+        self.stop_requested = False
+
+    def handle_signals(self):
+        """Install the signal handlers of the parent process, call from the main thread
+        """
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.request_stop())
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+
+    def request_stop(self):
+        # run() stops the workers within a second
+        self.stop_requested = True
+
+    def reload(self):
+        """Ask the workers to reload the node configuration
+        """
+        for worker, process in self.processes.items():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGHUP)
+        Logger.log('reloading the node configuration in', len(self.processes), 'worker(s)')
+
+    def start(self, worker: int):
+        process = self.context.Process(
+            target=self.target,
+            args=(worker, self.partitions[worker], self.log_queue, self.stats_queue),
+            name=f'dib-worker-{worker}',
+        )
+        process.start()
+        self.processes[worker] = process
+        Logger.log(f'worker {worker} started, pid {process.pid}, {len(self.partitions[worker])} bridge(s)')
+
+    def run(self):
+        """Start the workers and supervise them until all of them exit normally or stop() is called
+        """
+        listener = Logger.serve(self.log_queue)
+        try:
+            for worker in range(len(self.partitions)):
+                self.start(worker)
+            next_report = monotonic() + self.stats_interval
+            while (self.processes or self.restart_at) and not self.stop_requested:
+                self.supervise(timeout=min(1.0, self.stats_interval))
+                if monotonic() >= next_report:
+                    self.report()
+                    next_report = monotonic() + self.stats_interval
+        finally:
+            self.stop()
+            listener.stop()
+
+    def supervise(self, timeout: float):
+        sentinels = {process.sentinel: worker for worker, process in self.processes.items()}
+        for sentinel in multiprocessing.connection.wait(list(sentinels), timeout):
+            worker = sentinels[sentinel]
+            process = self.processes.pop(worker)
+            process.join()
+            self.stats.pop(worker, None)
+            if process.exitcode != 0 and not self.stopping:
+                # back off exponentially when a worker keeps failing
+                delay = min(2 ** self.restarts[worker], self.max_restart_delay)
+                self.restarts[worker] += 1
+                self.restart_at[worker] = monotonic() + delay
+                Logger.log(f'worker {worker} exited with {process.exitcode}, restart in {delay} s', important=True)
+            else:
+                Logger.log(f'worker {worker} exited')
+        for worker, at in list(self.restart_at.items()):
+            if self.stopping:
+                del self.restart_at[worker]
+            elif monotonic() >= at:
+                del self.restart_at[worker]
+                self.start(worker)
+        self.collect_stats()
+
+    def collect_stats(self):
+        while True:
+            try:
+                message = self.stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.stats[message['worker']] = message['bridges']
+
+    def aggregate(self) -> dict:
+        """Totals of the latest stats of the workers
+
+        The stats of the connections to a ledger, i.e. the RPC batching, the
+        block cache and the chain, are taken once per worker and ledger, and
+        the transaction stats once per worker and account, and merged per
+        ledger under 'ledgers'. The other stats of the adapters are merged
+        under 'initiators' and 'responders'.
+        """
+        bridges = [stats for worker_stats in self.stats.values() for stats in worker_stats]
+        ledgers: Dict[str, List[dict]] = {}
+        for worker_stats in self.stats.values():
+            shared: Dict[tuple, dict] = {}
+            for stats in worker_stats:
+                for role in ('initiator', 'responder'):
+                    adapter = stats.get(role) or {}
+                    endpoint = adapter.get('endpoint')
+                    if not endpoint:
+                        continue
+                    if (endpoint,) not in shared:
+                        shared[(endpoint,)] = {key: adapter[key] for key in SHARED_STATS if key in adapter}
+                    if (endpoint, adapter.get('account')) not in shared:
+                        shared[(endpoint, adapter.get('account'))] = {
+                            key: adapter[key] for key in ACCOUNT_STATS if key in adapter
+                        }
+            for (endpoint, *_), stats in shared.items():
+                ledgers.setdefault(endpoint, []).append(stats)
+
+        def own(role):
+            return merge_stats([
+                {key: value for key, value in stats[role].items() if key not in SHARED_STATS + ACCOUNT_STATS}
+                for stats in bridges if stats.get(role)
+            ])
+
+        return {
+            'workers': len(self.processes),
+            'restarts': sum(self.restarts.values()),
+            'bridges': len(bridges),
+            'transfers': sum(stats.get('transfers', 0) for stats in bridges),
+            'ledgers': {endpoint: merge_stats(stats) for endpoint, stats in ledgers.items()},
+            'initiators': own('initiator'),
+            'responders': own('responder'),
+        }
+
+    def report(self):
+        Logger.log('workers:', self.aggregate())
+
+    def stop(self, timeout: float = 10):
+        """Ask the workers to stop, see the SIGTERM handler of the target, and wait for them
+        """
+        self.stopping = True
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for worker, process in list(self.processes.items()):
+            process.join(timeout)
+            if process.is_alive():
+                Logger.log(f'worker {worker} killed', important=True)
+                process.kill()
+                process.join()
+        self.processes.clear()
@@ -1,11 +1,11 @@
-import sys, asyncio
+import sys, asyncio, signal
 from collections import defaultdict
 
 from web3 import Web3
 from configparser import ConfigParser
 
 from src.interledger.adapter.ksi import KSIResponder  # TODO: replace by patched version
-from src.interledger.adapter.ethereum import EthereumInitiator, EthereumResponder
+from src.interledger.adapter.ethereum import EthereumInitiator, EthereumResponder, EthereumMultiResponder
 from src.interledger.adapter.fabric import FabricInitiator, FabricResponder
 from src.interledger.configs import (
     parse_ethereum,
@@ -14,6 +14,13 @@ from src.interledger.configs import (
     parse_node_config,
 )
 from src.interledger.interledger import DecentralizedInterledger
+from src.interledger.multi import MultiLedgerResponder
+from src.interledger.utils import Logger
+from src.interledger.workers import WorkerSupervisor, partition
+
+
+# seconds between the stats reports of the workers of --workers
+STATS_INTERVAL = 10
 
 
 def parse_args_config(args):
@@ -26,13 +33,33 @@ def parse_args_config(args):
     return config
 
 
+def ledger_type(parser, name):
+    # comma separated names, e.g. right=ledger1,ledger2, are the destinations of a multi-ledger transfer
+    if ',' in name:
+        return "multi"
+    return parser.get(name, 'type')
+
+
+# Builder of a responder sending to several Ethereum ledgers
+def multi_ledger_responder(parser, names):
+    responders = {}
+    for name in names.split(','):
+        name = name.strip()
+        if parser.get(name, 'type') != "ethereum":
+            print(f"ERROR: ledger type {parser.get(name, 'type')} not supported in multi-ledger mode yet")
+            exit(1)
+        responders[name] = EthereumMultiResponder(parse_ethereum(parser, name))
+    timeout = parser.getfloat('service', 'multi_ledger_timeout', fallback=120)
+    return MultiLedgerResponder(responders, timeout)
+
+
 # Builder a left to right DIB instance
 # Note: KSI is only supported as destination ledger
 def left_to_right_bridge(parser, left, right):
     initiator = None
     responder = None
-    ledger_left = parser.get(left, 'type')
-    ledger_right = parser.get(right, 'type')
+    ledger_left = ledger_type(parser, left)
+    ledger_right = ledger_type(parser, right)
 
     # Left ledger with initiator
     if ledger_left == "ethereum":
@@ -56,6 +83,8 @@ def left_to_right_bridge(parser, left, right):
         (url, hash_algorithm, username, password) = parse_ksi(parser, right)
         # Create Responder
         responder = KSIResponder(url, hash_algorithm, username, password)
+    elif ledger_right == "multi":
+        responder = multi_ledger_responder(parser, right)
     elif ledger_right == "fabric":
         (net_profile, channel_name, cc_name, cc_version, org_name, user_name, peer_name) = parse_fabric(parser, left)
         # Create Responder
@@ -72,8 +101,8 @@ def left_to_right_bridge(parser, left, right):
 def right_to_left_bridge(parser, left, right):
     initiator = None
     responder = None
-    ledger_left = parser.get(left, 'type')
-    ledger_right = parser.get(right, 'type')
+    ledger_left = ledger_type(parser, left)
+    ledger_right = ledger_type(parser, right)
 
     # Right ledger with initiator
     if ledger_right == "ethereum":
@@ -97,6 +126,8 @@ def right_to_left_bridge(parser, left, right):
     elif ledger_left == "ksi":
         (url, hash_algorithm, username, password) = parse_ksi(parser, left)
         responder = KSIResponder(url, hash_algorithm, username, password)
+    elif ledger_left == "multi":
+        responder = multi_ledger_responder(parser, left)
     elif ledger_left == "fabric":
         (net_profile, channel_name, cc_name, cc_version, org_name, user_name, peer_name) = parse_fabric(parser, left)
         # Create Responder
@@ -108,6 +139,67 @@ def right_to_left_bridge(parser, left, right):
     return (initiator, responder)
 
 
+# The bridges of the [connection.*] sections, or of [service] without them:
+# (section, direction, left, right) with direction 'left-to-right' or 'right-to-left'
+def bridge_specs(parser):
+    sections = [section for section in parser.sections() if section.startswith('connection.')] or ['service']
+    specs = []
+    for section in sections:
+        direction = parser.get(section, 'direction')
+        left = parser.get(section, 'left')
+        right = parser.get(section, 'right')
+        if direction not in ("left-to-right", "right-to-left", "both"):
+            print(f"ERROR: supported 'direction' values in [{section}] are 'left-to-right', 'right-to-left' or 'both'")
+            print("Check your configuration file")
+            exit(1)
+        if direction in ("left-to-right", "both"):
+            specs.append((section, "left-to-right", left, right))
+        if direction in ("right-to-left", "both"): # dsm2 is ledger in other direction
+            specs.append((section, "right-to-left", left, right))
+    return specs
+
+
+# Builder of the DIB instance of a bridge
+def build_bridge(parser, spec, args_config):
+    (section, direction, left, right) = spec
+    node_cfg = parse_node_config(parser, args_config['node'])
+    if direction == "left-to-right":
+        (initiator, responder) = left_to_right_bridge(parser, left, right)
+        return DecentralizedInterledger(initiator, responder, node_cfg, f'{left}-{right}')
+    (initiator, responder) = right_to_left_bridge(parser, left, right)
+    return DecentralizedInterledger(initiator, responder, node_cfg, f'{right}-{left}')
+
+
+# Accounts the bridge sends transactions from, the bridges sharing one run in the same worker
+def bridge_accounts(parser, spec):
+    (section, direction, left, right) = spec
+    accounts = []
+    for name in f'{left},{right}'.split(','):
+        name = name.strip()
+        if parser.get(name, 'type') == "ethereum":
+            cfg = parse_ethereum(parser, name)
+            endpoint = cfg.ipc_path or (f'{cfg.url}:{cfg.port}' if cfg.port else cfg.url)
+            accounts.append((endpoint, cfg.minter))
+        else:
+            accounts.append(name)
+    return accounts
+
+
+# --workers N, removed from the arguments
+def parse_workers(args):
+    workers = 1
+    rest = []
+    args = iter(args)
+    for arg in args:
+        if arg == '--workers':
+            workers = int(next(args))
+        elif arg.startswith('--workers='):
+            workers = int(arg.split('=', 1)[1])
+        else:
+            rest.append(arg)
+    return workers, rest
+
+
 def main():
     # Parse command line input
     if len(sys.argv) <= 1:
@@ -118,65 +210,95 @@ def main():
 
     args_config = parse_args_config(sys.argv[2:])
 
-    # Get direction
-    direction = parser.get('service', 'direction')
-    left = parser.get('service', 'left')
-    right = parser.get('service', 'right')
+    # Build interledger bridge(s), of every [connection.*] section or of [service].
+    # The bridges run on one event loop, and those connected to the same
+    # ledger endpoint share its provider, block cache, receipt tracker and nonces
+    dibs = [build_bridge(parser, spec, args_config) for spec in bridge_specs(parser)]
 
-    # Build interledger bridge(s)
-    dib_left_to_right = None
-    dib_right_to_left = None
+    task = asyncio.gather(*[asyncio.ensure_future(dib.run()) for dib in dibs])
+    print(f"Starting running routine for {len(dibs)} interledger instance(s)")
+    return (task, dibs)
 
-    if direction == "left-to-right":
-        (initiator, responder) = left_to_right_bridge(parser, left, right)
-        node_cfg = parse_node_config(parser, args_config['node'])
-        dib_left_to_right = DecentralizedInterledger(initiator, responder, node_cfg)
-    elif direction == "right-to-left":
-        (initiator, responder) = right_to_left_bridge(parser, left, right)
-        node_cfg = parse_node_config(parser, args_config['node'])
-        dib_right_to_left = DecentralizedInterledger(initiator, responder, node_cfg)
-    elif direction == "both": # dsm2 is ledger in other direction
-        (initiator_lr, responder_lr) = left_to_right_bridge(parser, left, right)
-        (initiator_rl, responder_rl) = right_to_left_bridge(parser, left, right)
-        node_cfg = parse_node_config(parser, args_config['node'])
-        dib_left_to_right = DecentralizedInterledger(initiator_lr, responder_lr, node_cfg)
-        node_cfg = parse_node_config(parser, args_config['node'])
-        dib_right_to_left = DecentralizedInterledger(initiator_rl, responder_rl, node_cfg)
-    else:
-        print("ERROR: supported 'direction' values are 'left-to-right', 'right-to-left' or 'both'")
-        print("Check your configuration file")
-        exit(1)
 
-    task = None
-
-    if dib_left_to_right and dib_right_to_left:
-        future_left_to_right = asyncio.ensure_future(dib_left_to_right.run())
-        future_right_to_left = asyncio.ensure_future(dib_right_to_left.run())
-        task = asyncio.gather(future_left_to_right, future_right_to_left)
-        print("Starting running routine for *double* sided interledger")
-    elif dib_left_to_right:
-        task = asyncio.ensure_future(dib_left_to_right.run())
-        print("Starting running routine for *left to right* interledger")
-    elif dib_right_to_left:
-        task = asyncio.ensure_future(dib_right_to_left.run())
-        print("Starting running routine for *right to left* interledger")
-    else:
-        print("ERROR while creating tasks for interledger")
-        exit(1)
+# Entry point of a worker process of --workers, runs its share of the bridges
+def run_worker(worker, specs, log_queue, stats_queue):
+    Logger.forward(log_queue, worker)
+    parser = ConfigParser()
+    parser.read(sys.argv[1])
+    args_config = parse_args_config(sys.argv[2:])
+    dibs = [build_bridge(parser, spec, args_config) for spec in specs]
+
+    async def report_stats():
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            stats_queue.put({'worker': worker, 'bridges': [dib.stats() for dib in dibs]})
+
+    def stop():
+        for dib in dibs:
+            dib.stop()
+
+    loop = asyncio.get_event_loop()
+    loop.add_signal_handler(signal.SIGTERM, stop)
+    loop.add_signal_handler(signal.SIGINT, stop)
+    loop.add_signal_handler(signal.SIGHUP, reload_node_config, dibs)
+    reporter = loop.create_task(report_stats())
+    loop.run_until_complete(asyncio.gather(*[dib.run() for dib in dibs]))
+    reporter.cancel()
+    loop.close()
+
+
+def main_workers(workers):
+    # Spread the bridges over worker processes, each with its own event loop
+    parser = ConfigParser()
+    parser.read(sys.argv[1])
+    args_config = parse_args_config(sys.argv[2:])
+    node_cfg = parse_node_config(parser, args_config['node'])
+    Logger.init(node_id=node_cfg.node_id, level=node_cfg.log_level, format=node_cfg.log_format)
+
+    specs = bridge_specs(parser)
+    partitions = partition([bridge_accounts(parser, spec) for spec in specs], workers)
+    if len(partitions) < workers:
+        print(f"Bridges sharing accounts need to run in the same process, running {len(partitions)} worker(s)")
+    supervisor = WorkerSupervisor(
+        run_worker,
+        [[specs[i] for i in indexes] for indexes in partitions],
+        stats_interval=STATS_INTERVAL,
+    )
+    supervisor.handle_signals()
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        print("-- Interrupted by keyword --")
+    print("-- Finished correctly --")
+
+
+def reload_node_config(dibs):
+    # apply the node membership of the edited config file, on SIGHUP
+    parser = ConfigParser()
+    parser.read(sys.argv[1])
+    args_config = parse_args_config(sys.argv[2:])
+    for dib in dibs:
+        if dib:
+            dib.reload_config(parse_node_config(parser, args_config['node']))
+    print("-- Node configuration reloaded --")
 
-    return (task, dib_left_to_right, dib_right_to_left)
 
 if __name__ == "__main__":
-    (task, dib1, dib2) = main()
+    (workers, args) = parse_workers(sys.argv[1:])
+    sys.argv[1:] = args
+    if workers > 1:
+        main_workers(workers)
+        exit(0)
+    (task, dibs) = main()
     try:
         loop = asyncio.get_event_loop()
+        if hasattr(signal, 'SIGHUP'):
+            loop.add_signal_handler(signal.SIGHUP, reload_node_config, dibs)
         loop.run_until_complete(task)
     except KeyboardInterrupt as e:
         print("-- Interrupted by keyword --")
-        if dib1:
-            dib1.stop()
-        if dib2:
-            dib2.stop()
+        for dib in dibs:
+            dib.stop()
         loop.run_until_complete(task)
         loop.close()
         print("-- Finished correctly --")
@@ -0,0 +1,69 @@
+"""Micro-benchmark of the timeout period resolution
+
+Compares the recursive resolve_timeout_period() used before with
+TimeoutSchedule over synthetic transfers of varying age.
+
+    python3 tests/performance/timeout_benchmark.py --transfers=1000000
+"""
+import argparse
+import os
+import random
+import sys
+
+from time import perf_counter
+
+sys.path.append(os.path.realpath('./src'))
+
+from interledger.timeout import TimeoutSchedule
+from interledger.transfer import Transfer
+
+
+def resolve_timeout_period(config, target_time, period_idx=0):
+    backoff_factor = config.timeout_backoff ** period_idx  # exponent
+    period_duration = config.timeout_initial * backoff_factor
+    if target_time < period_duration:
+        time_left = period_duration - target_time
+        return period_idx, period_duration, time_left
+    return resolve_timeout_period(
+        config,
+        target_time - period_duration,
+        period_idx + 1
+    )
+
+
+def measure(label, func, ages):
+    start = perf_counter()
+    for age in ages:
+        func(age)
+    elapsed = perf_counter() - start
+    print(f'{label.ljust(30)} {elapsed:8.3f} s {elapsed / len(ages) * 1e9:8.1f} ns/transfer')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transfers', type=int, default=1000000)
+    parser.add_argument('--timeout_initial', type=int, default=30)
+    parser.add_argument('--timeout_backoff', type=int, default=2)
+    parser.add_argument('--max_age', type=int, default=24 * 3600)
+    config = parser.parse_args()
+
+    random.seed(0)
+    ages = [random.uniform(0, config.max_age) for _ in range(config.transfers)]
+    schedule = TimeoutSchedule(config.timeout_initial, config.timeout_backoff)
+    transfers = [Transfer(str(i), b'', str(i), 0, '') for i in range(config.transfers)]
+
+    for age in ages[:1000]:
+        period = schedule.period_at(age)
+        assert resolve_timeout_period(config, age) == (period.idx, period.duration, period.time_left(age))
+
+    print(f'{config.transfers} transfers, timeout_initial={config.timeout_initial}, timeout_backoff={config.timeout_backoff}')
+    measure('recursive', lambda age: resolve_timeout_period(config, age), ages)
+    measure('boundary table', schedule.period_at, ages)
+    # first pass fills the per-transfer cache, second pass only compares
+    pairs = list(zip(transfers, ages))
+    measure('per-transfer cache (cold)', lambda pair: schedule.period_of(*pair), pairs)
+    measure('per-transfer cache (warm)', lambda pair: schedule.period_of(*pair), pairs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from interledger.batch import Batcher
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_full_batch():
+    batches = []
+
+    async def flush(items):
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    batcher = Batcher(flush, max_size=3, max_delay=10)
+    results = await asyncio.gather(*[batcher.submit(i) for i in range(3)])
+    assert results == [0, 2, 4]
+    assert batches == [[0, 1, 2]]
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_after_delay():
+    batches = []
+
+    async def flush(items):
+        batches.append(items)
+        return items
+
+    batcher = Batcher(flush, max_size=50, max_delay=0.01)
+    assert await asyncio.gather(batcher.submit('a'), batcher.submit('b')) == ['a', 'b']
+    assert batches == [['a', 'b']]
+    assert len(batcher) == 0
+
+
+@pytest.mark.asyncio
+async def test_batcher_fails_every_item():
+    async def flush(items):
+        raise ValueError('node down')
+
+    batcher = Batcher(flush, max_size=2, max_delay=10)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
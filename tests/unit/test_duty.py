@@ -0,0 +1,26 @@
+from interledger.duty import ConsistentHashScheduler, ModuloScheduler
+
+
+def test_modulo_scheduler_takes_turns():
+    scheduler = ModuloScheduler(3)
+    assert [scheduler.duty_of(4, idx) for idx in range(4)] == [2, 3, 1, 2]
+
+
+def test_consistent_hash_scheduler_replicas_take_turns():
+    scheduler = ConsistentHashScheduler([1, 2, 3, 4], replicas=2)
+    for key in range(100):
+        nodes = scheduler.preference_list(key)
+        assert len(set(nodes)) == 2
+        assert [scheduler.duty_of(key, idx) for idx in range(3)] == [nodes[0], nodes[1], nodes[0]]
+        assert sum(scheduler.is_responsible(key, node_id) for node_id in range(1, 5)) == 2
+
+
+def test_consistent_hash_scheduler_adding_node_moves_few_transfers():
+    scheduler = ConsistentHashScheduler([1, 2, 3, 4])
+    keys = range(2000)
+    owners = [scheduler.duty_of(key, 0) for key in keys]
+    scheduler.update_members([1, 2, 3, 4, 5])
+    moved = [key for key, owner in zip(keys, owners) if scheduler.duty_of(key, 0) != owner]
+
+    assert all(scheduler.duty_of(key, 0) == 5 for key in moved)
+    assert len(moved) < len(keys) / 3
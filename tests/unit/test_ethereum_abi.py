@@ -0,0 +1,37 @@
+import json
+import os
+
+from web3 import Web3
+
+from interledger.adapter.ethereum_abi import SelectorIndex
+
+
+ABI_FILE = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'ledgers', 'solidity', 'contracts', 'DataSender.abi.json'
+)
+
+
+def create_contract():
+    with open(ABI_FILE) as f:
+        abi = json.load(f)
+    return Web3().eth.contract(abi=abi, address='0x' + '11' * 20)
+
+
+def test_selector_index_decodes_like_web3():
+    contract = create_contract()
+    selectors = SelectorIndex(contract)
+    function = contract.get_function_by_signature('interledgerAbort(uint256,uint256)')
+    data = contract.encodeABI(fn_name='interledgerAbort', args=[7, 2])
+
+    tx_function, tx_params = contract.decode_function_input(data)
+    assert selectors.decode(data) == (str(tx_function), tx_params)
+    assert selectors['interledgerAbort(uint256,uint256)'].name == str(function)
+
+
+def test_selector_index_skips_unselected_functions():
+    contract = create_contract()
+    selectors = SelectorIndex(contract)
+    data = contract.encodeABI(fn_name='interledgerAbort', args=[7, 2])
+
+    assert selectors.decode(data, selectors.selectors_of(['interledgerCommit(uint256)'])) is None
+    assert selectors.decode('0xdeadbeef') is None
@@ -0,0 +1,86 @@
+from web3.datastructures import AttributeDict
+
+from interledger.adapter.ethereum_cache import BlockCache, TransactionIndex
+
+
+def create_block(number, full_transactions=False):
+    transactions = [AttributeDict({'hash': b'1' * 32, 'input': '0x00'})]
+    if not full_transactions:
+        transactions = [tx['hash'] for tx in transactions]
+    return AttributeDict({'number': number, 'timestamp': number, 'transactions': transactions})
+
+
+def test_block_cache_lru_budget():
+    cache = BlockCache(max_size=3000)
+    for number in range(3):
+        cache.put(number, False, create_block(number))
+    assert len(cache) == 2
+    assert cache.get(0) is None
+    assert cache.get(2)['number'] == 2
+    assert cache.stats()['evictions'] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_block_cache_confirmation_depth():
+    cache = BlockCache(max_size=10000, confirmation_depth=2)
+    cache.update_head(10)
+    cache.put(9, False, create_block(9))
+    cache.put(8, False, create_block(8))
+    assert cache.get(9) is None
+    assert cache.get(8) is not None
+
+
+def test_block_cache_shared_per_endpoint():
+    cache = BlockCache.for_endpoint('http://node-a:8545', 10000, confirmation_depth=2)
+    assert BlockCache.for_endpoint('http://node-a:8545', 10000, confirmation_depth=2) is cache
+    assert BlockCache.for_endpoint('http://node-b:8545', 10000, confirmation_depth=2) is not cache
+    assert BlockCache.for_endpoint('http://node-a:8545', 10000, confirmation_depth=0) is not cache
+
+
+def test_block_cache_header_from_full_block():
+    cache = BlockCache(max_size=10000)
+    cache.put(1, True, create_block(1, full_transactions=True))
+    assert cache.get(1, full_transactions=False)['transactions'] == [b'1' * 32]
+
+
+CONTRACT_ADDRESS = '0xcontract'
+
+
+class Selectors:
+
+    def decode(self, input, selectors=None):
+        function, id = input.split(':')
+        if selectors is not None and function not in selectors:
+            return None
+        return function, {'id': int(id)}
+
+
+def create_calls_block(number, inputs):
+    transactions = [
+        AttributeDict({'to': CONTRACT_ADDRESS, 'hash': bytes([number, i]), 'input': input})
+        for i, input in enumerate(inputs)
+    ]
+    return AttributeDict({'number': number, 'timestamp': number * 10, 'transactions': transactions})
+
+
+def test_transaction_index_find():
+    index = TransactionIndex(CONTRACT_ADDRESS, Selectors(), max_blocks=10)
+    index.get_calls(create_calls_block(2, ['commit:7']), final=True)
+    index.get_calls(create_calls_block(1, ['commit:7', 'abort:8']), final=True)
+    calls = index.get_calls(create_calls_block(3, ['commit:9', 'abort:9']), final=False, selectors={'abort'})
+    assert [call['txFunc'] for call in calls] == ['abort']
+
+    assert index.find('commit', {'id': 7})['blockID'] == 2
+    assert index.find('commit', {'id': 7}, until=25) == {}
+    assert index.find('abort', {'id': 8})['txID'] == bytes([1, 1]).hex()
+    assert index.find('commit', {'id': 9}) == {}  # not final
+    assert not index.is_indexed(3)
+
+
+def test_transaction_index_prunes_oldest_blocks():
+    index = TransactionIndex(CONTRACT_ADDRESS, Selectors(), max_blocks=2)
+    for number in range(1, 5):
+        index.get_calls(create_calls_block(number, [f'commit:{number}']), final=True)
+    assert len(index) == 2
+    assert index.find('commit', {'id': 1}) == {}
+    assert index.find('commit', {'id': 4})['blockID'] == 4
@@ -0,0 +1,88 @@
+import pytest
+
+from hexbytes import HexBytes
+
+from interledger.adapter.ethereum_chain import CanonicalChain, PendingEvents
+
+
+def block_hash(fork, number):
+    return HexBytes(b'%s%d' % (fork.encode(), number))
+
+
+class Head:
+    def __init__(self, number):
+        self.number = number
+
+    async def get(self):
+        return self.number
+
+    async def wait_for(self, number, timeout=None):
+        return self.number
+
+
+class RPC:
+    """A chain whose blocks from `fork_at` on belong to `fork`"""
+    endpoint = 'test'
+
+    def __init__(self):
+        self.fork = 'a'
+        self.fork_at = 0
+        self.requests = 0
+
+    def hash_of(self, number):
+        return block_hash(self.fork if number >= self.fork_at else 'a', number)
+
+    async def get_block(self, number, full_transactions=False):
+        self.requests += 1
+        return {'number': number, 'hash': self.hash_of(number), 'parentHash': self.hash_of(number - 1)}
+
+
+def event(fork, number, log_index=0):
+    return {'blockHash': block_hash(fork, number), 'blockNumber': number, 'logIndex': log_index}
+
+
+@pytest.mark.asyncio
+async def test_events_are_held_until_final():
+    head = Head(10)
+    rpc = RPC()
+    events = PendingEvents(CanonicalChain(rpc, head, 2), None)
+
+    assert await events.confirm([event('a', 9), event('a', 8)]) == [event('a', 8)]
+    head.number = 11
+    assert await events.confirm([event('a', 9)]) == [event('a', 9)]
+    assert len(events) == 0
+
+
+@pytest.mark.asyncio
+async def test_reorg_retracts_and_replays_events():
+    head = Head(10)
+    rpc = RPC()
+    chain = CanonicalChain(rpc, head, 3)
+
+    replacing = {block_hash('b', 9): [event('b', 9, 1)]}
+
+    async def fetch(hash):
+        return replacing.get(hash, [])
+
+    events = PendingEvents(chain, fetch)
+    assert await events.confirm([event('a', 9)]) == []
+
+    # blocks 9 and 10 are replaced
+    rpc.fork, rpc.fork_at = 'b', 9
+    head.number = 12
+    assert await events.confirm([]) == [event('b', 9, 1)]
+    assert chain.stats() == {'reorgs': 1, 'replaced_blocks': 2}
+    assert events.stats() == {'held': 0, 'retracted': 1, 'replayed': 1}
+
+
+@pytest.mark.asyncio
+async def test_orphaned_receipt_block():
+    head = Head(10)
+    rpc = RPC()
+    chain = CanonicalChain(rpc, head, 1)
+    assert await chain.wait_final(9, block_hash('a', 9))
+
+    rpc.fork, rpc.fork_at = 'b', 9
+    head.number = 11
+    assert not await chain.wait_final(9, block_hash('a', 9))
+    assert await chain.wait_final(9, block_hash('b', 9))
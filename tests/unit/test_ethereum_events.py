@@ -0,0 +1,67 @@
+import pytest
+
+from web3.datastructures import AttributeDict
+
+from interledger.adapter.ethereum_events import AdaptiveInterval, LogSubscription
+
+
+def log(block_number, log_index, removed=False):
+    return AttributeDict({'blockNumber': block_number, 'logIndex': log_index, 'removed': removed})
+
+
+class RPC:
+
+    def __init__(self, logs, head=11):
+        self.logs = logs
+        self.head = head
+        self.requests = []
+
+    async def block_number(self):
+        return self.head
+
+    async def get_logs(self, filter_params):
+        self.requests.append(filter_params)
+        return [l for l in self.logs if filter_params['fromBlock'] <= l['blockNumber'] <= filter_params['toBlock']]
+
+
+def test_adaptive_interval():
+    interval = AdaptiveInterval(0.1, 0.5)
+    for _ in range(5):
+        interval.idle()
+    assert interval.current == 0.5
+    interval.busy()
+    assert interval.current == 0.1
+
+
+@pytest.mark.asyncio
+async def test_log_subscription_replays_missed_logs_once():
+    rpc = RPC([log(9, 0), log(10, 0), log(10, 1), log(11, 0)])
+    subscription = LogSubscription('ws://localhost', rpc, '0x0', [], from_block=10)
+    subscription.start = lambda: None
+
+    subscription.deliver(log(10, 0))
+    subscription.deliver(log(10, 0, removed=True))
+    # reconnect
+    await subscription.replay()
+    assert rpc.requests[-1]['fromBlock'] == 10
+    subscription.deliver(log(11, 0))  # pushed while replaying
+
+    logs = await subscription.get(timeout=0.01)
+    assert [(l['blockNumber'], l['logIndex']) for l in logs] == [(10, 0), (10, 1), (11, 0)]
+
+
+@pytest.mark.asyncio
+async def test_log_subscription_replays_in_windows_up_to_the_head():
+    rpc = RPC([log(5, 0), log(12, 0), log(20, 0), log(26, 0)], head=25)
+    subscription = LogSubscription('ws://localhost', rpc, '0x0', [], from_block=5, log_window=10)
+    subscription.start = lambda: None
+
+    await subscription.replay()
+    assert [(r['fromBlock'], r['toBlock']) for r in rpc.requests] == [(4, 13), (14, 23), (24, 25)]
+    logs = await subscription.get(timeout=0.01)
+    assert [l['blockNumber'] for l in logs] == [5, 12, 20]
+
+
+def test_log_subscription_creates_queue_in_running_loop():
+    subscription = LogSubscription('ws://localhost', RPC([]), '0x0', [], from_block=0)
+    assert subscription._queue is None
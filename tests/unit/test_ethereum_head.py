@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+
+from interledger.adapter.ethereum_head import ChainHead
+
+
+class RPC:
+    endpoint = 'http://localhost:8545'
+
+    def __init__(self):
+        self.block = 10
+        self.requests = 0
+
+    async def get_block(self, block_identifier, full_transactions=False):
+        self.requests += 1
+        return {'number': self.block, 'timestamp': 1000 + self.block, 'hash': b'%d' % self.block}
+
+
+@pytest.mark.asyncio
+async def test_head_is_read_from_memory():
+    rpc = RPC()
+    head = ChainHead(rpc, poll_interval=1)
+    try:
+        assert await head.get() == 10
+        await asyncio.gather(*[head.get() for _ in range(10)])
+        assert rpc.requests <= 2  # the first read and the poller
+        assert head.timestamp == 1010
+    finally:
+        head.close()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_block():
+    rpc = RPC()
+    head = ChainHead(rpc, poll_interval=0.01)
+    try:
+        waiter = asyncio.ensure_future(head.wait_for(12, timeout=1))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        rpc.block = 12
+        assert await waiter == 12
+        with pytest.raises(asyncio.TimeoutError):
+            await head.wait_for(13, timeout=0.05)
+    finally:
+        head.close()
+
+
+def test_head_of_new_heads_message():
+    head = ChainHead(RPC())
+    head.update({'number': '0x1f', 'timestamp': '0x64', 'hash': '0xab'})
+    assert (head.number, head.timestamp) == (31, 100)
+    head.update({'number': '0x1e', 'timestamp': '0x63', 'hash': '0xaa'})
+    assert head.number == 31
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+
+from interledger.adapter.ethereum import EthereumInitiator
+from interledger.adapter.ethereum_events import AdaptiveInterval
+from interledger.journal import TransferJournal
+from interledger.transfer import Transfer
+
+
+class Head:
+    def __init__(self, number):
+        self.number = number
+
+    async def get(self):
+        return self.number
+
+
+class Event:
+    def processLog(self, log):
+        return log
+
+
+class Contract:
+    address = '0x' + '11' * 20
+
+    class events:
+        InterledgerEventSending = Event
+
+
+class Ledger:
+    """Events of a ledger, returned by the filter of the initiator and by eth_getLogs"""
+    endpoint = 'test'
+
+    def __init__(self):
+        self.events = []
+        self.new_events = []
+
+    def emit(self, block_number):
+        event = {'blockNumber': block_number, 'logIndex': 0, 'args': {'id': block_number}}
+        self.events.append(event)
+        self.new_events.append(event)
+
+    def get_new_entries(self):
+        entries, self.new_events = self.new_events, []
+        return entries
+
+    async def run(self, func, *args):
+        return func(*args)
+
+    async def get_logs(self, filter_params):
+        return [e for e in self.events if filter_params['fromBlock'] <= e['blockNumber'] <= filter_params['toBlock']]
+
+
+def create_initiator(ledger, head):
+    # the parts of EthereumInitiator used to follow the events, without a node
+    initiator = EthereumInitiator.__new__(EthereumInitiator)
+    initiator.rpc = ledger
+    initiator.filt = ledger
+    initiator.head = head
+    initiator.contract = Contract()
+    initiator.event_topics = []
+    initiator.event_poll_interval = AdaptiveInterval(0, 0)
+    initiator.event_subscription = None
+    initiator.pending_events = None
+    initiator.event_checkpoint = head.number + 1
+    initiator.covered_head = head.number
+    initiator.replayed_events = []
+    initiator.replayed_until = -1
+    initiator.log_window = 100
+    return initiator
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_moves_past_blocks_without_events():
+    ledger, head = Ledger(), Head(4)
+    initiator = create_initiator(ledger, head)
+    ledger.emit(5)
+    head.number = 5
+    assert await initiator.listen_for_events() == ledger.events
+    assert initiator.get_checkpoint() == 5
+
+    head.number = 20
+    assert await initiator.listen_for_events() == []
+    assert initiator.get_checkpoint() == 6
+    assert await initiator.listen_for_events() == []
+    assert initiator.get_checkpoint() == 21
+
+
+@pytest.mark.asyncio
+async def test_restart_after_retention_does_not_replay_finished_transfers(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    ledger, head = Ledger(), Head(4)
+    initiator = create_initiator(ledger, head)
+    journal = TransferJournal(path, retention=3600)
+
+    ledger.emit(5)
+    head.number = 5
+    for event in await initiator.listen_for_events():
+        transfer = Transfer(id=str(event['args']['id']), data=b'', initiator_id='5', initiation_timestamp=0,
+                            initiator_tx_key={})
+        journal.deregister(transfer)  # finished
+    journal.checkpoint(initiator.get_checkpoint())
+    # a quiet bridge
+    for number in range(6, 30):
+        head.number = number
+        await initiator.listen_for_events()
+        journal.checkpoint(initiator.get_checkpoint())
+    journal.close()
+
+    # restart after the finished transfer was forgotten
+    transfers, completed, checkpoint = TransferJournal(path, retention=0).load()
+    assert completed == set()
+    restarted = create_initiator(ledger, head)
+    await restarted.resume_from(checkpoint)
+    assert await restarted.listen_for_events() == []
+
+
+class BlockCache:
+    def update_head(self, head):
+        self.head = head
+
+
+def create_monitor(head, cursor, max_blocks=10, scan_concurrency=3):
+    # the parts of EthereumInitiator used to monitor the confirmations, the
+    # confirmation of transfer n is in block n and blocks take longer to fetch the lower they are
+    initiator = EthereumInitiator.__new__(EthereumInitiator)
+    initiator.head = head
+    initiator.block_cache = BlockCache()
+    initiator.monitor_confirmations_cursor = cursor
+    initiator.monitor_max_blocks = max_blocks
+    initiator.monitor_confirmations_lag = 0
+    initiator.scan_concurrency = scan_concurrency
+    initiator.confirmation_selectors = set()
+    initiator.confirmation_functions = {'interledgerCommit', 'interledgerAbort', 'interledgerCommitBatch'}
+    initiator.fetched = []
+
+    async def get_block_calls(block_number, selectors):
+        await asyncio.sleep(0.001 * (10 - block_number % 10))
+        initiator.fetched.append(block_number)
+        if block_number % 5 == 0:
+            return [{'txFunc': 'interledgerCommitBatch', 'txParams': {'ids': [block_number, -block_number]}}]
+        return [
+            {'txFunc': 'interledgerReceive', 'txParams': {'id': 0}},
+            {'txFunc': 'interledgerAbort' if block_number % 2 else 'interledgerCommit', 'txParams': {'id': block_number}},
+        ]
+
+    initiator.get_block_calls = get_block_calls
+    return initiator
+
+
+@pytest.mark.asyncio
+async def test_monitor_confirmations_returns_ids_in_block_order():
+    initiator = create_monitor(Head(9), cursor=3)
+    assert await initiator.monitor_confirmations() == ['3', '4', '5', '-5', '6', '7', '8', '9']
+    assert sorted(initiator.fetched) == list(range(3, 10))
+    assert initiator.monitor_confirmations_lag == 7
+
+
+@pytest.mark.asyncio
+async def test_monitor_confirmations_catches_up_monitor_max_blocks_per_call():
+    head = Head(24)
+    initiator = create_monitor(head, cursor=1, max_blocks=10)
+
+    assert await initiator.monitor_confirmations() == ['1', '2', '3', '4', '5', '-5', '6', '7', '8', '9', '10', '-10']
+    assert initiator.monitor_confirmations_cursor == 11
+    assert initiator.monitor_confirmations_lag == 24
+
+    ids = await initiator.monitor_confirmations()
+    assert ids[:2] == ['11', '12'] and ids[-1] == '-20'
+    assert initiator.monitor_confirmations_cursor == 21
+    assert initiator.monitor_confirmations_lag == 14
+
+    assert await initiator.monitor_confirmations() == ['21', '22', '23', '24']
+    assert initiator.monitor_confirmations_cursor == 25
+    assert initiator.monitor_confirmations_lag == 4
+    assert sorted(initiator.fetched) == list(range(1, 25))
+
+    # nothing new
+    assert await initiator.monitor_confirmations() == []
+    assert initiator.monitor_confirmations_cursor == 25
+    assert initiator.monitor_confirmations_lag == 0
+    head.number = 25
+    assert await initiator.monitor_confirmations() == ['25', '-25']
+    assert initiator.monitor_confirmations_lag == 1
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+
+import pytest
+
+from hexbytes import HexBytes
+
+from interledger.adapter.ethereum import EthereumResponder
+
+
+ACCEPTED = HexBytes(b'\x01' * 32)
+REJECTED = HexBytes(b'\x02' * 32)
+
+
+class Head:
+    def __init__(self, number):
+        self.number = number
+
+    async def get(self):
+        return self.number
+
+
+class Event:
+    def __init__(self, event_name):
+        self.event_name = event_name
+
+    def processLog(self, log):
+        return {'args': {'nonce': log['nonce']}}
+
+
+class Contract:
+    address = '0x' + '22' * 20
+
+
+class Ledger:
+    """Response events of a ledger, returned by eth_getLogs"""
+
+    def __init__(self):
+        self.logs = []
+        self.requests = []
+
+    def respond(self, block_number, transfer_id, topic=ACCEPTED):
+        self.logs.append({'blockNumber': block_number, 'topics': [topic], 'nonce': int(transfer_id)})
+
+    async def get_logs(self, filter_params):
+        self.requests.append((filter_params['fromBlock'], filter_params['toBlock']))
+        return [l for l in self.logs if filter_params['fromBlock'] <= l['blockNumber'] <= filter_params['toBlock']]
+
+
+def create_responder(ledger, head, log_window=100, response_cache_size=100):
+    # the parts of EthereumResponder used to check the responses, without a node
+    responder = EthereumResponder.__new__(EthereumResponder)
+    responder.rpc = ledger
+    responder.head = head
+    responder.contract = Contract()
+    responder.response_events = {
+        ACCEPTED: Event('InterledgerEventAccepted'),
+        REJECTED: Event('InterledgerEventRejected'),
+    }
+    responder.response_cache = OrderedDict()
+    responder.response_cache_size = response_cache_size
+    responder.log_window = log_window
+    return responder
+
+
+@pytest.mark.asyncio
+async def test_check_responses_queries_log_window_chunks_up_to_the_head():
+    ledger = Ledger()
+    responder = create_responder(ledger, Head(250))
+    ledger.respond(220, '1')
+
+    assert await responder.check_responses(['1'], from_block=10) == {'1': 'InterledgerEventAccepted'}
+    assert ledger.requests == [(10, 109), (110, 209), (210, 250)]
+
+
+@pytest.mark.asyncio
+async def test_check_responses_stops_when_every_response_is_found():
+    ledger = Ledger()
+    responder = create_responder(ledger, Head(250))
+    ledger.respond(50, '1')
+    ledger.respond(150, '2', REJECTED)
+
+    responses = await responder.check_responses(['1', '2'])
+    assert responses == {'1': 'InterledgerEventAccepted', '2': 'InterledgerEventRejected'}
+    assert ledger.requests == [(0, 99), (100, 199)]
+
+
+@pytest.mark.asyncio
+async def test_check_responses_mixed_events():
+    ledger = Ledger()
+    responder = create_responder(ledger, Head(50))
+    ledger.respond(10, '1', REJECTED)
+    ledger.respond(11, '2')
+    # a retried transfer accepted after a rejection, and the other way round
+    ledger.respond(12, '1')
+    ledger.respond(13, '2', REJECTED)
+
+    responses = await responder.check_responses(['1', '2', '3'])
+    assert responses == {'1': 'InterledgerEventAccepted', '2': 'InterledgerEventAccepted', '3': ''}
+    assert await responder.check_response('3') == ''
+
+
+@pytest.mark.asyncio
+async def test_check_responses_answers_cached_responses_without_queries():
+    ledger = Ledger()
+    responder = create_responder(ledger, Head(50))
+    ledger.respond(10, '1')
+    ledger.respond(11, '2', REJECTED)
+    await responder.check_responses(['1', '2'])
+    queries = len(ledger.requests)
+
+    assert await responder.check_response('2') == 'InterledgerEventRejected'
+    assert await responder.check_responses(['1', '2']) == {
+        '1': 'InterledgerEventAccepted', '2': 'InterledgerEventRejected'
+    }
+    assert len(ledger.requests) == queries
+
+
+@pytest.mark.asyncio
+async def test_response_cache_evicts_the_oldest_responses():
+    ledger = Ledger()
+    responder = create_responder(ledger, Head(50), response_cache_size=2)
+    for block_number, transfer_id in enumerate(['1', '2', '3']):
+        ledger.respond(block_number, transfer_id)
+    await responder.check_responses(['1', '2', '3'])
+
+    assert list(responder.response_cache) == [2, 3]
+    queries = len(ledger.requests)
+    assert await responder.check_response('1') == 'InterledgerEventAccepted'
+    assert len(ledger.requests) == queries + 1  # evicted, queried again
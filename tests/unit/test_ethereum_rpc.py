@@ -0,0 +1,145 @@
+import asyncio
+import json
+import threading
+import pytest
+
+from interledger.adapter.ethereum_rpc import (
+    AsyncEthereumRPC,
+    BatchingAsyncHTTPProvider,
+    EthereumRPC,
+    PooledAsyncHTTPProvider,
+)
+
+
+class FakeNodeProvider(BatchingAsyncHTTPProvider):
+    """Answers a batch without a node: the result of a request is its method"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__('http://localhost:8545', 4, *args, **kwargs)
+        self.posts = []
+
+    async def post(self, request_data: bytes) -> bytes:
+        requests = json.loads(request_data)
+        self.posts.append(requests)
+        responses = [{'jsonrpc': '2.0', 'id': r['id'], 'result': r['method']} for r in reversed(requests)]
+        return json.dumps(responses).encode()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    provider = FakeNodeProvider()
+    methods = [f'eth_{i}' for i in range(10)]
+    responses = await asyncio.gather(*[provider.make_request(method, []) for method in methods])
+
+    assert [response['result'] for response in responses] == methods
+    assert len(provider.posts) == 1
+    assert provider.stats()['max_batch'] == 10
+
+
+@pytest.mark.asyncio
+async def test_batch_size_is_bounded():
+    provider = FakeNodeProvider(max_size=4)
+    await asyncio.gather(*[provider.make_request('eth_blockNumber', []) for _ in range(10)])
+
+    assert [len(batch) for batch in provider.posts] == [4, 4, 2]
+    assert provider.stats()['requests'] == 10
+
+
+@pytest.mark.asyncio
+async def test_window_collects_later_requests():
+    provider = FakeNodeProvider(window=0.05)
+
+    async def later():
+        await asyncio.sleep(0.01)
+        return await provider.make_request('eth_getBlockByNumber', [])
+
+    await asyncio.gather(provider.make_request('eth_blockNumber', []), later())
+    assert len(provider.posts) == 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    monkeypatch.setattr(EthereumRPC, 'connections', {})
+    return EthereumRPC.connections
+
+
+def test_connect_shares_the_instance_of_an_endpoint(connections):
+    rpc = EthereumRPC.connect(None, 'http://localhost:8545', 4)
+    assert EthereumRPC.connect(None, 'http://localhost:8545', 8, async_rpc=True) is rpc
+    assert EthereumRPC.connect(None, 'http://localhost:8546', 4) is not rpc
+    assert len(connections) == 2
+
+
+def test_connect_chooses_the_rpc_by_url_scheme(connections):
+    assert type(EthereumRPC.connect(None, 'http://localhost:1', 4)) is EthereumRPC
+    assert type(EthereumRPC.connect(None, 'ws://localhost:2', 4, async_rpc=True)) is EthereumRPC
+    assert type(EthereumRPC.connect(None, '/tmp/geth.ipc', 4, batch=True)) is EthereumRPC
+
+    pooled = EthereumRPC.connect(None, 'HTTPS://localhost:3', 4, async_rpc=True)
+    assert type(pooled) is AsyncEthereumRPC
+    assert type(pooled.provider) is PooledAsyncHTTPProvider
+    assert pooled.stats() == {}
+
+    batching = EthereumRPC.connect(None, 'http://localhost:4', 4, batch=True)
+    assert type(batching) is AsyncEthereumRPC
+    assert isinstance(batching.provider, BatchingAsyncHTTPProvider)
+    assert 'batching' in batching.stats()
+
+
+class BlockingEth:
+    """web3.eth of a node whose calls block, recording the threads they run in"""
+
+    def __init__(self):
+        self.threads = []
+
+    @property
+    def block_number(self):
+        self.threads.append(threading.current_thread())
+        return 16
+
+    def get_logs(self, filter_params):
+        self.threads.append(threading.current_thread())
+        return [filter_params]
+
+
+class BlockingWeb3:
+    def __init__(self):
+        self.eth = BlockingEth()
+
+
+@pytest.mark.asyncio
+async def test_blocking_calls_run_off_the_event_loop():
+    web3 = BlockingWeb3()
+    rpc = EthereumRPC(web3, 'ws://localhost:8546', 2)
+
+    assert await rpc.block_number() == 16
+    assert await rpc.get_logs({'fromBlock': 1}) == [{'fromBlock': 1}]
+    assert await rpc.run(lambda: threading.current_thread()) is not threading.current_thread()
+    assert len(web3.eth.threads) == 2
+    assert all(thread is not threading.current_thread() for thread in web3.eth.threads)
+
+
+class BlockNumberProvider(FakeNodeProvider):
+    """Answers eth_blockNumber, recording the threads the requests are posted from"""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    async def post(self, request_data: bytes) -> bytes:
+        self.threads.append(threading.current_thread())
+        requests = json.loads(request_data)
+        self.posts.append(requests)
+        return json.dumps([{'jsonrpc': '2.0', 'id': r['id'], 'result': '0x10'} for r in requests]).encode()
+
+
+@pytest.mark.asyncio
+async def test_async_rpc_uses_the_provider_instead_of_the_thread_pool():
+    web3 = BlockingWeb3()
+    provider = BlockNumberProvider()
+    rpc = AsyncEthereumRPC(web3, 'http://localhost:8545', 2, provider=provider)
+
+    assert await rpc.block_number() == 16
+    assert provider.posts[0][0]['method'] == 'eth_blockNumber'
+    assert provider.threads == [threading.current_thread()]
+    assert web3.eth.threads == []
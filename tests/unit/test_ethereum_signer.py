@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+
+from hexbytes import HexBytes
+
+from interledger.adapter.ethereum_signer import LocalSigner, SessionSigner
+
+
+class FunctionCall:
+    address = '0x' + '22' * 20
+
+    def __init__(self, rpc):
+        self.rpc = rpc
+
+    def _encode_transaction_data(self):
+        return '0x12345678'
+
+    def transact(self, params):
+        if self.rpc.locked:
+            raise ValueError({'code': -32000, 'message': 'authentication needed: password or unlock'})
+        return HexBytes(len(self.rpc.sent))
+
+
+class Personal:
+    def __init__(self, rpc):
+        self.rpc = rpc
+
+    def unlock_account(self, account, password, duration):
+        self.rpc.unlocks += 1
+        self.rpc.locked = password != 'secret'
+        return not self.rpc.locked
+
+
+class Geth:
+    def __init__(self, rpc):
+        self.personal = Personal(rpc)
+
+
+class Web3:
+    def __init__(self, rpc):
+        self.geth = Geth(rpc)
+
+
+class RPC:
+    endpoint = 'test'
+
+    def __init__(self):
+        self.web3 = Web3(self)
+        self.locked = True
+        self.unlocks = 0
+        self.sent = []
+
+    async def run(self, func, *args):
+        return func(*args)
+
+    async def send_raw_transaction(self, raw_transaction):
+        self.sent.append(raw_transaction)
+        return HexBytes(len(self.sent))
+
+
+class TransactionFactory:
+    async def params(self, to, data):
+        return {'from': 'account', 'gas': 100000}
+
+    async def build(self, function_call):
+        return {'to': function_call.address, 'data': '0x12345678', 'value': 0, 'chainId': 1, 'gas': 100000, 'gasPrice': 1}
+
+    def track(self, tx_hash, to, data, gas):
+        pass
+
+
+class NonceManager:
+    def __init__(self):
+        self.nonce = 0
+
+    async def send(self, sign_and_send):
+        self.nonce += 1
+        return await sign_and_send(self.nonce - 1)
+
+
+@pytest.mark.asyncio
+async def test_session_signer_unlocks_once():
+    rpc = RPC()
+    signer = SessionSigner(rpc, 'account', TransactionFactory(), 'secret', lease=300)
+    await asyncio.gather(*[signer.send(FunctionCall(rpc)) for _ in range(10)])
+    assert rpc.unlocks == 1
+
+    rpc.locked = True  # e.g. the node restarted
+    await signer.send(FunctionCall(rpc))
+    assert rpc.unlocks == 2
+
+
+@pytest.mark.asyncio
+async def test_session_signer_wrong_password():
+    rpc = RPC()
+    signer = SessionSigner(rpc, 'account', TransactionFactory(), 'wrong')
+    with pytest.raises(ValueError, match='Wrong password'):
+        await signer.send(FunctionCall(rpc))
+
+
+@pytest.mark.asyncio
+async def test_local_signer_signs_with_nonces():
+    private_key = '0x' + '11' * 32
+    account = '0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A'
+    rpc = RPC()
+    signer = LocalSigner(rpc, account, TransactionFactory(), NonceManager(), private_key)
+    await signer.send(FunctionCall(rpc))
+    await signer.send(FunctionCall(rpc))
+    assert len(set(rpc.sent)) == 2
+
+    with pytest.raises(ValueError):
+        LocalSigner(rpc, '0x' + '33' * 20, TransactionFactory(), NonceManager(), private_key)
+
+
+@pytest.mark.asyncio
+async def test_local_signer_known_transaction_is_sent():
+    private_key = '0x' + '11' * 32
+    account = '0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A'
+    rpc = RPC()
+
+    async def send_raw_transaction(raw_transaction):
+        raise ValueError({'code': -32000, 'message': 'already known'})
+
+    rpc.send_raw_transaction = send_raw_transaction
+    nonce_manager = NonceManager()
+    tx_hash = await LocalSigner(rpc, account, TransactionFactory(), nonce_manager, private_key).send(FunctionCall(rpc))
+    assert len(tx_hash) == 32
+    assert nonce_manager.nonce == 1
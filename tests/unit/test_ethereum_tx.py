@@ -0,0 +1,215 @@
+import asyncio
+import pytest
+
+from hexbytes import HexBytes
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+from interledger.adapter.ethereum_tx import NonceManager, ReceiptTracker, TransactionFactory
+
+
+class RPC:
+    endpoint = 'test'
+
+    def __init__(self):
+        self.transaction_count = 5
+
+    async def get_transaction_count(self, account, block_identifier):
+        return self.transaction_count
+
+    async def get_transaction(self, tx_hash):
+        raise TransactionNotFound()
+
+
+async def send(nonce):
+    return HexBytes(nonce)
+
+
+@pytest.mark.asyncio
+async def test_nonce_manager_concurrent_nonces():
+    manager = NonceManager(RPC(), 'account')
+    nonces = await asyncio.gather(*[manager.get() for _ in range(3)])
+    assert sorted(nonces) == [5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_nonce_manager_resync_on_nonce_error():
+    rpc = RPC()
+    manager = NonceManager(rpc, 'account')
+    await manager.get()  # 5, sent by someone else
+    rpc.transaction_count = 8
+
+    async def sign_and_send(nonce):
+        if nonce < rpc.transaction_count:
+            raise ValueError({'message': 'nonce too low'})
+        return HexBytes(nonce)
+
+    assert await manager.send(sign_and_send) == HexBytes(8)
+    assert manager.next_nonce == 9
+
+
+@pytest.mark.asyncio
+async def test_nonce_manager_releases_nonce_after_transport_error():
+    manager = NonceManager(RPC(), 'account')
+
+    async def unreachable(nonce):
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await manager.send(unreachable)
+    assert await manager.send(send) == HexBytes(5)
+
+
+@pytest.mark.asyncio
+async def test_nonce_manager_known_transaction_is_not_resent():
+    manager = NonceManager(RPC(), 'account')
+    nonces = []
+
+    async def sign_and_send(nonce):
+        nonces.append(nonce)
+        raise ValueError({'message': 'already known'})
+
+    with pytest.raises(ValueError):
+        await manager.send(sign_and_send)
+    assert nonces == [5]
+
+
+@pytest.mark.asyncio
+async def test_nonce_manager_fills_gap_of_dropped_transaction():
+    manager = NonceManager(RPC(), 'account')
+    tx_hash = await manager.send(send)
+    await manager.send(send)
+
+    await manager.recover(tx_hash)
+    assert await manager.get() == 5
+    assert await manager.get() == 7
+
+
+class ReceiptRPC:
+    endpoint = 'test'
+
+    def __init__(self):
+        self.block = 1
+        self.receipts = {}
+        self.receipt_requests = 0
+
+    async def block_number(self):
+        return self.block
+
+    async def get_transaction_receipt(self, tx_hash):
+        self.receipt_requests += 1
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound()
+        return self.receipts[tx_hash]
+
+
+@pytest.mark.asyncio
+async def test_receipt_tracker_resolves_waiters_on_new_block():
+    rpc = ReceiptRPC()
+    tracker = ReceiptTracker(rpc, poll_interval=0.01)
+    waiters = [asyncio.ensure_future(tracker.wait(HexBytes(i), 1)) for i in range(3)]
+    await asyncio.sleep(0.05)
+    requests = rpc.receipt_requests
+    await asyncio.sleep(0.05)
+    assert rpc.receipt_requests == requests  # no new block, no polls
+
+    for i in range(3):
+        rpc.receipts[HexBytes(i)] = {'blockHash': HexBytes(2), 'blockNumber': 2}
+    rpc.block = 2
+    receipts = await asyncio.gather(*waiters)
+    assert [r['blockNumber'] for r in receipts] == [2, 2, 2]
+    assert len(tracker) == 0
+
+
+@pytest.mark.asyncio
+async def test_receipt_tracker_timeout():
+    tracker = ReceiptTracker(ReceiptRPC(), poll_interval=0.01)
+    with pytest.raises(TimeExhausted):
+        await tracker.wait(HexBytes(1), 0.05)
+    assert len(tracker) == 0
+
+
+class Eth:
+    chain_id = 1337
+    gas_price = 7
+    max_priority_fee = 2
+
+    def __init__(self):
+        self.estimates = 0
+
+    def estimate_gas(self, transaction):
+        self.estimates += 1
+        return 1000 + len(transaction['data'])
+
+
+class Web3:
+    def __init__(self):
+        self.eth = Eth()
+
+
+class FeeRPC:
+    endpoint = 'test'
+
+    def __init__(self, base_fee=None):
+        self.web3 = Web3()
+        self.base_fee = base_fee
+
+    async def run(self, func, *args):
+        return func(*args)
+
+    async def get_block(self, block_identifier, full_transactions=False):
+        return {'number': 1} if self.base_fee is None else {'number': 1, 'baseFeePerGas': self.base_fee}
+
+
+@pytest.mark.asyncio
+async def test_transaction_factory_reuses_gas_estimates():
+    rpc = FeeRPC()
+    factory = TransactionFactory(rpc, 'account', gas_margin=1.5)
+    gas = await factory.get_gas('contract', '0x12345678' + '00' * 64)
+    assert gas == int((1000 + 138) * 1.5)
+    assert await factory.get_gas('contract', '0x12345678' + '11' * 64) == gas
+    assert rpc.web3.eth.estimates == 1
+    # another function, or much more input
+    await factory.get_gas('contract', '0x87654321' + '00' * 64)
+    await factory.get_gas('contract', '0x12345678' + '00' * 256)
+    assert rpc.web3.eth.estimates == 3
+
+
+@pytest.mark.asyncio
+async def test_transaction_factory_scales_gas_to_input_size():
+    rpc = FeeRPC()
+    # storing the input costs gas per 32 bytes
+    rpc.web3.eth.estimate_gas = lambda transaction: 21000 + 20000 * -(-(len(transaction['data']) // 2 - 4) // 32)
+    factory = TransactionFactory(rpc, 'account', gas_margin=1.0)
+    small = '0x12345678' + '00' * 260
+    large = '0x12345678' + '00' * 500
+    assert factory.gas_key('contract', small) == factory.gas_key('contract', large)
+
+    await factory.get_gas('contract', small)
+    assert await factory.get_gas('contract', large) >= rpc.web3.eth.estimate_gas({'data': large})
+    assert factory.estimates == 1
+
+
+@pytest.mark.asyncio
+async def test_transaction_factory_fees():
+    factory = TransactionFactory(FeeRPC(base_fee=10), 'account')
+    assert await factory.get_fees() == {'maxFeePerGas': 22, 'maxPriorityFeePerGas': 2}
+    assert await factory.get_chain_id() == 1337
+
+    legacy = TransactionFactory(FeeRPC(), 'account', fee_refresh=0)
+    assert await legacy.get_fees() == {'gasPrice': 7}
+    legacy.rpc.web3.eth.gas_price = 8
+    assert await legacy.get_fees() == {'gasPrice': 7}  # refreshed in the background
+    await legacy.fee_task
+    assert await legacy.get_fees() == {'gasPrice': 8}
+
+
+@pytest.mark.asyncio
+async def test_transaction_factory_drops_estimate_after_out_of_gas():
+    rpc = FeeRPC()
+    factory = TransactionFactory(rpc, 'account')
+    data = '0x12345678' + '00' * 64
+    gas = await factory.get_gas('contract', data)
+    factory.track(b'\x01', 'contract', data, gas)
+    factory.check(b'\x01', {'status': 0, 'gasUsed': gas})
+    await factory.get_gas('contract', data)
+    assert rpc.web3.eth.estimates == 2
@@ -0,0 +1,47 @@
+import asyncio
+import json
+import pytest
+
+from interledger.gossip import Gossip, LocalTransport, SENT, VERIFIED
+
+
+@pytest.mark.asyncio
+async def test_gossip_delivers_signed_announcements():
+    hub = []
+    node1 = Gossip(1, 'secret', LocalTransport(hub))
+    node2 = Gossip(2, 'secret', LocalTransport(hub))
+    messages = []
+    node2.on_message = lambda *message: messages.append(message)
+
+    node1.announce(SENT, '42', {'txID': '0x01', 'blockID': 7})
+    node1.announce(VERIFIED, '43')
+    await asyncio.sleep(0)
+
+    assert messages == [(SENT, '42', {'txID': '0x01', 'blockID': 7}), (VERIFIED, '43', {})]
+    assert node2.report_of('42') == {SENT: {'txID': '0x01', 'blockID': 7}}
+    assert node1.report_of('42') == {}  # own announcements are not received
+
+
+@pytest.mark.asyncio
+async def test_gossip_drops_forged_stale_and_replayed_messages():
+    hub = []
+    sent = []
+    node1 = Gossip(1, 'secret', LocalTransport(hub))
+    node1.transport.send = lambda data: sent.append(data) or LocalTransport.send(node1.transport, data)
+    stale = Gossip(3, 'secret', LocalTransport(hub), max_age=-1)
+    forger = Gossip(4, 'other secret', LocalTransport(hub))
+    node2 = Gossip(2, 'secret', LocalTransport(hub))
+
+    node1.announce(SENT, '1')
+    await asyncio.sleep(0)
+    node1.transport.send(sent[0])  # replay
+    forger.announce(SENT, '2')
+    await asyncio.sleep(0)
+
+    assert list(node2.reports) == ['1']
+    assert stale.reports == {}
+
+    message = json.loads(sent[0])
+    message['payload'] = message['payload'].replace('"1"', '"3"')
+    node2.receive(json.dumps(message).encode('utf-8'))
+    assert '3' not in node2.reports
@@ -1,6 +1,11 @@
+from dataclasses import replace
+from time import time
+
 from interledger.adapter.interfaces import Initiator, Responder
+from interledger.duty import ConsistentHashScheduler
 from interledger.interledger import DecentralizedInterledger
 from interledger.configs import NodeConfig
+from interledger.transfer import Transfer, TransferState
 
 
 #import sys, os
@@ -18,3 +23,36 @@ def test_interledger_init():
     assert interledger.responder == resp
     assert interledger.config == config
     assert interledger.running == False
+
+
+def test_reload_config_keeps_the_duties_of_registered_transfers():
+    config = NodeConfig(3, 0, 'secret', 10, 2, True, True, True, False, duty_scheduler='consistent_hash',
+                        duty_replicas=1)
+    nodes = [DecentralizedInterledger(Initiator(), Responder(), replace(config, node_id=i)) for i in (1, 2, 3)]
+    transfers = [Transfer(str(id), b'', str(id), time(), {}) for id in range(100)]
+    for node in nodes:  # intake
+        for transfer in transfers:
+            if node.is_responsible(transfer):
+                node.register_transfer(transfer)
+
+    reloaded = replace(config, node_count=4)
+    for node in nodes:
+        node.reload_config(reloaded)
+    nodes.append(DecentralizedInterledger(Initiator(), Responder(), replace(reloaded, node_id=4)))
+
+    assert isinstance(nodes[0].duty_scheduler, ConsistentHashScheduler)
+    moved = [t for t in transfers if not any(node.is_responsible(t) for node in nodes[:3])]
+    assert moved
+    for transfer in transfers:
+        for period_idx in range(3):
+            on_duty = [
+                node for node in nodes
+                if transfer.id in node.transfer_register
+                and node.get_duty_scheduler(transfer).duty_of(node.get_duty_key(transfer), period_idx)
+                == node.config.node_id
+            ]
+            assert len(on_duty) == 1
+
+    # the schedule of the previous members is forgotten with the transfer
+    nodes[0].deregister_transfer(next(iter(nodes[0].transfer_register)))
+    assert len(nodes[0].previous_duty) == len(nodes[0].transfer_register)
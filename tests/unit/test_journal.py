@@ -0,0 +1,44 @@
+from interledger.journal import TransferJournal
+from interledger.transfer import Transfer, TransferState
+
+
+def create_transfer(id):
+    return Transfer(
+        id=id,
+        data=b'data',
+        initiator_id=f'initiator-{id}',
+        initiation_timestamp=100,
+        initiator_tx_key={'txID': '0x01', 'blockID': 5},
+    )
+
+
+def test_journal_restores_unfinished_transfers(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    journal = TransferJournal(path, 'left-right')
+    running, done = create_transfer('1'), create_transfer('2')
+    journal.register(running)
+    journal.register(done)
+    running.state = TransferState.EXECUTING
+    journal.update_state(running)
+    done.state = TransferState.DONE
+    journal.deregister(done)
+    journal.checkpoint(42)
+    assert len(journal) == 2  # changes of a transfer collapse
+    journal.close()
+
+    transfers, completed, checkpoint = TransferJournal(path, 'left-right').load()
+    assert transfers == [running]
+    assert transfers[0].state is TransferState.REGISTERED
+    assert transfers[0].initiator_tx_key == {'txID': '0x01', 'blockID': 5}
+    assert completed == {'2'}
+    assert checkpoint == 42
+
+    assert TransferJournal(path, 'right-left').load() == ([], set(), None)
+
+
+def test_journal_forgets_finished_transfers_after_retention(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    journal = TransferJournal(path, retention=0)
+    journal.deregister(create_transfer('1'))
+    journal.flush()
+    assert journal.load()[1] == set()
@@ -0,0 +1,57 @@
+import io
+import json
+import threading
+
+from interledger.utils import Logger
+
+
+def log_something():
+    Logger.log('transfer', 123)
+
+
+def test_logger_text_format():
+    stream = io.StringIO()
+    Logger.init(node_id=2, stream=stream)
+    log_something()
+
+    node_id, line_number, date, time, module, function, *message = stream.getvalue().split()
+    assert (node_id, line_number) == ('2', '1')
+    assert (module, function) == ('test_logger', 'log_something')
+    assert message == ['transfer', '123']
+
+
+def test_logger_json_format_and_level():
+    stream = io.StringIO()
+    Logger.init(node_id=2, level='WARNING', format='json', stream=stream)
+    log_something()
+    Logger.log('important', important=True)
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record['node_id'] == 2
+    assert record['level'] == 'WARNING'
+    assert record['message'] == 'important'
+    Logger.init(node_id='')
+
+
+class Argument:
+    """Records the threads the log message is formatted in"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return 'argument'
+
+
+def test_logger_queue_formats_in_background_thread():
+    stream = io.StringIO()
+    Logger.init(node_id=2, use_queue=True, stream=stream)
+    argument = Argument()
+    Logger.log('transfer', argument)
+    Logger.init(node_id='')  # stops the listener after the queued records
+
+    assert stream.getvalue().split()[-2:] == ['transfer', 'argument']
+    assert argument.threads and threading.current_thread() not in argument.threads
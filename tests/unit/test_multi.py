@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+
+from time import monotonic
+
+from interledger.adapter.interfaces import ErrorCode, MultiResponder
+from interledger.multi import MultiLedgerResponder
+from interledger.transfer import Transfer
+
+
+class FakeMultiResponder(MultiResponder):
+
+    def __init__(self, delay=0, accept=True, fail=False, block=None):
+        self.delay = delay
+        self.accept = accept
+        self.fail = fail
+        self.block = block
+        self.calls = []
+        self.from_blocks = []
+
+    async def send_data_inquire(self, nonce: str, data: bytes) -> dict:
+        self.calls.append('inquire')
+        await asyncio.sleep(self.delay)
+        return {'status': self.accept}
+
+    async def send_data(self, nonce: str, data: bytes) -> dict:
+        self.calls.append('send')
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return {'status': False}
+        return {'status': True, 'blockNumber': self.block}
+
+    async def get_interledgerReceive_tx(self, transfer) -> dict:
+        return {'txID': '0x01', 'blockID': self.block} if 'send' in self.calls and not self.fail else {}
+
+    async def check_response(self, transfer_id: str, from_block: int = 0) -> str:
+        self.from_blocks.append(from_block)
+        return 'InterledgerEventAccepted' if 'send' in self.calls and not self.fail else ''
+
+    async def abort_send_data(self, nonce: str, reason: int) -> dict:
+        self.calls.append('abort')
+        return {'status': True}
+
+
+@pytest.mark.asyncio
+async def test_multi_ledger_sends_to_all_concurrently():
+    responders = {'a': FakeMultiResponder(0.1), 'b': FakeMultiResponder(0.1), 'c': FakeMultiResponder(0.1)}
+    multi = MultiLedgerResponder(responders)
+
+    start = monotonic()
+    response = await multi.send_data('1', b'data')
+    assert monotonic() - start < 0.5  # two phases of 0.1 seconds, not six
+
+    assert response['status'] is True
+    assert all(responder.calls == ['inquire', 'send'] for responder in responders.values())
+    assert multi.stats()['a']['calls'] == 2
+
+
+@pytest.mark.asyncio
+async def test_multi_ledger_aborts_when_a_ledger_rejects():
+    responders = {'a': FakeMultiResponder(), 'b': FakeMultiResponder(accept=False)}
+    response = await MultiLedgerResponder(responders).send_data('1', b'data')
+
+    assert response['status'] is False
+    assert response['error_code'] == ErrorCode.INQUIRY_REJECT
+    assert responders['a'].calls == ['inquire', 'abort']
+    assert responders['b'].calls == ['inquire', 'abort']
+
+
+@pytest.mark.asyncio
+async def test_multi_ledger_times_out_slow_ledger():
+    responders = {'fast': FakeMultiResponder(), 'slow': FakeMultiResponder(delay=1)}
+    multi = MultiLedgerResponder(responders, timeout=0.05)
+    response = await multi.send_data('1', b'data')
+
+    assert response['status'] is False
+    assert response['inquiries']['slow']['error_code'] == ErrorCode.TIMEOUT
+    assert responders['fast'].calls == ['inquire', 'abort']
+    assert multi.stats()['slow']['timeouts'] == 1
+
+
+@pytest.mark.asyncio
+async def test_multi_ledger_retry_sends_only_to_failed_ledgers():
+    responders = {'a': FakeMultiResponder(), 'b': FakeMultiResponder(fail=True)}
+    multi = MultiLedgerResponder(responders)
+    response = await multi.send_data('1', b'data')
+    assert response['status'] is False
+    assert response['error_code'] == ErrorCode.TRANSACTION_FAILURE
+
+    responders['b'].fail = False
+    response = await multi.send_data('1', b'data')
+    assert response['status'] is True
+    assert response['delivered'] == ['a']
+    assert responders['a'].calls == ['inquire', 'send']
+    assert responders['b'].calls == ['inquire', 'send', 'inquire', 'send']
+
+
+@pytest.mark.asyncio
+async def test_multi_ledger_retry_after_restart_uses_receive_calls():
+    responders = {'a': FakeMultiResponder(), 'b': FakeMultiResponder(fail=True)}
+    await MultiLedgerResponder(responders).send_data('1', b'data')
+
+    # the timeout sweep of a restarted node finds the transfer in one ledger only
+    restarted = MultiLedgerResponder(responders)
+    transfer = Transfer(id='1', data=b'data', initiator_id='1', initiation_timestamp=0, initiator_tx_key={})
+    assert await restarted.get_interledgerReceive_tx(transfer) == {}
+
+    responders['b'].fail = False
+    assert (await restarted.send_data('1', b'data'))['status'] is True
+    assert responders['a'].calls.count('send') == 1
+    assert await restarted.get_interledgerReceive_tx(transfer) == {'txID': '0x01', 'blockID': None}
+    assert restarted.delivered == {}
+
+
+@pytest.mark.asyncio
+async def test_multi_ledger_checks_responses_from_the_block_of_each_ledger():
+    responders = {'a': FakeMultiResponder(block=100), 'b': FakeMultiResponder(block=7000, fail=True)}
+    multi = MultiLedgerResponder(responders)
+    await multi.send_data('1', b'data')
+
+    assert await multi.check_response('1') == ''
+    assert responders['a'].from_blocks == [100]
+    assert responders['b'].from_blocks == [0]  # not sent yet
+
+    responders['b'].fail = False
+    await multi.send_data('1', b'data')
+    assert await multi.check_response('1') == 'InterledgerEventAccepted'
+    assert responders['b'].from_blocks == [0, 7000]
+    assert multi.receive_blocks == {}
+
+    # a restarted node learns the blocks from the interledgerReceive calls
+    restarted = MultiLedgerResponder(responders)
+    transfer = Transfer(id='2', data=b'data', initiator_id='2', initiation_timestamp=0, initiator_tx_key={})
+    await restarted.get_interledgerReceive_tx(transfer)
+    assert (await restarted.get_send_response('0x01', '2'))['status'] is True
+    assert responders['a'].from_blocks[-1] == 100
+    assert responders['b'].from_blocks[-1] == 7000
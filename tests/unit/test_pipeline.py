@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+from time import time
+
+from interledger.adapter.interfaces import Initiator, Responder
+from interledger.interledger import DecentralizedInterledger
+from interledger.configs import NodeConfig
+from interledger.transfer import Transfer, TransferState
+
+
+class FakeInitiator(Initiator):
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.committed = []
+
+    async def listen_for_events(self) -> list:
+        events, self.events = self.events, []
+        return events
+
+    async def process_event(self, event) -> Transfer:
+        return Transfer(
+            id=event,
+            data=b'data',
+            initiator_id=event,
+            initiation_timestamp=time(),
+            initiator_tx_key={},
+        )
+
+    async def commit_sending(self, id: str, data: bytes = None) -> dict:
+        self.committed.append(id)
+        return {'commit_status': True}
+
+
+class SlowResponder(Responder):
+
+    async def send_data(self, nonce: str, data: bytes) -> dict:
+        # one slow transaction must not hold back the others
+        await asyncio.sleep(0.5 if nonce == '1' else 0)
+        return {'status': True}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_stages_concurrently():
+    config = NodeConfig(1, 1, 'secret', 10, 2, False, True, False, True, pipeline_enabled=True, poll_interval=0.01)
+    initiator = FakeInitiator(['1', '2', '3'])
+    interledger = DecentralizedInterledger(initiator, SlowResponder(), config)
+
+    task = asyncio.create_task(interledger.run())
+    await asyncio.sleep(0.2)
+
+    assert sorted(initiator.committed) == ['2', '3']
+    assert interledger.transfer_register['1'].state is TransferState.EXECUTING
+
+    await asyncio.sleep(0.5)
+    interledger.stop()
+    await task
+
+    assert sorted(initiator.committed) == ['1', '2', '3']
+    assert len(interledger.transfer_register) == 0
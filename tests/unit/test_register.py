@@ -0,0 +1,42 @@
+from interledger.register import TransferRegister
+from interledger.transfer import Transfer
+
+
+def create_transfer(id, initiator_id):
+    return Transfer(
+        id=id,
+        data=b'',
+        initiator_id=initiator_id,
+        initiation_timestamp=0,
+        initiator_tx_key={},
+    )
+
+
+def test_register_initiator_index():
+    register = TransferRegister()
+    first, second = create_transfer('1', 'a'), create_transfer('2', 'a')
+    register.add(first, 10)
+    register.add(second, 10)
+
+    assert register.find_by_initiator_id('a') is first
+    assert register.find_all_by_initiator_id('a') == [first, second]
+
+    assert register.pop('1') is first
+    assert register.find_by_initiator_id('a') is second
+    assert register.pop('2') is second
+    assert register.find_by_initiator_id('a') is None
+    assert len(register) == 0
+
+
+def test_register_pop_due():
+    register = TransferRegister()
+    for id, deadline in [('1', 30), ('2', 10), ('3', 20)]:
+        register.add(create_transfer(id, id), deadline)
+
+    register.schedule('3', 40)  # rescheduled
+    register.pop('2')  # deregistered
+
+    assert register.pop_due(5) == []
+    assert [t.id for t in register.pop_due(35)] == ['1']
+    assert register.pop_due(35) == []
+    assert [t.id for t in register.pop_due(40)] == ['3']
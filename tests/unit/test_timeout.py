@@ -0,0 +1,30 @@
+from interledger.timeout import TimeoutSchedule
+from interledger.transfer import Transfer
+
+
+def test_timeout_schedule_periods():
+    schedule = TimeoutSchedule(10, 2)  # periods: [0, 10), [10, 30), [30, 70), ...
+
+    assert schedule.period_at(-5) == (0, 0, 10)
+    assert schedule.period_at(9.9) == (0, 0, 10)
+    assert schedule.period_at(10) == (1, 10, 30)
+    assert schedule.period_at(69) == (2, 30, 70)
+    assert schedule.period_at(70).duration == 80
+    assert schedule.period_at(1e6).idx == 16
+
+
+def test_timeout_schedule_without_backoff():
+    schedule = TimeoutSchedule(10, 1)
+
+    assert schedule.period_at(35) == (3, 30, 40)
+    assert schedule.period_at(35).time_left(35) == 5
+
+
+def test_timeout_schedule_caches_period_on_transfer():
+    schedule = TimeoutSchedule(10, 2)
+    transfer = Transfer('1', b'', '1', 0, {})
+
+    period = schedule.period_of(transfer, 12)
+    assert transfer.timeout_period is period
+    assert schedule.period_of(transfer, 29) is period
+    assert schedule.period_of(transfer, 30).idx == 2
@@ -0,0 +1,111 @@
+import io
+import os
+import queue
+import signal
+import time
+
+from interledger.utils import Logger
+from interledger.workers import WorkerSupervisor, merge_stats, partition
+
+
+def test_partition_spreads_bridges():
+    accounts = [['a'], ['b'], ['c'], ['d']]
+    assert partition(accounts, 2) == [[0, 2], [1, 3]]
+
+
+def test_partition_keeps_shared_accounts_together():
+    # 0 and 2 share 'x', 2 and 3 share 'y'
+    accounts = [['x'], ['b'], ['x', 'y'], ['y', 'd'], ['e']]
+    partitions = partition(accounts, 4)
+    assert [0, 2, 3] in partitions
+    assert sorted(i for indexes in partitions for i in indexes) == [0, 1, 2, 3, 4]
+    assert len(partitions) == 3  # no empty workers
+
+
+def test_logger_forwards_to_parent():
+    records = queue.Queue()
+    stream = io.StringIO()
+    Logger.init(node_id=2, stream=stream)
+    listener = Logger.serve(records)
+    try:
+        Logger.forward(records, 3)
+        Logger.log('transfer', 123)
+    finally:
+        Logger.forward_queue = None
+        Logger.worker = None
+        Logger.init(node_id='')
+        listener.stop()
+
+    node_id, line_number, date, time, module, function, *message = stream.getvalue().split()
+    assert node_id == '2/3'
+    assert message == ['transfer', '123']
+
+
+def test_merge_stats():
+    merged = merge_stats([
+        {'batches': 2, 'max_batch': 5, 'latency': 0.1, 'endpoint': 'a', 'chain': {'reorgs': 1}},
+        {'batches': 3, 'max_batch': 4, 'latency': 0.3, 'endpoint': 'a', 'chain': {'reorgs': 2}, 'held': None},
+    ])
+    assert merged == {'batches': 5, 'max_batch': 5, 'latency': 0.2, 'chain': {'reorgs': 3}}
+
+
+def adapter_stats(endpoint, account, batches, gas_estimates, lag=0):
+    return {
+        'endpoint': endpoint,
+        'account': account,
+        'monitor_confirmations_lag': lag,
+        'rpc': {'batching': {'batches': batches, 'max_batch': batches}},
+        'block_cache': {'hits': 1},
+        'chain': {'reorgs': 0},
+        'transactions': {'gas_estimates': gas_estimates},
+    }
+
+
+def test_aggregate_counts_shared_stats_once_per_worker():
+    supervisor = WorkerSupervisor(target=None, partitions=[[0, 1], [2]])
+    bridge = {'transfers': 1, 'initiator': adapter_stats('ws://a', 'x', 10, 1, lag=3),
+              'responder': adapter_stats('ws://b', 'y', 20, 2)}
+    # the second bridge of worker 0 shares its connections and accounts
+    supervisor.stats = {
+        0: [bridge, bridge],
+        1: [{'transfers': 4, 'initiator': adapter_stats('ws://a', 'x', 30, 4, lag=5),
+             'responder': adapter_stats('ws://b', 'z', 40, 8)}],
+    }
+    stats = supervisor.aggregate()
+    assert stats['bridges'] == 3
+    assert stats['transfers'] == 6
+    assert stats['ledgers']['ws://a']['rpc'] == {'batching': {'batches': 40, 'max_batch': 30}}
+    assert stats['ledgers']['ws://a']['block_cache'] == {'hits': 2}
+    assert stats['ledgers']['ws://a']['transactions'] == {'gas_estimates': 5}
+    assert stats['ledgers']['ws://b']['rpc'] == {'batching': {'batches': 60, 'max_batch': 40}}
+    assert stats['ledgers']['ws://b']['transactions'] == {'gas_estimates': 10}
+    assert stats['initiators'] == {'monitor_confirmations_lag': 5}
+
+
+class FakeProcess:
+
+    def __init__(self):
+        self.pid = os.getpid()
+
+    def is_alive(self):
+        return True
+
+
+def test_signals_reload_workers_and_stop_supervisor():
+    supervisor = WorkerSupervisor(target=None, partitions=[[0]])
+    supervisor.processes = {0: FakeProcess()}
+    received = []
+    previous = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGHUP)}
+    try:
+        supervisor.handle_signals()
+        handler = signal.getsignal(signal.SIGHUP)
+        # the worker is this process here, count the forwarded SIGHUP instead of forwarding it again
+        signal.signal(signal.SIGHUP, lambda signum, frame: received.append(signum))
+        handler(signal.SIGHUP, None)
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(0.01)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+    assert received == [signal.SIGHUP]
+    assert supervisor.stop_requested